@@ -1,13 +1,13 @@
-from typing import Dict, List
+from typing import Any, Callable, Dict, List, Optional
 from loguru import logger
 from langgraph.prebuilt import create_react_agent
 from langchain_core.output_parsers import JsonOutputParser
 
 from general_inference import BaseLLM
 from templates.schemas import CaseAnalysis, RevisorSchema
-from templates.claim_json_schema import ClaimForm
-from templates.employment_json_schema import EmployeeForm
+from utils.form_registry import get_form_registry
 from utils.helpers import clean_json_string
+from utils.stream_json import parse_json
 
 
 class BaseAgentRunner:
@@ -17,9 +17,9 @@ class BaseAgentRunner:
         self.prompt = prompt
         self.agent = create_react_agent(self.llm, self.actions, prompt=self.prompt)
 
-    async def run(self, messages: list[dict]):
+    async def run(self, messages: list[dict], agent=None):
         agent_input = {"messages": messages}
-        response = await self.agent.ainvoke(agent_input)
+        response = await (agent or self.agent).ainvoke(agent_input)
         return response["messages"][-1].content
 
 
@@ -54,17 +54,9 @@ class DocumentClassifier(BaseLLM):
 
 class JSONExtractor(BaseLLM):
     def __init__(self, llm, prompt, json_structure):
-
-        self.parser = (
-            JsonOutputParser(pydantic_object=ClaimForm)
-            if "parties" in json_structure
-            else JsonOutputParser(pydantic_object=EmployeeForm)
-        )
-        self.output_schema = (
-            ClaimForm.Config.json_schema_extra["example"]
-            if "parties" in json_structure
-            else EmployeeForm.Config.json_schema_extra["example"]
-        )
+        form = get_form_registry().for_schema(json_structure)
+        self.parser = JsonOutputParser()
+        self.output_schema = form.example_prompt
         super().__init__(
             model=llm,
             template=prompt,
@@ -79,8 +71,9 @@ class JSONExtractor(BaseLLM):
         user_claim: str,
         document: str,
         description: str,
+        on_field: Optional[Callable[[str, Any], None]] = None,
     ) -> dict:
-        content = await self.get_chat_response_regular(
+        content = await self.get_chat_response_stream(
             dict(
                 case_summary=case_summary,
                 classification=classification,
@@ -88,34 +81,34 @@ class JSONExtractor(BaseLLM):
                 document_description=description,
                 output_schema=self.output_schema,
                 document=document,
-            )
+            ),
+            on_field=on_field,
         )
         return content
 
 
 class JSONCombiner(BaseLLM):
     def __init__(self, llm, prompt, json_structure):
-        self.parser = (
-            JsonOutputParser(pydantic_object=ClaimForm)
-            if "parties" in json_structure
-            else JsonOutputParser(pydantic_object=EmployeeForm)
-        )
-        self.output_schema = (
-            ClaimForm.Config.json_schema_extra["example"]
-            if "parties" in json_structure
-            else EmployeeForm.Config.json_schema_extra["example"]
-        )
+        form = get_form_registry().for_schema(json_structure)
+        self.parser = JsonOutputParser()
+        self.output_schema = form.example_prompt
         super().__init__(
             llm, template=prompt, keys=["documents_descriptions_md"], parser=self.parser
         )
 
-    async def combine(self, case_summary: str, documents_descriptions_md: str) -> dict:
-        content = await self.get_chat_response_regular(
+    async def combine(
+        self,
+        case_summary: str,
+        documents_descriptions_md: str,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> dict:
+        content = await self.get_chat_response_stream(
             dict(
                 case_summary=case_summary,
                 documents_descriptions_md=documents_descriptions_md,
                 output_schema=self.output_schema,
-            )
+            ),
+            on_field=on_field,
         )
         return content
 
@@ -171,16 +164,22 @@ class ReConstructor(BaseAgentRunner):
         self, user_response: str, missing_keys: List, all_keys: List
     ) -> Dict:
         try:
-            self.prompt = self.original_prompt.format(
+            prompt = self.original_prompt.format(
                 missing_keys=missing_keys, all_keys=all_keys
             )
             print("RECONSTRCUTOR PROMPT")
-            print(self.prompt)
+            print(prompt)
             print("RECONSTRCUTOR PROMPT")
-            self.agent = create_react_agent(self.llm, self.actions, prompt=self.prompt)
-            content = await self.run([{"role": "user", "content": user_response}])
-            content = clean_json_string(content)
-            return await JsonOutputParser().ainvoke(content)
+            # A per-call agent, as one reconstructor serves every session
+            agent = create_react_agent(self.llm, self.actions, prompt=prompt)
+            content = await self.run(
+                [{"role": "user", "content": user_response}], agent=agent
+            )
+            try:
+                return parse_json(content)
+            except ValueError:
+                # e.g. prose with brackets before the JSON
+                return JsonOutputParser().parse(clean_json_string(content))
         except Exception as ex:
             logger.info(f"Exception in Reconstructor: {ex}")
             return content
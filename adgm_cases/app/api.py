@@ -0,0 +1,373 @@
+"""
+HTTP API of the case assistant, for callers other than the Streamlit UI.
+
+Run from `adgm_cases/` with `uvicorn api:app --app-dir app`, as a single
+process: cases live in the SQLite session store and job events in JOBS_DIR,
+both on local disk, and jobs run in the process that accepted them. Cases
+and finished jobs survive a restart; a job running at the time is marked
+interrupted and its case accepts chat again.
+
+- `POST /cases` uploads the PDFs and claim details of a new case and starts
+  its analysis; returns the case and job ids.
+- `GET /jobs/{job_id}/events` streams the job's stage events over
+  Server-Sent Events, resuming after `Last-Event-ID`.
+- `GET /cases/{case_id}` returns the case: form, missing keys, chat.
+- `POST /cases/{case_id}/chat` fills missing keys from a user message.
+- `POST /cases/{case_id}/undo` and `/redo` revert or re-apply the last edit
+  of the form.
+- `GET /cases/{case_id}/why?key=<dotted key>` tells where a form value
+  comes from.
+"""
+
+import asyncio
+import hashlib
+import os, sys
+import weakref
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import orjson
+from dotenv import load_dotenv
+from fastapi import FastAPI, File, Form, Header, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from pydantic import BaseModel
+
+from case_service import (
+    CaseAgents,
+    analyze_case,
+    chat_turn,
+    open_case,
+    persisted_state,
+    provenance,
+    restore_case,
+    undo_edit,
+)
+from constants import (
+    JOB_WORKERS,
+    JOBS_DIR,
+    SESSION_FLUSH_INTERVAL,
+    SESSION_TTL_HOURS,
+    SESSIONS_DB,
+    TEMP_DIR,
+)
+from utils.cache import document_id, file_hash
+from utils.form_registry import get_form
+from utils.helpers import txt2md_converter
+from utils.jobs import FAILED, FINISHED, JobManager
+from utils.runtime import get_event_loop_thread, get_http_client
+from utils.session_store import SessionStore
+
+load_dotenv()
+
+FORM = get_form("employment")
+# Seconds between checks of a job's events file, and between SSE keep-alives
+EVENTS_POLL_INTERVAL = 0.5
+KEEPALIVE_INTERVAL = 15
+
+app = FastAPI(title="ADGM E-Courts Claim Assistant")
+# One lock per case being handled, so chat turns of a case run one at a time
+_CASE_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+@lru_cache(maxsize=1)
+def get_agents() -> CaseAgents:
+    return CaseAgents(http_async_client=get_http_client("openai"))
+
+
+@lru_cache(maxsize=1)
+def get_session_store() -> SessionStore:
+    return SessionStore(SESSIONS_DB, flush_interval=SESSION_FLUSH_INTERVAL)
+
+
+@lru_cache(maxsize=1)
+def get_job_manager() -> JobManager:
+    return JobManager(
+        max_workers=JOB_WORKERS,
+        events_dir=JOBS_DIR,
+        loop_thread=get_event_loop_thread(),
+        # Job files go with the sessions they belong to
+        retention=SESSION_TTL_HOURS * 3600,
+    )
+
+
+async def on_shared_loop(coro):
+    """Awaits a coroutine run on the shared event loop, where the pooled
+    HTTP clients live."""
+    return await asyncio.wrap_future(get_event_loop_thread().submit(coro))
+
+
+def case_lock(case_id: str) -> asyncio.Lock:
+    lock = _CASE_LOCKS.get(case_id)
+    if lock is None:
+        lock = _CASE_LOCKS[case_id] = asyncio.Lock()
+    return lock
+
+
+def load_case(case_id: str) -> Dict:
+    """
+    Loads a case, clearing the job of a case whose analysis was interrupted
+    (e.g. by a restart) so that it does not stay locked. Blocks on SQLite.
+    """
+    case = get_session_store().load(case_id)
+    if case is None:
+        raise HTTPException(status_code=404, detail=f"Unknown case {case_id}")
+    job_id = case.get("job_id")
+    if job_id:
+        job = get_job_manager().get(job_id)
+        # A job clears its case's `job_id` before it finishes, unless that failed
+        if job is None or job.interrupted or job.finished:
+            logger.info(f"Case {case_id}: job {job_id} is gone, clearing it")
+            case["job_id"] = None
+            save_case(case_id, case)
+    return restore_case(case, FORM)
+
+
+def save_case(case_id: str, case: Dict) -> None:
+    """Saves a case and commits it at once. Blocks on SQLite."""
+    store = get_session_store()
+    store.put(case_id, **persisted_state(case))
+    store.put_messages(case_id, case.get("chat_history", []))
+    store.flush()
+
+
+def case_view(case_id: str, case: Dict) -> Dict:
+    return {
+        "case_id": case_id,
+        "job_id": case.get("job_id"),
+        "form": case.get("summary_json") or {},
+        "missing_keys": case.get("missing_keys") or [],
+        "case_summary": case.get("case_summary") or "",
+        "documents": case.get("documents") or [],
+        "duplicates": case.get("duplicates") or [],
+        "chat_history": case.get("chat_history") or [],
+    }
+
+
+async def run_case(job, case_id: str, file_paths: List[str]) -> Dict:
+    # Runs on the shared loop: SQLite calls go to a thread
+    try:
+        analysis = await analyze_case(
+            get_agents(),
+            FORM,
+            file_paths,
+            on_progress=job.report,
+            on_field=lambda path, value: job.report(
+                f"Filled {path}", type="field", path=path, value=value
+            ),
+        )
+    except BaseException:
+        # The failure is in the job's events; the case accepts a new upload
+        case = await asyncio.to_thread(get_session_store().load, case_id) or {}
+        case["job_id"] = None
+        await asyncio.to_thread(save_case, case_id, case)
+        raise
+    case = await asyncio.to_thread(get_session_store().load, case_id) or {}
+    await open_case(get_agents(), FORM, case, analysis)
+    case["job_id"] = None
+    await asyncio.to_thread(save_case, case_id, case)
+    return {"case_id": case_id}
+
+
+def write_case_files(
+    case_dir: str, uploads: List[Tuple[str, bytes]], claims: str
+) -> Tuple[List[str], List[Dict]]:
+    """Writes the PDFs and claim text of a new case; returns their paths and
+    document records. Blocks on disk."""
+    file_paths, documents = [], []
+    for file_name, data in uploads:
+        digest = hashlib.sha256(data).hexdigest()
+        # Stored under the document id, as `PDF2MD.save_uploaded_file` does
+        doc_dir = os.path.join(case_dir, "temp_pdfs", document_id(digest))
+        os.makedirs(doc_dir, exist_ok=True)
+        file_path = os.path.join(doc_dir, file_name)
+        with open(file_path, "wb") as f:
+            f.write(data)
+        file_paths.append(file_path)
+        documents.append(
+            {
+                "filename": file_name,
+                "file_id": document_id(digest),
+                "content_hash": digest,
+            }
+        )
+
+    claims_path = os.path.join(case_dir, "claims_text.txt")
+    with open(claims_path, "w", encoding="utf-8") as f:
+        f.write(txt2md_converter(claims.strip()))
+    digest = file_hash(claims_path)
+    file_paths.append(claims_path)
+    documents.append(
+        {
+            "filename": "claims_text.txt",
+            "file_id": document_id(digest),
+            "content_hash": digest,
+        }
+    )
+    return file_paths, documents
+
+
+@app.post("/cases", status_code=202)
+async def create_case(
+    claims: str = Form(..., description="Particulars of the claim"),
+    files: List[UploadFile] = File(..., description="Supporting PDFs"),
+) -> Dict:
+    """Saves the documents of a new case and starts analysing them."""
+    if not claims.strip() or not files:
+        raise HTTPException(
+            status_code=422, detail="Claim details and at least one PDF are required"
+        )
+    if any(not upload.filename for upload in files):
+        raise HTTPException(status_code=400, detail="Every PDF needs a file name")
+    uploads = [
+        (os.path.basename(upload.filename), await upload.read()) for upload in files
+    ]
+    case_id = str(uuid.uuid4())
+    file_paths, documents = await asyncio.to_thread(
+        write_case_files, os.path.join(TEMP_DIR, case_id), uploads, claims
+    )
+
+    # Saved before the job starts, which clears `job_id` when it finishes
+    job_id = uuid.uuid4().hex
+    await asyncio.to_thread(
+        save_case, case_id, {"documents": documents, "job_id": job_id}
+    )
+    job = await asyncio.to_thread(
+        get_job_manager().submit,
+        lambda job: run_case(job, case_id, file_paths),
+        job_id,
+    )
+    logger.info(f"Case {case_id}: analysing {len(files)} document(s) in job {job.id}")
+    return {"case_id": case_id, "job_id": job.id}
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str, request: Request, last_event_id: int = Header(0)
+) -> StreamingResponse:
+    """
+    Streams the events of a job as Server-Sent Events until it finishes.
+
+    Events are read from the job's events file, so a job finished before a
+    restart can still be streamed. A job interrupted by a restart ends with
+    a `failed` status event. The SSE `id` of an event is its position;
+    reconnecting with `Last-Event-ID` resumes after it.
+    """
+    path = os.path.join(JOBS_DIR, f"{os.path.basename(job_id)}.jsonl")
+    if not await asyncio.to_thread(os.path.exists, path):
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+
+    def read_from(offset: int) -> bytes:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read()
+
+    def sse(index: int, event_type: str, data: str) -> str:
+        return f"id: {index}\nevent: {event_type}\ndata: {data}\n\n"
+
+    async def stream():
+        offset, index, idle = 0, 0, 0.0
+        while not await request.is_disconnected():
+            try:
+                data = await asyncio.to_thread(read_from, offset)
+            except FileNotFoundError:  # Deleted with its session
+                data = b""
+            # Only complete lines: the last one may still be being written
+            data = data[: data.rfind(b"\n") + 1]
+            offset += len(data)
+            for line in data.splitlines():
+                index += 1
+                if index <= last_event_id:
+                    continue
+                event = orjson.loads(line)
+                yield sse(index, event["type"], line.decode("utf-8"))
+                if event["type"] == "status" and event["status"] in FINISHED:
+                    return
+            if not data:
+                # No final event is coming if the job's process is gone
+                job = await asyncio.to_thread(get_job_manager().get, job_id)
+                if job is None or job.interrupted:
+                    error = job.error if job else "Unknown job"
+                    event = {"type": "status", "status": FAILED, "message": error}
+                    yield sse(index + 1, "status", orjson.dumps(event).decode("utf-8"))
+                    return
+            idle = 0.0 if data else idle + EVENTS_POLL_INTERVAL
+            if idle >= KEEPALIVE_INTERVAL:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/cases/{case_id}")
+async def get_case(case_id: str) -> Dict:
+    return case_view(case_id, await asyncio.to_thread(load_case, case_id))
+
+
+class ChatRequest(BaseModel):
+    message: str
+
+
+@app.post("/cases/{case_id}/chat")
+async def chat(case_id: str, request: ChatRequest) -> Dict:
+    """Fills the missing keys answered by a user message and replies."""
+    # Turns of one case run one at a time: each appends to the history the
+    # previous one saved
+    async with case_lock(case_id):
+        case = await asyncio.to_thread(load_case, case_id)
+        if case.get("job_id"):
+            raise HTTPException(
+                status_code=409, detail="The case is still being analysed"
+            )
+        changed_keys = await on_shared_loop(
+            chat_turn(get_agents(), FORM, case, request.message)
+        )
+        await asyncio.to_thread(save_case, case_id, case)
+    return {
+        **case_view(case_id, case),
+        "reply": case["chat_history"][-1]["content"],
+        "changed_keys": changed_keys,
+    }
+
+
+async def edit_history(case_id: str, redo: bool) -> Dict:
+    async with case_lock(case_id):
+        case = await asyncio.to_thread(load_case, case_id)
+        if case.get("job_id"):
+            raise HTTPException(
+                status_code=409, detail="The case is still being analysed"
+            )
+        changed_keys = undo_edit(FORM, case, redo=redo)
+        if changed_keys:
+            await asyncio.to_thread(save_case, case_id, case)
+    return {**case_view(case_id, case), "changed_keys": changed_keys}
+
+
+@app.post("/cases/{case_id}/undo")
+async def undo(case_id: str) -> Dict:
+    """Reverts the last edit of the form: a chat turn, or the revisor's fill."""
+    return await edit_history(case_id, redo=False)
+
+
+@app.post("/cases/{case_id}/redo")
+async def redo(case_id: str) -> Dict:
+    """Re-applies the last edit reverted by `undo`."""
+    return await edit_history(case_id, redo=True)
+
+
+@app.get("/cases/{case_id}/why")
+async def why(case_id: str, key: str) -> Dict:
+    """The source of the current value of a form key, and the edits that wrote it."""
+    case = await asyncio.to_thread(load_case, case_id)
+    return provenance(case, key)
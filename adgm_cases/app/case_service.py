@@ -0,0 +1,268 @@
+import os
+from typing import Callable, Dict, List
+
+from loguru import logger
+from langchain_openai import ChatOpenAI
+
+from agents import Officer, ReConstructor, Summarizer
+from document_processor import DocumentProcessor
+from templates.prompt_templates import (
+    LLM_PROMPT_CHECKER,
+    LLM_PROMPT_OFFICER,
+    LLM_PROMPT_RECONSTRUCTOR,
+    LLM_PROMPT_SUMMARIZER,
+)
+from utils.form_registry import FormSpec
+from utils.form_state import FormState
+from utils.helpers import aed_to_usd, is_claim_value_updated
+from utils.schema_index import MissingKeyTracker
+
+# Case state kept in the session store; `form_log` is the edit log of the
+# form state (see `persisted_state`), the missing-key tracker is rebuilt
+# from `summary_json`
+PERSISTED_KEYS = (
+    "summary_json",
+    "form_log",
+    "documents",
+    "missing_keys",
+    "all_keys",
+    "case_summary",
+    "duplicates",
+    "job_id",
+)
+
+
+class CaseAgents:
+    """The GPT-4o client and the chat agents, shared by every case."""
+
+    def __init__(self, http_async_client=None):
+        self.llm = ChatOpenAI(
+            api_key=os.environ["OPENAI_API_KEY"],
+            model="gpt-4o",
+            stream_usage=True,
+            temperature=0.1,
+            http_async_client=http_async_client,
+        )
+        self.reconstructor = ReConstructor(
+            llm=self.llm, actions=[aed_to_usd], prompt=LLM_PROMPT_RECONSTRUCTOR
+        )
+        self.officer = Officer(llm=self.llm, actions=[], prompt=LLM_PROMPT_OFFICER)
+        self.checker = Officer(llm=self.llm, actions=[], prompt=LLM_PROMPT_CHECKER)
+        self.summarizer = Summarizer(llm=self.llm, prompt=LLM_PROMPT_SUMMARIZER)
+
+
+def persisted_state(case: Dict) -> Dict:
+    """The values of a case to save, with the edit log of its form state."""
+    form_state = case.get("form_state")
+    return {
+        **{key: case.get(key) for key in PERSISTED_KEYS},
+        "form_log": form_state.to_dict() if form_state is not None else None,
+    }
+
+
+def restore_form_state(results: Dict, form_log: Dict = None, source: str = "session"):
+    """The form state of `results`, with its edit log if it was saved."""
+    if form_log:
+        return FormState.from_dict(results, form_log)
+    return FormState(results, source=source)
+
+
+def restore_case(case: Dict, form: FormSpec) -> Dict:
+    """Rebuilds the form state and missing-key tracker of a saved case."""
+    results = case.get("summary_json")
+    if results:
+        case["form_state"] = restore_form_state(results, case.get("form_log"))
+        case["missing_tracker"] = MissingKeyTracker(form.index, results)
+    return case
+
+
+async def analyze_case(
+    agents: CaseAgents,
+    form: FormSpec,
+    file_paths: List[str],
+    on_progress: Callable = None,
+    on_field: Callable = None,
+) -> Dict:
+    """
+    Runs the document pipeline over the files of a case.
+
+    Returns:
+        dict: `results` (the form), `missing_keys`, `conflict_pts`,
+            `case_summary`, `duplicates` and `form_state` (a `FormState`, or
+            its `to_dict` log once the result was saved by a job).
+    """
+    processor = DocumentProcessor(
+        llm=agents.llm,
+        json_structure=form.schema,
+        on_progress=on_progress,
+        on_field=on_field,
+    )
+
+    results, conflict_pts, incorrect_claim, case_summary, duplicates = (
+        await processor.process_documents(file_paths)
+    )
+    missing_keys = form.index.missing(results)
+    if incorrect_claim:
+        # Adding claim_value ❌ to missing keys to enable updating it
+        logger.info("adding claim_value ❌ to missing keys to enable updating it ")
+        missing_keys += ["claim_details.claim_value"]
+
+    return {
+        "results": results,
+        "missing_keys": missing_keys,
+        "conflict_pts": conflict_pts,
+        "case_summary": case_summary,
+        "duplicates": duplicates,
+        "form_state": processor.form_state,
+    }
+
+
+async def open_case(
+    agents: CaseAgents, form: FormSpec, case: Dict, analysis: Dict, llm_reply=None
+) -> Dict:
+    """
+    Sets the analysis of a case and adds the checker's first reply to its chat.
+
+    Args:
+        case (dict): The case state, updated in place.
+        analysis (dict): As `analyze_case` returns it, or as a job restored it.
+        llm_reply (str): The first reply, if known (e.g. cached).
+    """
+    results = analysis["results"]
+    form_state = analysis.get("form_state")
+    if not isinstance(form_state, FormState):
+        form_state = restore_form_state(results, form_state, source="base")
+    tracker = MissingKeyTracker(form.index, results)
+    history = case.setdefault("chat_history", [])
+    if analysis["missing_keys"]:
+        history.extend(
+            [
+                {
+                    "role": "assistant",
+                    "content": f"Missing Keys: {analysis['missing_keys']}",
+                },
+                {
+                    "role": "assistant",
+                    "content": f"Conflicts found: {analysis['conflict_pts']}",
+                },
+            ]
+        )
+    # Respond
+    if not llm_reply:
+        llm_reply = await agents.checker.serve(history)
+    history.append({"role": "ai", "content": llm_reply})
+    case.update(
+        summary_json=results,
+        form_state=form_state,
+        missing_tracker=tracker,
+        missing_keys=analysis["missing_keys"],
+        all_keys=tracker.all_keys,
+        case_summary=analysis["case_summary"],
+        duplicates=analysis.get("duplicates", []),
+    )
+    return case
+
+
+async def chat_turn(
+    agents: CaseAgents, form: FormSpec, case: Dict, message: str
+) -> List[str]:
+    """
+    Handles one user message: fills the missing keys it answers and replies.
+
+    Args:
+        case (dict): The case state, updated in place.
+        message (str): The user's message.
+
+    Returns:
+        list: The dotted keys written into the form.
+    """
+    history = case.setdefault("chat_history", [])
+    history.append({"role": "user", "content": message})
+    # All Keys are set
+    if not case.get("missing_keys"):
+        history.append({"role": "assistant", "content": "No Missing Keys Found!"})
+        # Chat normally
+        history.append({"role": "ai", "content": await agents.officer.serve(history)})
+        return []
+
+    filled_dict = await agents.reconstructor.reconstruct(
+        user_response=message,
+        missing_keys=case["missing_keys"],
+        all_keys=case.get("all_keys", []),
+    )
+    logger.info(f"RECONSTRUCTOR OUTPUT: {filled_dict}")
+    if not isinstance(filled_dict, dict):
+        # Handling JSON exception for Reconstructor
+        if isinstance(filled_dict, str):
+            history.append({"role": "assistant", "content": filled_dict})
+        return []
+
+    form_state = case.get("form_state") or FormState(case.get("summary_json") or {})
+    turn = sum(m["role"] == "user" for m in history)
+    changed_keys = form_state.apply(filled_dict, source=f"user:{turn}")
+    missing_keys = _refresh_form(form, case, form_state, changed_keys)
+
+    # Still exist Missing Keys after the user input, add to history and generate reply
+    if missing_keys:
+        note = f"Updated Missing Keys: {missing_keys}"
+    # Or else update the model that no other missing keys needed
+    else:
+        note = "No Other Missing Keys Found!"
+    history.append({"role": "assistant", "content": note})
+    history.append({"role": "ai", "content": await agents.officer.serve(history)})
+    return changed_keys
+
+
+def _refresh_form(
+    form: FormSpec, case: Dict, form_state: FormState, changed_keys: List[str]
+) -> List[str]:
+    """Re-checks the missing keys after `changed_keys` were written; returns them."""
+    results = form_state.doc
+    # Only the sections of the changed keys are re-checked
+    tracker = case.get("missing_tracker") or MissingKeyTracker(form.index, results)
+    missing_keys = list(tracker.update(changed_keys, results))
+    if not is_claim_value_updated(results):
+        logger.info("Claim Value still not updated")
+        missing_keys.insert(0, "claim_details.claim_value")
+    case.update(
+        summary_json=results,
+        form_state=form_state,
+        missing_tracker=tracker,
+        missing_keys=missing_keys,
+        all_keys=tracker.all_keys,
+    )
+    return missing_keys
+
+
+def undo_edit(form: FormSpec, case: Dict, redo: bool = False) -> List[str]:
+    """
+    Reverts the last edit of the form (a chat turn, or the revisor's fill), or
+    re-applies the last reverted one.
+
+    Args:
+        case (dict): The case state, updated in place.
+        redo (bool): Re-apply instead of revert.
+
+    Returns:
+        list: The dotted keys changed, empty if there was nothing to do.
+    """
+    form_state = case.get("form_state")
+    if form_state is None:
+        return []
+    changed_keys = form_state.redo() if redo else form_state.undo()
+    if changed_keys:
+        _refresh_form(form, case, form_state, changed_keys)
+    return changed_keys
+
+
+def provenance(case: Dict, dotted_key: str) -> Dict:
+    """Where the value of a form key comes from: the `source` of its current
+    value and the `history` of edits that wrote it."""
+    form_state = case.get("form_state")
+    if form_state is None:
+        return {"key": dotted_key, "source": None, "history": []}
+    return {
+        "key": dotted_key,
+        "source": form_state.why(dotted_key),
+        "history": form_state.history(dotted_key),
+    }
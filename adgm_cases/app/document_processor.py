@@ -1,5 +1,6 @@
 import asyncio
-from typing import Dict, List
+import os
+from typing import Dict, List, Tuple
 from loguru import logger
 from langchain_core.output_parsers import JsonOutputParser
 from tools.tools_helpers import check_claim_correct, multiply_values, sum_values
@@ -12,14 +13,16 @@ from agents import (
     JSONExtractor,
     Revisor,
 )
+from utils.boilerplate import BoilerplateReducer
+from utils.cache import document_id, file_hash
+from utils.dedup import DUPLICATE_THRESHOLD, NearDuplicateIndex
+from utils.form_state import FormState
+from utils.schema_index import get_schema_index
 from utils.helpers import (
     convert_documents_ids_to_markdown,
     convert_to_markdown,
     fetch_claim_value,
-    find_missing_keys,
-    gen_file_id,
-    inject_flattened_values,
-    read_pdf_text,
+    read_pdf_pages,
     safely_fix_claim_value,
 )
 from templates.prompt_templates import (
@@ -49,8 +52,16 @@ class DocumentProcessor:
         poclaims_conflicts_prompt=LLM_PROMPT_CONFLICT,
         not_refrenced_docs_prompt=LLM_PROMPT_UNMENTIONED_DETECTOR,
         claim_eval_prompt=LLM_PROMPT_CLAIM_EVAL,
+        duplicate_threshold=DUPLICATE_THRESHOLD,
+        on_field=None,
+        on_progress=None,
     ):
         self.llm = llm
+        self.duplicate_threshold = duplicate_threshold
+        # Called with (dotted_path, value) as the combined form streams in
+        self.on_field = on_field
+        # Called with a message as each pipeline stage starts
+        self.on_progress = on_progress
 
         self.describer_prompt = describer_prompt
         self.extractor_prompt = extractor_prompt
@@ -63,19 +74,53 @@ class DocumentProcessor:
         self.claim_eval_prompt = claim_eval_prompt
 
         self.json_structure = json_structure
+        # Form of the last `process_documents` run, with the log of its edits
+        self.form_state = None
 
-    async def _read_document(self, file_path: str) -> dict:
-        document = await read_pdf_text(file_path)
-        file_id = gen_file_id()
-        if not document:
+    def _progress(self, message: str) -> None:
+        logger.info(message)
+        if self.on_progress is not None:
+            self.on_progress(message)
+
+    async def _read_document(
+        self,
+        file_path: str,
+        digest: str,
+        reducer: BoilerplateReducer = None,
+        previous: asyncio.Event = None,
+    ) -> dict:
+        """Parses a document and strips its boilerplate with `reducer`, once
+        `previous` is set if given (see `_read_and_describe`)."""
+        pages = await read_pdf_pages(file_path)
+        if previous is not None:
+            await previous.wait()
+        file_id = document_id(digest)
+        stats = {}
+        if pages and reducer is not None:
+            # Token counting is CPU-bound, keep it off the event loop
+            document, stats = await asyncio.to_thread(reducer.reduce, pages)
+            logger.info(
+                f"Boilerplate reduction of {file_path}: {stats['tokens_before']} -> "
+                f"{stats['tokens_after']} tokens ({stats['tokens_saved']} saved)"
+            )
+        else:
+            document = "\n".join(pages or [])
+        if not document.strip():
             logger.info(f"Failed to read document in path: {file_path}")
             return {
                 "file_id": file_id,
+                "content_hash": digest,
                 "file": file_path,
                 "error": "Failed to read document",
                 "document": None,
             }
-        return {"file": file_path, "file_id": file_id, "document": document}
+        return {
+            "file": file_path,
+            "file_id": file_id,
+            "content_hash": digest,
+            "document": document,
+            "tokens_saved": stats.get("tokens_saved", 0),
+        }
 
     async def _describe_document(self, document_data: dict) -> dict:
         if not document_data.get("document"):
@@ -92,6 +137,73 @@ class DocumentProcessor:
         description = await describer.describe(document_data["document"])
         return {**document_data, "description": description}
 
+    async def _read_and_describe(
+        self,
+        file_path: str,
+        digest: str,
+        dedup_index: NearDuplicateIndex = None,
+        reducer: BoilerplateReducer = None,
+        turn: Tuple[asyncio.Event, asyncio.Event] = None,
+    ) -> dict:
+        """Parses one document and describes it as soon as its text is ready.
+
+        The text is stripped of boilerplate by `reducer`. A near-duplicate of a
+        document already in `dedup_index` is not described; it is returned with
+        `duplicate_of` set to the representative's file id. With `turn`, a pair
+        of events, the text is reduced and added to `dedup_index` once the
+        first is set (the previous file is done), and the second is set after
+        it: the documents of a case are parsed in parallel but reduced and
+        clustered in file order.
+        """
+        previous, done = turn or (None, None)
+        original_id = None
+        try:
+            document_data = await self._read_document(
+                file_path, digest, reducer, previous
+            )
+            if dedup_index is not None and document_data.get("document"):
+                signature = await asyncio.to_thread(
+                    dedup_index.signature, document_data["document"]
+                )
+                # Added in file order, so the first upload is the representative
+                original_id = dedup_index.add(document_data["file_id"], signature)
+        finally:
+            if done is not None:
+                done.set()
+        if original_id is not None:
+            logger.info(f"{file_path} duplicates document {original_id}")
+            return {**document_data, "duplicate_of": original_id}
+        return await self._describe_document(document_data)
+
+    @staticmethod
+    def _link_duplicates(
+        duplicates: List[Dict], representatives: List[Dict]
+    ) -> List[Dict]:
+        """Attaches each duplicate to the description of its representative.
+
+        An exact copy of a near-duplicate is attached to the near-duplicate's
+        representative."""
+        by_id = {doc["file_id"]: doc for doc in representatives}
+        near = {
+            d["file_id"]: d["duplicate_of"]
+            for d in duplicates
+            if d["file_id"] != d["duplicate_of"]
+        }
+        linked = []
+        for duplicate in duplicates:
+            original_id = duplicate["duplicate_of"]
+            original_id = near.get(original_id, original_id)
+            linked.append(
+                {
+                    "file": duplicate["file"],
+                    "file_id": duplicate["file_id"],
+                    "duplicate_of": original_id,
+                    "duplicate_of_file": by_id[original_id]["file"],
+                    "description": by_id[original_id].get("description"),
+                }
+            )
+        return linked
+
     async def _classify_document(
         self, user_claim: str, case_documents: list[dict]
     ) -> dict:
@@ -133,7 +245,11 @@ class DocumentProcessor:
             }
 
         json_data = await extractor.extract(
-            user_claim, document, case_summary, doc_description, doc_classification
+            case_summary=case_summary,
+            classification=doc_classification,
+            user_claim=user_claim,
+            document=document,
+            description=doc_description,
         )
         return {
             **description_data,
@@ -219,14 +335,63 @@ class DocumentProcessor:
 
     async def process_documents(self, file_paths: list[str]) -> list[dict]:
         user_claim_desc = ""
-        # # Step 1: Read all documents
-        read_tasks = [self._read_document(fp) for fp in file_paths]
-        file_contents = await asyncio.gather(*read_tasks)
         logger.info("Process started ... ")
-        # Step 2: Describe all documents
-        logger.info("Description started ... ")
-        describe_tasks = [self._describe_document(doc) for doc in file_contents]
+        # Step 1-2: Read and describe all documents. Parsing runs in a worker
+        # pool, so each description starts while other files are still parsed.
+        # Near-duplicate documents are described (and extracted) only once,
+        # and boilerplate repeated across pages and documents is removed.
+        self._progress("Description started ... ")
+        # Documents are identified by the hash of their bytes: exact copies
+        # (under any name) are not even read
+        digests = await asyncio.gather(
+            *(asyncio.to_thread(file_hash, fp) for fp in file_paths)
+        )
+        unique, copies = {}, []
+        for fp, digest in zip(file_paths, digests):
+            if digest in unique:
+                copies.append(
+                    {
+                        "file": fp,
+                        "file_id": document_id(digest),
+                        "content_hash": digest,
+                        "duplicate_of": document_id(digest),
+                    }
+                )
+            else:
+                unique[digest] = fp
+        dedup_index = NearDuplicateIndex(threshold=self.duplicate_threshold)
+        reducer = BoilerplateReducer()
+        # Documents are reduced and clustered in file order, whatever order
+        # they parse in: each one waits for the event set by the one before it
+        previous = asyncio.Event()
+        previous.set()
+        describe_tasks = []
+        for digest, fp in unique.items():
+            if "claims_text.txt" in fp:
+                describe_tasks.append(self._read_and_describe(fp, digest))
+                continue
+            done = asyncio.Event()
+            describe_tasks.append(
+                self._read_and_describe(
+                    fp, digest, dedup_index, reducer, (previous, done)
+                )
+            )
+            previous = done
         description_results = await asyncio.gather(*describe_tasks)
+        duplicates = copies + [d for d in description_results if d.get("duplicate_of")]
+        description_results = [
+            d for d in description_results if not d.get("duplicate_of")
+        ]
+        duplicates = self._link_duplicates(duplicates, description_results)
+        if duplicates:
+            logger.info(
+                "Skipped near-duplicates: "
+                + ", ".join(
+                    f"{os.path.basename(d['file'])} ~ "
+                    f"{os.path.basename(d['duplicate_of_file'])}"
+                    for d in duplicates
+                )
+            )
         for i, description in enumerate(description_results):
             if "claims_text.txt" in description["file"]:
                 # user_claim_file_id = description["file_id"]
@@ -239,7 +404,7 @@ class DocumentProcessor:
         logger.info("user_claim_des")
 
         # Step 3: Classify documents
-        logger.info("Classification started ... ")
+        self._progress("Classification started ... ")
         classification_result = await self._classify_document(
             user_claim=user_claim_desc, case_documents=description_results
         )
@@ -249,7 +414,7 @@ class DocumentProcessor:
         case_summary = classification_result.get("case_summary")
         docs_classification = classification_result.get("details")
 
-        logger.info("Detectors started ... ")
+        self._progress("Detectors started ... ")
         results = await self.run_all_detectors(
             user_claim=user_claim_desc,
             description_results=description_results,
@@ -264,7 +429,7 @@ class DocumentProcessor:
         logger.info(f"{conflict_points=}")
         logger.info("")
 
-        logger.info("JSON Generation started ... ")
+        self._progress("JSON Generation started ... ")
         # Step 4: Extract JSON
         extract_tasks = [
             self._extract_json(
@@ -289,7 +454,7 @@ class DocumentProcessor:
         logger.info(f"{md_results=}")
         logger.info("md_resultsmd_resultsmd_resultsmd_results")
 
-        logger.info("Combination started ... ")
+        self._progress("Combination started ... ")
         # Step 6: Combine results
         combiner = JSONCombiner(
             llm=self.llm,
@@ -297,7 +462,9 @@ class DocumentProcessor:
             json_structure=self.json_structure,
         )
         combined_results = await combiner.combine(
-            case_summary=case_summary, documents_descriptions_md=md_results
+            case_summary=case_summary,
+            documents_descriptions_md=md_results,
+            on_field=self.on_field,
         )
 
         logger.info("<<combined_results>>")
@@ -306,14 +473,12 @@ class DocumentProcessor:
 
         logger.info("Missing Keys started ... ")
         # Step 7: Revise for Missing Keys
-        missing_keys = find_missing_keys(
-            schema=self.json_structure, data=combined_results
-        )
+        missing_keys = get_schema_index(self.json_structure).missing(combined_results)
 
         logger.info("MD 2 started ... ")
         md_results_wojson = convert_to_markdown(final_results, include_json=False)
 
-        logger.info("Revisor started ... ")
+        self._progress("Revisor started ... ")
         revisor = Revisor(llm=self.llm, prompt=self.revisor_prompt)
 
         filled_dict = await revisor.revise(
@@ -321,10 +486,13 @@ class DocumentProcessor:
         )
         logger.info("Injection started ... ")
         logger.info(f"{combined_results=}")
-        revised_results = inject_flattened_values(filled_dict, combined_results)
+        # Values are written in place and logged with their source
+        self.form_state = FormState(combined_results, source="combiner")
+        self.form_state.apply(filled_dict, source="revisor")
+        revised_results = self.form_state.doc
         incorrect_claim = False
 
-        logger.info("claim_value_evaluation ... ")
+        self._progress("claim_value_evaluation ... ")
         claim_value_evaluation = await self.evaluate_claim_value(
             results=revised_results, user_input=user_claim_desc
         )
@@ -343,6 +511,20 @@ class DocumentProcessor:
             logger.info(conflict_points)
             logger.info("")
 
-        revised_results = safely_fix_claim_value(revised_results, incorrect_claim)
+        claim_value = fetch_claim_value(revised_results)
+        if claim_value is not None:
+            fixed = safely_fix_claim_value(
+                {"claim_details": {"claim_value": claim_value}}, incorrect_claim
+            )["claim_details"]["claim_value"]
+            if fixed != claim_value:
+                self.form_state.apply(
+                    {"claim_details.claim_value": fixed}, source="claim_value_check"
+                )
 
-        return revised_results, conflict_points, incorrect_claim, case_summary
+        return (
+            revised_results,
+            conflict_points,
+            incorrect_claim,
+            case_summary,
+            duplicates,
+        )
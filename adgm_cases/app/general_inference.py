@@ -6,7 +6,10 @@ from langchain_core.prompts import (
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate,
 )
-from typing import Any, List, Optional
+from typing import Any, Callable, List, Optional
+from loguru import logger
+
+from utils.stream_json import StreamingJSONParser
 
 
 class BaseLLM:
@@ -34,6 +37,7 @@ class BaseLLM:
         self.model = model
         self.keys = keys
         self.chain = None
+        self.model_chain = None
 
     async def initialize_chain(self) -> None:
         """
@@ -52,6 +56,7 @@ class BaseLLM:
 
             prompt = ChatPromptTemplate.from_messages(messages)
             self.chain = prompt | self.model | self.parser
+            self.model_chain = prompt | self.model
 
     async def get_chat_response_regular(self, input_data: dict) -> Any:
         """
@@ -67,6 +72,45 @@ class BaseLLM:
             await self.initialize_chain()
         return await self.chain.ainvoke(input_data)
 
+    async def get_chat_response_stream(
+        self,
+        input_data: dict,
+        on_field: Optional[Callable[[str, Any], None]] = None,
+    ) -> Any:
+        """
+        Streams the response and parses it as JSON while it arrives.
+
+        Args:
+            input_data (dict): The input data for the model.
+            on_field (Callable): Called with `(dotted_path, value)` for each value
+                of the response as soon as it is complete.
+
+        Returns:
+            Any: The parsed JSON response.
+        """
+        if not self.chain:
+            await self.initialize_chain()
+        json_parser, parts = StreamingJSONParser(), []
+        async for chunk in self.model_chain.astream(input_data):
+            parts.append(chunk.content)
+            if json_parser is None:
+                continue  # The reply did not parse, the rest is only collected
+            try:
+                events = json_parser.feed(chunk.content)
+            except ValueError as e:
+                logger.info(f"Streamed JSON not parsed ({e}), using the chain parser")
+                json_parser = None
+                continue
+            for path, value in events:
+                if on_field is not None:
+                    on_field(path, value)
+        if json_parser is not None:
+            try:
+                return json_parser.close()
+            except ValueError as e:
+                logger.info(f"Streamed JSON not parsed ({e}), using the chain parser")
+        return self.parser.parse("".join(parts))
+
 
 class General(BaseLLM):
     """
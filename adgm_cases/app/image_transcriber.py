@@ -2,12 +2,99 @@ import asyncio
 import os
 import re
 import base64
+from concurrent.futures import ThreadPoolExecutor
 from glob import glob
-from typing import List, Dict
+from typing import (
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Dict,
+    Optional,
+    Tuple,
+    Union,
+)
 from loguru import logger
 from langchain_openai import ChatOpenAI
 
-from templates.prompt_templates import TRANSCRIPER_TEMPLATE
+from constants import (
+    CACHE_DIR,
+    TRANSCRIPTION_CACHE_MAX_MB,
+    VLM_BATCH_SIZE,
+    VLM_MAX_CONCURRENCY,
+    VLM_TARGET_LATENCY,
+)
+from templates.prompt_templates import TRANSCRIPER_BATCH_TEMPLATE, TRANSCRIPER_TEMPLATE
+from utils.artifacts import decompress_file
+from utils.cache import DiskCache, content_hash, file_hash
+from utils.concurrency import AdaptiveLimiter, is_overload_error, is_retryable_error
+from utils.journal import PageJournal
+from utils.page_optimizer import duplicate_key
+from utils.utils import PDF2MD
+
+_END_OF_PAGES = None  # Queue sentinel telling a worker there are no more pages
+# Per-file log of finished pages in the output folder, used to resume a run
+JOURNAL_FILE = "transcriptions.journal.jsonl"
+# What TRANSCRIPER_TEMPLATE asks the VLM to return for blank pages
+BLANK_PAGE = "<blank>"
+# Only short pages, with less ink than this share of the page (about ten lines
+# of body text), are packed into batched requests; full pages get their own
+BATCH_MAX_COVERAGE = 0.02
+PAGE_DELIMITER = re.compile(r"^\s*<<<PAGE (\d+)>>>\s*$", re.MULTILINE)
+
+
+def split_batch_transcription(text: str, n_pages: int) -> Optional[List[str]]:
+    """Splits a batched transcription on its `<<<PAGE n>>>` delimiters.
+
+    Returns None unless exactly pages 1..n_pages were delimited, in order.
+    """
+    parts = PAGE_DELIMITER.split(text)
+    numbers = [int(number) for number in parts[1::2]]
+    if numbers != list(range(1, n_pages + 1)):
+        return None
+    return [page.strip() for page in parts[2::2]]
+
+
+class TranscriptionProgress:
+    """
+    Pages done out of the pages of one transcription call.
+
+    Each call gets its own, so concurrent calls sharing a transcriber do not
+    mix their counts. It is updated on the event loop; read `fraction` and
+    `text` from any thread, e.g. to draw a Streamlit progress bar from the
+    script thread. `on_update(progress)` is called on each page, in the
+    event loop's thread.
+    """
+
+    def __init__(self, on_update: Callable[["TranscriptionProgress"], None] = None):
+        self.on_update = on_update
+        self.completed = 0
+        self.total = 0
+        self.metrics: Dict = {}
+
+    def start(self, total: int, completed: int = 0) -> None:
+        self.total, self.completed = total, completed
+
+    def advance(self, metrics: Dict) -> None:
+        self.completed += 1
+        self.metrics = metrics
+        if self.on_update is not None:
+            self.on_update(self)
+
+    @property
+    def fraction(self) -> float:
+        return min(self.completed / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def text(self) -> str:
+        text = f"{self.completed}/{self.total} pages"
+        if self.metrics:
+            text += (
+                f" · {self.metrics['pages_per_sec']} pages/s · "
+                f"{self.metrics['in_flight']}/{self.metrics['limit']} in flight"
+            )
+        return text
 
 
 class ImageTranscriber:
@@ -19,54 +106,497 @@ class ImageTranscriber:
         max_concurrent_tasks: int = 7,
         image_folder: str = "output_best/*.jpg",
         prompt: str = TRANSCRIPER_TEMPLATE,
+        queue_size: int = None,
+        optimize_pages: bool = True,
+        cache: DiskCache = None,
+        max_retries: int = 5,
+        batch_size: int = VLM_BATCH_SIZE,
+        batch_prompt: str = TRANSCRIPER_BATCH_TEMPLATE,
+        http_async_client=None,
     ):
+        # Starting concurrency; the limiter adapts it to the endpoint's capacity
         self.max_concurrent_tasks = max_concurrent_tasks
+        self.max_retries = max_retries
+        # Rendered pages waiting for a worker; bounds memory for streamed PDFs
+        self.queue_size = queue_size or 2 * max_concurrent_tasks
+        # Crop/grayscale/re-encode rendered pages, skip blank and duplicate ones
+        self.optimize_pages = optimize_pages
         self.image_folder = image_folder
         self.prompt = prompt
+        # Sparse pages packed per VLM request (1 disables batching)
+        self.batch_size = batch_size
+        self.batch_prompt = batch_prompt
+        self.model_name = model_name
+        # Page transcriptions keyed by page bytes, model and prompt, shared across sessions
+        self.cache = cache or DiskCache(
+            os.path.join(CACHE_DIR, "transcriptions.sqlite"),
+            max_bytes=TRANSCRIPTION_CACHE_MAX_MB * 1024**2,
+        )
+        self.prompt_hash = content_hash(self.prompt)
         self.model = ChatOpenAI(
             base_url=base_url,
             model=model_name,
             api_key=api_key,
             temperature=0.1,
+            # Retries happen here so the limiter sees every 429/5xx, and
+            # connection errors are retried too
+            max_retries=0,
+            # A shared pooled client (see utils.runtime) reuses its connections
+            http_async_client=http_async_client,
+        )
+        self.limiter = AdaptiveLimiter(
+            initial_limit=max_concurrent_tasks,
+            max_limit=max(VLM_MAX_CONCURRENCY, max_concurrent_tasks),
+            target_latency=VLM_TARGET_LATENCY,
         )
-        self.sem = asyncio.Semaphore(self.max_concurrent_tasks)
-        self.completed_count = 0  # Shared counter for progress
 
-    async def _transcribe_image(
-        self, img_path: str, results: Dict[int, str], progress_bar, total_images
-    ):
-        """Handles transcription of a single image while respecting concurrency limits."""
-        async with self.sem:
-            idx = int("".join(re.findall(r"\d+", os.path.basename(img_path))))
-            results[idx] = await self.image_transcription(img_path)
-
-            # Update shared progress counter safely
-            self.completed_count += 1
-            progress_bar.progress(
-                self.completed_count / total_images
-            )  # Progress now moves strictly forward
-
-    async def image_transcription(self, image_path: str) -> str:
-        """Calls VLLM Model for image transcription."""
-        with open(image_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode("utf-8")
-
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": self.prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
-                    },
-                ],
-            }
+    async def _transcribe_page(
+        self, image: Union[bytes, str], progress: TranscriptionProgress
+    ) -> str:
+        """Handles transcription of a single page while respecting concurrency limits."""
+        return (await self._transcribe_images([image], progress))[0]
+
+    async def _transcribe_images(
+        self, images: List[Union[bytes, str]], progress: TranscriptionProgress
+    ) -> List[str]:
+        """Transcribes pages not found in the cache, in one request when batched."""
+        images = [self._read_image(image) for image in images]
+        cache_keys = [
+            content_hash(image, self.model_name, self.prompt_hash) for image in images
         ]
+        # SQLite reads block, keep them off the event loop
+        texts = await asyncio.to_thread(
+            lambda: [self.cache.get_text(cache_key) for cache_key in cache_keys]
+        )
+        for text in texts:
+            if text is not None:
+                self._advance_progress(progress)
+
+        misses = [i for i, text in enumerate(texts) if text is None]
+        if misses:
+            transcribed = await self._transcribe_uncached([images[i] for i in misses])
+            for i, text in zip(misses, transcribed):
+                texts[i] = text
+                self._advance_progress(progress)
+            await asyncio.to_thread(
+                lambda: [self.cache.set_text(cache_keys[i], texts[i]) for i in misses]
+            )
+        return texts
+
+    async def _transcribe_uncached(self, images: List[bytes]) -> List[str]:
+        if len(images) > 1:
+            text = await self._limited_transcription(images)
+            pages = split_batch_transcription(text, len(images))
+            if pages is not None:
+                return pages
+            logger.info(
+                f"Could not split a batch of {len(images)} pages, transcribing them one by one"
+            )
+        return await asyncio.gather(
+            *[self._limited_transcription([image]) for image in images]
+        )
+
+    async def _limited_transcription(self, images: List[bytes]) -> str:
+        """Transcribes under the adaptive limiter, retrying calls the endpoint rejected."""
+        for attempt in range(self.max_retries + 1):
+            started = await self.limiter.acquire()
+            # Failed and cancelled calls free their slot too
+            overloaded, completed = False, 0
+            try:
+                message = await self.image_transcription(
+                    images[0] if len(images) == 1 else images
+                )
+                completed = len(images)
+            except Exception as ex:
+                # Only overload cuts the limit; a dropped connection is retried as is
+                overloaded = is_overload_error(ex)
+                if not is_retryable_error(ex) or attempt == self.max_retries:
+                    raise
+                backoff = min(2**attempt, 30)
+                reason = "overloaded" if overloaded else "connection failed"
+                logger.info(f"VLM {reason} ({ex}), retrying in {backoff}s")
+            finally:
+                await self.limiter.release(
+                    started, overloaded=overloaded, completed=completed
+                )
+            if completed:
+                return message.content
+            await asyncio.sleep(backoff)
+
+    @staticmethod
+    def _read_image(image: Union[bytes, str]) -> bytes:
+        if isinstance(image, str):
+            with open(image, "rb") as image_file:
+                return image_file.read()
+        return image
+
+    def metrics(self) -> Dict:
+        """Current concurrency limit, in-flight calls and pages/sec of the VLM endpoint."""
+        return self.limiter.metrics()
+
+    def _advance_progress(self, progress: Optional[TranscriptionProgress]):
+        if progress is not None:
+            progress.advance(self.metrics())
+
+    async def image_transcription(
+        self, image: Union[bytes, str, List[Union[bytes, str]]]
+    ) -> str:
+        """Calls VLLM Model for image transcription.
+
+        `image` is either JPEG-encoded bytes or a path to an image on disk. A list
+        of images is sent as one batched request whose reply delimits each page
+        (see `split_batch_transcription`).
+        """
+        if isinstance(image, list):
+            images = image
+            prompt = self.batch_prompt.format(n_pages=len(images))
+        else:
+            images = [image]
+            prompt = self.prompt
+
+        content = [{"type": "text", "text": prompt}]
+        for page in images:
+            base64_image = base64.b64encode(self._read_image(page)).decode("utf-8")
+            content.append(
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
+                }
+            )
+        messages = [{"role": "user", "content": content}]
 
         return await self.model.ainvoke(messages)
 
-    async def process_images(self, imgs_path: List[str] = None, progress_bar=None):
+    async def process_pages(
+        self,
+        pages: List[bytes],
+        output_dir: str = None,
+        progress: TranscriptionProgress = None,
+    ):
+        """Transcribes in-memory page images (in page order) and stores them in a Markdown file."""
+        if not pages:
+            logger.info("No pages found for transcription.")
+            return []
+
+        progress = progress or TranscriptionProgress()
+        progress.start(len(pages))
+
+        tasks = [self._transcribe_page(image, progress) for image in pages]
+        transcriptions = await asyncio.gather(*tasks)
+        results = dict(enumerate(transcriptions, start=1))
+
+        return self._save_transcriptions(results, output_dir)
+
+    async def process_pdf(
+        self,
+        pdf_path: str,
+        output_dir: str = None,
+        progress: TranscriptionProgress = None,
+        dpi: int = 100,
+        debug_folder: str = None,
+    ):
+        """Renders a PDF across the rasterisation pool and transcribes pages as they are produced."""
+        transcriptions = await self.process_files(
+            [pdf_path],
+            output_dirs=[output_dir],
+            progress=progress,
+            dpi=dpi,
+            debug_folders=[debug_folder],
+        )
+        return transcriptions[0]
+
+    async def process_files(
+        self,
+        pdf_paths: List[str],
+        output_dirs: List[str] = None,
+        progress: TranscriptionProgress = None,
+        dpi: int = 100,
+        debug_folders: List[str] = None,
+    ) -> List[List[str]]:
+        """Transcribes every page of every PDF of a case through one shared worker pool.
+
+        All files feed a single case-level queue, smallest file first so short
+        documents are not stuck behind long ones, and the workers never idle at
+        file boundaries. Finished pages are journaled to each output folder as
+        they complete; pages already journaled by an interrupted run are neither
+        rendered nor transcribed again. Each file's `transcriptions.md` is then
+        built from its journal, in page order.
+
+        Returns:
+            List[List[str]]: Page transcriptions of each file, in input order.
+        """
+        output_dirs = output_dirs or [None] * len(pdf_paths)
+        debug_folders = debug_folders or [None] * len(pdf_paths)
+        page_counts = [
+            await asyncio.to_thread(PDF2MD.page_count, pdf_path)
+            for pdf_path in pdf_paths
+        ]
+        journals = {
+            file_idx: await asyncio.to_thread(
+                self._open_journal, output_dir, pdf_paths[file_idx]
+            )
+            for file_idx, output_dir in enumerate(output_dirs)
+        }
+
+        try:
+            sources = [
+                (
+                    file_idx,
+                    PDF2MD.aiter_pages(
+                        pdf_paths[file_idx],
+                        dpi=dpi,
+                        debug_folder=debug_folders[file_idx],
+                        optimize=self.optimize_pages,
+                        skip_pages=journals[file_idx].done_pages(),
+                    ),
+                )
+                for file_idx in sorted(
+                    range(len(pdf_paths)), key=page_counts.__getitem__
+                )
+            ]
+            await self._drain(sources, journals, sum(page_counts), progress)
+        finally:
+            for journal in journals.values():
+                journal.close()
+
+        return [
+            await asyncio.to_thread(
+                self._write_markdown, journals[file_idx].iter_ordered(), output_dir
+            )
+            for file_idx, output_dir in enumerate(output_dirs)
+        ]
+
+    async def process_stream(
+        self,
+        pages: Union[Iterator[Tuple[int, bytes]], AsyncIterator[Dict]],
+        total_pages: int,
+        output_dir: str = None,
+        progress: TranscriptionProgress = None,
+    ):
+        """Transcribes pages from a lazy iterator of `(page_number, image)` pairs
+        or an async iterator of page records (see `PDF2MD.aiter_pages`)."""
+        journal = await asyncio.to_thread(self._open_journal, output_dir)
+        try:
+            await self._drain([(0, pages)], {0: journal}, total_pages, progress)
+        finally:
+            journal.close()
+
+        if not len(journal):
+            logger.info("No pages found for transcription.")
+            return []
+
+        return await asyncio.to_thread(
+            self._write_markdown, journal.iter_ordered(), output_dir
+        )
+
+    def _open_journal(self, output_dir: str = None, pdf_path: str = None):
+        """Opens the journal of an output folder, resuming it if it was written for
+        the same PDF. Blocks on disk."""
+        if not output_dir:
+            return PageJournal()
+        fingerprint = file_hash(pdf_path) if pdf_path else ""
+        journal_path = os.path.join(output_dir, JOURNAL_FILE)
+        # The journal of an idle session may have been compressed by the cleanup
+        decompress_file(journal_path)
+        return PageJournal(journal_path, fingerprint)
+
+    async def _drain(
+        self,
+        sources: List[Tuple[int, Union[Iterator, AsyncIterator]]],
+        journals: Dict[int, PageJournal],
+        total_pages: int,
+        progress: TranscriptionProgress = None,
+    ):
+        """Pushes the pages of every source through one bounded queue and worker pool.
+
+        A single producer pulls pages from the sources in turn and a fixed pool
+        of workers drains the queue, so at most `queue_size` rendered pages (plus
+        one per worker) are held in memory and the first page is transcribed
+        before the last is rendered. Blank pages are never sent, and pages
+        matching an earlier page of the case reuse its transcription. Each
+        finished page is appended to its source's journal right away.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        # Future of the transcription of each unique page, by `duplicate_key`
+        seen_pages = {}
+        # Journaled pages from an earlier run count as done
+        progress = progress or TranscriptionProgress()
+        progress.start(
+            total_pages, completed=sum(len(journal) for journal in journals.values())
+        )
+
+        workers = [
+            asyncio.create_task(
+                self._page_worker(queue, journals, seen_pages, progress)
+            )
+            # Enough workers for the limiter to grow into; it gates the VLM calls
+            for _ in range(self.limiter.max_limit)
+        ]
+        producer = asyncio.create_task(
+            self._produce_pages(sources, journals, queue, len(workers))
+        )
+        try:
+            await asyncio.gather(producer, *workers)
+        except BaseException:
+            for task in [producer, *workers]:
+                task.cancel()
+            raise
+
+    async def _produce_pages(
+        self,
+        sources: List[Tuple[int, Union[Iterator, AsyncIterator]]],
+        journals: Dict[int, PageJournal],
+        queue: asyncio.Queue,
+        n_workers: int,
+    ):
+        """Pulls rendered pages off each source without blocking the event loop.
+
+        Pages already in their source's journal are dropped.
+        """
+        batch = []  # Sparse pages waiting to fill a batched request
+        for source_key, pages in sources:
+            if hasattr(pages, "__anext__"):
+                try:
+                    async for record in pages:
+                        if record["page"] in journals[source_key]:
+                            continue
+                        record = {**record, "source": source_key}
+                        if not self._is_batchable(record):
+                            await queue.put(record)
+                            continue
+                        batch.append(record)
+                        if len(batch) == self.batch_size:
+                            await queue.put(batch)
+                            batch = []
+                finally:
+                    await pages.aclose()
+            else:
+                await self._produce_sync_pages(
+                    source_key, pages, journals[source_key], queue
+                )
+        if batch:
+            await queue.put(batch)
+
+        for _ in range(n_workers):
+            await queue.put(_END_OF_PAGES)
+
+    def _is_batchable(self, record: Dict) -> bool:
+        return (
+            self.batch_size > 1
+            and not record.get("blank")
+            and record.get("coverage") is not None
+            and record["coverage"] < BATCH_MAX_COVERAGE
+        )
+
+    async def _produce_sync_pages(
+        self,
+        source_key: int,
+        pages: Iterator[Tuple[int, bytes]],
+        journal: PageJournal,
+        queue: asyncio.Queue,
+    ):
+        loop = asyncio.get_running_loop()
+        # Rendering stays on one dedicated thread, PyMuPDF documents are not thread-safe
+        with ThreadPoolExecutor(max_workers=1) as render_thread:
+            try:
+                while True:
+                    page = await loop.run_in_executor(
+                        render_thread, next, pages, _END_OF_PAGES
+                    )
+                    if page is _END_OF_PAGES:
+                        break
+                    idx, image = page
+                    if idx in journal:
+                        continue
+                    await queue.put({"page": idx, "image": image, "source": source_key})
+            finally:
+                close = getattr(pages, "close", None)
+                if close is not None:
+                    await loop.run_in_executor(render_thread, close)
+
+    async def _page_worker(
+        self,
+        queue: asyncio.Queue,
+        journals: Dict[int, PageJournal],
+        seen_pages: Dict[Tuple[str, str], asyncio.Future],
+        progress: TranscriptionProgress,
+    ):
+        """Transcribes queued pages until the producer signals the end of the stream."""
+        while True:
+            item = await queue.get()
+            if item is _END_OF_PAGES:
+                return
+            # A list is a batch of sparse pages to send in one request
+            records = item if isinstance(item, list) else [item]
+            texts = await self._handle_records(records, seen_pages, progress)
+            finished = {}
+            for record, text in zip(records, texts):
+                finished.setdefault(record["source"], []).append((record["page"], text))
+            # One write and fsync per journal, off the event loop
+            for source, pages in finished.items():
+                await asyncio.to_thread(journals[source].extend, pages)
+
+    async def _handle_records(
+        self,
+        records: List[Dict],
+        seen_pages: Dict[Tuple[str, str], asyncio.Future],
+        progress: TranscriptionProgress,
+    ) -> List[str]:
+        """Transcribes page records together, short-circuiting blank and duplicate pages."""
+        texts = {}
+        to_transcribe = []  # (position, record, future shared with its duplicates)
+        duplicates = []  # (position, future of the original page)
+        for position, record in enumerate(records):
+            page_name = f"Page {record['page']} of source {record['source']}"
+            if record.get("blank"):
+                logger.info(f"{page_name} is blank, skipping transcription")
+                texts[position] = BLANK_PAGE
+                self._advance_progress(progress)
+                continue
+
+            transcription = None
+            key = duplicate_key(record)
+            if key is not None:
+                original = seen_pages.get(key)
+                if original is not None:
+                    logger.info(f"{page_name} duplicates an earlier page, reusing it")
+                    duplicates.append((position, original))
+                    continue
+                # Keyed by digests only, the image bytes are not kept
+                transcription = seen_pages[key] = (
+                    asyncio.get_running_loop().create_future()
+                )
+            to_transcribe.append((position, record, transcription))
+
+        try:
+            transcribed = (
+                await self._transcribe_images(
+                    [record["image"] for _, record, _ in to_transcribe],
+                    progress,
+                )
+                if to_transcribe
+                else []
+            )
+        except BaseException:
+            for _, _, transcription in to_transcribe:
+                if transcription is not None:
+                    transcription.cancel()
+            raise
+        for (position, _, transcription), text in zip(to_transcribe, transcribed):
+            texts[position] = text
+            if transcription is not None:
+                transcription.set_result(text)
+
+        # Awaited last: the original may be part of this very batch
+        for position, original in duplicates:
+            texts[position] = await original
+            self._advance_progress(progress)
+
+        return [texts[position] for position in range(len(records))]
+
+    async def process_images(
+        self, imgs_path: List[str] = None, progress: TranscriptionProgress = None
+    ):
         """Manages concurrent transcription of images with progress tracking and stores them in a Markdown file."""
         if imgs_path is None:
             imgs_path = glob(self.image_folder)
@@ -77,31 +607,65 @@ class ImageTranscriber:
 
         # Determine the output directory
         output_dir = os.path.dirname(imgs_path[0])
-        output_file = os.path.join(output_dir, "transcriptions.md")
 
-        results = {}
-        total_images = len(imgs_path)
-        self.completed_count = 0  # Reset counter before processing
+        progress = progress or TranscriptionProgress()
+        progress.start(len(imgs_path))
 
-        tasks = [
-            self._transcribe_image(img_path, results, progress_bar, total_images)
-            for img_path in imgs_path
-        ]
-        await asyncio.gather(*tasks)
+        tasks = [self._transcribe_page(img_path, progress) for img_path in imgs_path]
+        transcriptions = await asyncio.gather(*tasks)
+        results = {
+            int("".join(re.findall(r"\d+", os.path.basename(img_path)))): text
+            for img_path, text in zip(imgs_path, transcriptions)
+        }
 
-        # Sort results by image index
-        sorted_results = dict(sorted(results.items()))
-        transcriptions = [
-            f"## Image {idx}\n\n{c.content}\n" for idx, c in sorted_results.items()
-        ]
+        return self._save_transcriptions(results, output_dir)
 
-        # Save transcriptions to Markdown file in the same directory as the images
-        with open(output_file, "w", encoding="utf-8") as md_file:
-            md_file.write("\n".join(transcriptions))
+    def _save_transcriptions(self, results: Dict[int, str], output_dir: str = None):
+        """Sorts transcriptions by page index and saves them to `transcriptions.md` in `output_dir`."""
+        return self._write_markdown(sorted(results.items()), output_dir)
 
-        logger.info(f"Transcriptions saved to: {output_file}")
-        return [c.content for c in sorted_results.values()]
+    def _write_markdown(
+        self, ordered_pages: Iterable[Tuple[int, str]], output_dir: str = None
+    ) -> List[str]:
+        """Writes `(page, text)` pairs to `transcriptions.md` in `output_dir` as they are read."""
+        transcriptions = []
+        md_file = None
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            output_file = os.path.join(output_dir, "transcriptions.md")
+            md_file = open(output_file, "w", encoding="utf-8")
+
+        try:
+            for idx, content in ordered_pages:
+                if md_file is not None:
+                    separator = "\n" if transcriptions else ""
+                    md_file.write(f"{separator}## Image {idx}\n\n{content}\n")
+                transcriptions.append(content)
+        finally:
+            if md_file is not None:
+                md_file.close()
+                logger.info(f"Transcriptions saved to: {output_file}")
+
+        return transcriptions
+
+    async def run(
+        self,
+        imgs_path: List[str] = None,
+        progress: TranscriptionProgress = None,
+        pages: List[bytes] = None,
+        output_dir: str = None,
+        pdf_path: str = None,
+        debug_folder: str = None,
+    ):
+        """Main function to start processing images.
 
-    async def run(self, imgs_path: List[str] = None, progress_bar=None):
-        """Main function to start processing images."""
-        return await self.process_images(imgs_path, progress_bar)
+        A `pdf_path` is streamed page by page; otherwise in-memory `pages` take
+        precedence over image paths on disk.
+        """
+        if pdf_path is not None:
+            return await self.process_pdf(
+                pdf_path, output_dir, progress, debug_folder=debug_folder
+            )
+        if pages is not None:
+            return await self.process_pages(pages, output_dir, progress)
+        return await self.process_images(imgs_path, progress)
@@ -1,74 +1,155 @@
-import asyncio
+import copy
 import os, sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+from concurrent.futures import wait
 from time import sleep
 import uuid
-from pathlib import Path
 from typing import Dict, List
 
 from loguru import logger
 import streamlit as st
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from agents import Officer, ReConstructor, Summarizer
-from constants import CACHED_VALUES, CLAIM_FORM, EMPLOYMENT_FORM, TEMP_DIR
-from document_processor import DocumentProcessor
-from image_transcriber import ImageTranscriber
-from templates.prompt_templates import (
-    LLM_PROMPT_CHECKER,
-    LLM_PROMPT_OFFICER,
-    LLM_PROMPT_RECONSTRUCTOR,
-    LLM_PROMPT_SUMMARIZER,
+from case_service import (
+    CaseAgents,
+    analyze_case,
+    chat_turn,
+    open_case,
+    persisted_state,
+    restore_case,
 )
-from utils.helpers import (
-    aed_to_usd,
-    clean_for_cache,
-    find_missing_keys,
-    flatten_json2dots,
-    inject_flattened_values,
-    is_claim_value_updated,
-    json_to_markdown,
-    txt2md_converter,
+from constants import (
+    CACHED_VALUES,
+    JOB_WORKERS,
+    JOBS_DIR,
+    SAVE_PAGE_IMAGES,
+    SESSION_COMPRESS_AFTER_HOURS,
+    SESSION_DISK_QUOTA_MB,
+    SESSION_FLUSH_INTERVAL,
+    SESSION_GC_INTERVAL,
+    SESSION_TTL_HOURS,
+    SESSIONS_DB,
+    TEMP_DIR,
 )
+from image_transcriber import ImageTranscriber, TranscriptionProgress
+from utils.helpers import clean_for_cache, txt2md_converter
+from utils.artifacts import ArtifactManager
+from utils.cache import document_id, file_hash
+from utils.form_registry import get_form
+from utils.form_renderer import FormView
+from utils.form_state import FormState
+from utils.jobs import JobManager
+from utils.runtime import get_event_loop_thread, get_http_client, run_async
+from utils.session_store import SessionStore
 from utils.utils import PDF2MD
 
 load_dotenv()
 
 st.set_page_config(layout="wide")
 
-llm = ChatOpenAI(
-    api_key=os.environ["OPENAI_API_KEY"],
-    model="gpt-4o",
-    stream_usage=True,
-    temperature=0.1,
-)
 
-reconstructor = ReConstructor(
-    llm=llm, actions=[aed_to_usd], prompt=LLM_PROMPT_RECONSTRUCTOR
-)
-officer = Officer(llm=llm, actions=[], prompt=LLM_PROMPT_OFFICER)
-checker = Officer(llm=llm, actions=[], prompt=LLM_PROMPT_CHECKER)
-summarizer = Summarizer(llm=llm, prompt=LLM_PROMPT_SUMMARIZER)
+@st.cache_resource
+def get_agents() -> CaseAgents:
+    """The GPT-4o client and chat agents, built once per server process.
+    All async calls run on the shared event loop (`run_async`), where the
+    pooled HTTP client keeps its connections alive between chat turns."""
+    return CaseAgents(http_async_client=get_http_client("openai"))
+
+
+@st.cache_resource
+def get_transcriber() -> ImageTranscriber:
+    return ImageTranscriber(
+        base_url=os.environ["BASE_URL"],
+        model_name=os.environ["MODEL_NAME"],
+        api_key=os.environ["API_KEY"],
+        http_async_client=get_http_client("vlm"),
+    )
+
+
+AGENTS = get_agents()
 
 # Streamlit setup
 st.title("ADGM E-Courts Claim Assistant")
 
 # Sidebar toggle
 # form_type = st.sidebar.radio("Select Form Type", ("Employment Form", "Claim Form"))
-JSON_SCHEMA = EMPLOYMENT_FORM #if form_type == "Employment Form" else CLAIM_FORM
-# JSON_SCHEMA = read_json_file(form_path)
+FORM = get_form("employment") #if form_type == "Employment Form" else get_form("claim")
+FORM_RENDERER = FORM.renderer
+
+# Session state handed to the case service for a chat turn
+CASE_KEYS = (
+    "chat_history",
+    "summary_json",
+    "form_state",
+    "missing_tracker",
+    "missing_keys",
+    "all_keys",
+)
+
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """One session store per server process, shared by all sessions."""
+    return SessionStore(SESSIONS_DB, flush_interval=SESSION_FLUSH_INTERVAL)
+
+
+@st.cache_resource
+def get_artifact_manager() -> ArtifactManager:
+    """Cleans up the session directories in the background, once per server process."""
+    return ArtifactManager(
+        TEMP_DIR,
+        ttl=SESSION_TTL_HOURS * 3600,
+        quota_bytes=SESSION_DISK_QUOTA_MB * 1024**2,
+        compress_after=SESSION_COMPRESS_AFTER_HOURS * 3600,
+        interval=SESSION_GC_INTERVAL,
+    ).start()
+
+
+def restore_session(saved: Dict):
+    st.session_state.update(restore_case(saved, FORM))
+    results = st.session_state.get("summary_json")
+    if results:
+        st.session_state.form_view = FormView(FORM_RENDERER, results)
+        st.session_state.summary = st.session_state.form_view.markdown
+
+
+def save_session():
+    store = get_session_store()
+    store.put(
+        st.session_state.case_id,
+        **persisted_state(st.session_state),
+    )
+    store.put_messages(st.session_state.case_id, st.session_state.chat_history)
+    get_artifact_manager().touch(st.session_state.session_id)
+
+
+# Resume the case in the URL (?case=<id>) after a refresh or restart
+if "case_id" not in st.session_state:
+    case_id = st.query_params.get("case")
+    saved = get_session_store().load(case_id) if case_id else None
+    if saved is None:
+        case_id = str(uuid.uuid4())
+    else:
+        logger.info(f"Resuming case {case_id}")
+        restore_session(saved)
+    st.session_state.case_id = case_id
+    st.session_state.session_id = f"{TEMP_DIR}/{case_id}"
+    st.query_params["case"] = case_id
 
 # Initialize session state
 st.session_state.setdefault("chat_history", [])
 st.session_state.setdefault("summary", "Upload documents to extract information.")
 st.session_state.setdefault("summary_json", {})
 st.session_state.setdefault("documents", [])
-st.session_state.setdefault("session_id", f"{TEMP_DIR}/{str(uuid.uuid4())}")
 st.session_state.setdefault("missing_keys", [])
 st.session_state.setdefault("all_keys", [])
 st.session_state.setdefault("case_summary", "")
+st.session_state.setdefault("duplicates", [])
+st.session_state.setdefault("missing_tracker", None)
+st.session_state.setdefault("form_state", None)
+st.session_state.setdefault("form_view", None)
+st.session_state.setdefault("job_id", None)
 st.markdown(
     """
     <style>
@@ -104,35 +185,61 @@ def save_claims_to_text_file(text: str, file_path: str = "particular_of_claims.t
         file.write(text)
 
 
-async def extract_text_from_pdfs(files: List[object]):
-    extracted_texts = []
-    transcriber = ImageTranscriber(
-        base_url=os.environ["BASE_URL"],
-        model_name=os.environ["MODEL_NAME"],
-        api_key=os.environ["API_KEY"],
-    )
+def extract_text_from_pdfs(files: List[object]):
+    transcriber = get_transcriber()
 
+    # Files are matched by content: a renamed copy is skipped, a new file
+    # with a known name is not
+    processed = {doc.get("content_hash") for doc in st.session_state.documents}
+    files = [file for file in files if PDF2MD.upload_hash(file) not in processed]
+    if not files:
+        return []
+
+    file_paths, output_dirs = [], []
     for file in files:
-        if file.name in [doc["filename"] for doc in st.session_state.documents]:
-            continue
-
-        progress_bar = st.progress(0)
-        file_path = PDF2MD.save_uploaded_file(file)
-        images_paths = PDF2MD.pdf_to_images(
-            pdf_path=file_path,
-            output_folder=os.path.join(
-                st.session_state["session_id"], Path(file.name).stem
-            ),
+        file_paths.append(
+            PDF2MD.save_uploaded_file(st.session_state["session_id"], file)
         )
-        transcriptions = await transcriber.run(
-            imgs_path=images_paths, progress_bar=progress_bar
+        output_dirs.append(
+            os.path.join(
+                st.session_state["session_id"],
+                document_id(PDF2MD.upload_hash(file)),
+            )
         )
-        extracted_texts.append(transcriptions)
 
-    return extracted_texts
+    # One case-level page queue for all files, drained by a single worker pool
+    # on the shared loop. Its thread has no Streamlit context, so the bar is
+    # drawn here, in the script thread, from this call's own progress
+    progress = TranscriptionProgress()
+    future = get_event_loop_thread().submit(
+        transcriber.process_files(
+            file_paths,
+            output_dirs=output_dirs,
+            progress=progress,
+            debug_folders=output_dirs if SAVE_PAGE_IMAGES else None,
+        )
+    )
+    progress_bar = st.progress(0)
+    while not future.done():
+        progress_bar.progress(progress.fraction, text=progress.text)
+        wait([future], timeout=0.5)
+    progress_bar.progress(progress.fraction, text=progress.text)
+    return future.result()
+
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """One job manager per server process, shared by all sessions."""
+    return JobManager(
+        max_workers=JOB_WORKERS,
+        events_dir=JOBS_DIR,
+        loop_thread=get_event_loop_thread(),
+        # Job files go with the sessions they belong to
+        retention=SESSION_TTL_HOURS * 3600,
+    )
 
 
-async def analyze_documents(files, claims_text: str):
+def save_case_files(files, claims_text: str) -> List[str]:
 
     os.makedirs(st.session_state.session_id, exist_ok=True)
 
@@ -140,7 +247,14 @@ async def analyze_documents(files, claims_text: str):
     for file in files:
         file_path = PDF2MD.save_uploaded_file(st.session_state.session_id, file)
         file_paths.append(file_path)
-        st.session_state.documents.append({"filename": file.name})
+        digest = PDF2MD.upload_hash(file)
+        st.session_state.documents.append(
+            {
+                "filename": file.name,
+                "file_id": document_id(digest),
+                "content_hash": digest,
+            }
+        )
 
     # Save claims text to a .txt file in session dir
     if claims_text:
@@ -148,40 +262,42 @@ async def analyze_documents(files, claims_text: str):
         with open(claims_path, "w", encoding="utf-8") as f:
             f.write(txt2md_converter(claims_text.strip()))
         file_paths.append(claims_path)
-        st.session_state.documents.append({"filename": "claims_text.txt"})
+        digest = file_hash(claims_path)
+        st.session_state.documents.append(
+            {
+                "filename": "claims_text.txt",
+                "file_id": document_id(digest),
+                "content_hash": digest,
+            }
+        )
 
     st.session_state.summary = f"Uploaded {len(files)} new document(s). Processing .."
-
-    processor = DocumentProcessor(llm=llm, json_structure=JSON_SCHEMA)
-
-    results, conflict_pts, incorrect_claim, case_summary = (
-        await processor.process_documents(file_paths)
+    return file_paths
+
+
+async def analyze_documents(file_paths: List[str], job) -> Dict:
+    # Runs in the job manager's thread: no access to st.session_state here
+    return await analyze_case(
+        AGENTS,
+        FORM,
+        file_paths,
+        on_progress=job.report,
+        on_field=lambda path, value: job.report(
+            f"Filled {path}", type="field", path=path, value=value
+        ),
     )
-    missing_keys = find_missing_keys(schema=JSON_SCHEMA, data=results)
-    if incorrect_claim:
-        # Adding claim_value ❌ to missing keys to enable updating it
-        logger.info("adding claim_value ❌ to missing keys to enable updating it ")
-        missing_keys += ["claim_details.claim_value"]
-
-    return results, missing_keys, conflict_pts, case_summary
-
-
-async def ask_llm(messages: List[Dict], is_checker=False):
-    if is_checker:
-        return await checker.serve(messages)
-    return await officer.serve(messages)
 
 
 async def update_summary(case_summary, history):
-    return await summarizer.summarize(case_summary, history)
+    return await AGENTS.summarizer.summarize(case_summary, history)
 
 
 def are_files_cached(files):
-
-    print("are ALL CACHED ?::")
-    print([f.name for f in files])
-    print(all(file.name in CACHED_VALUES["file_names"] for file in files))
-
+    # Matched by content when the hashes of the cached files are known,
+    # else by name
+    if "file_hashes" in CACHED_VALUES:
+        cached = set(CACHED_VALUES["file_hashes"])
+        return all(PDF2MD.upload_hash(file) in cached for file in files)
     return all(file.name in CACHED_VALUES["file_names"] for file in files)
 
 
@@ -191,6 +307,24 @@ def check_cached_values(uploaded_files, particular_of_claims):
     ) and are_files_cached(uploaded_files)
 
 
+def show_analysis(analysis: Dict, llm_reply=None):
+    case = {"chat_history": st.session_state.chat_history}
+    run_async(open_case(AGENTS, FORM, case, analysis, llm_reply))
+    st.session_state.update(case)
+    st.session_state.form_view = FormView(FORM_RENDERER, case["summary_json"])
+    st.session_state.summary = st.session_state.form_view.markdown
+
+
+# Apply the results of this session's analysis job once it finished
+job = get_job_manager().get(st.session_state.job_id) if st.session_state.job_id else None
+if job is not None and job.finished:
+    st.session_state.job_id = None
+    if job.result is not None:
+        show_analysis(job.result)
+    else:
+        st.session_state.summary = f"Analysis {job.status}: {job.error or ''}"
+    job = None
+
 # Layout
 col1, col2 = st.columns([2, 1])
 
@@ -213,7 +347,7 @@ with col1:
 
     if summary_update:
         if st.session_state.case_summary:
-            st.session_state.case_summary = asyncio.run(
+            st.session_state.case_summary = run_async(
                 update_summary(
                     st.session_state.case_summary, st.session_state.chat_history
                 )
@@ -221,60 +355,46 @@ with col1:
         else:
             st.warning("Please Submit a usecase first..")
 
-    if submit:
+    if submit and job is not None:
+        st.warning("An analysis is already running for this case..")
+    elif submit:
         if uploaded_files and particular_of_claims.strip():
 
-            results = missing_keys = conflict_pts = case_summary = llm_reply = None
-
             if check_cached_values(uploaded_files, particular_of_claims):
                 sleep(3)
                 print("Using the Caching documents")
-                results, missing_keys, conflict_pts, case_summary, llm_reply = (
-                    CACHED_VALUES["json_result"],
-                    CACHED_VALUES["missing_values"],
-                    CACHED_VALUES["conflicts"],
-                    CACHED_VALUES["case_summary"],
-                    CACHED_VALUES["respond"],
+                # Chat turns edit the form in place, the cached example must stay intact
+                results = copy.deepcopy(CACHED_VALUES["json_result"])
+                show_analysis(
+                    {
+                        "results": results,
+                        "missing_keys": list(CACHED_VALUES["missing_values"]),
+                        "conflict_pts": CACHED_VALUES["conflicts"],
+                        "case_summary": CACHED_VALUES["case_summary"],
+                        "form_state": FormState(results, source="cache"),
+                    },
+                    llm_reply=CACHED_VALUES["respond"],
                 )
             else:
                 print("Executing the Pipeline ...")
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                results, missing_keys, conflict_pts, case_summary = (
-                    loop.run_until_complete(
-                        analyze_documents(uploaded_files, particular_of_claims)
-                    )
-                )
-
-            all_keys = flatten_json2dots(results)
-
-            if missing_keys:
-                st.session_state.chat_history.extend(
-                    [
-                        {
-                            "role": "assistant",
-                            "content": f"Missing Keys: {missing_keys}",
-                        },
-                        {
-                            "role": "assistant",
-                            "content": f"Conflicts found: {conflict_pts}",
-                        },
-                    ]
+                # Runs in the background; reruns poll the job until it finishes
+                file_paths = save_case_files(uploaded_files, particular_of_claims)
+                job = get_job_manager().submit(
+                    lambda job: analyze_documents(file_paths, job)
                 )
-            # Respond
-            if not llm_reply:
-                llm_reply = asyncio.run(
-                    ask_llm(st.session_state.chat_history, is_checker=True)
-                )
-            st.session_state.chat_history.append({"role": "ai", "content": llm_reply})
-            st.session_state["missing_keys"] = missing_keys
-            st.session_state["all_keys"] = all_keys
-            st.session_state.case_summary = case_summary
-            st.session_state.summary = json_to_markdown(results)
-            st.session_state.summary_json = results
+                st.session_state.job_id = job.id
         else:
             st.warning("Please enter claim details and upload at least one PDF.")
 
+    if job is not None:
+        events = job.events_since()
+        stages = [e["message"] for e in events if e["type"] == "progress"]
+        fields = sum(e["type"] == "field" for e in events)
+        st.info(
+            f"🔄 Analysing documents: {stages[-1] if stages else job.status}"
+            + (f" ({fields} form fields extracted)" if fields else "")
+        )
+
     st.subheader("Chat Interface")
     with st.form("chat_form", clear_on_submit=True):
         input_col, button_col = st.columns([5, 1])  # Adjust ratio as needed
@@ -293,69 +413,15 @@ with col1:
 
     # Chatting Input
     if user_input and chat_submitted:
-        st.session_state.chat_history.append({"role": "user", "content": user_input})
-        # All Keys are set
-        if not st.session_state["missing_keys"]:
-            st.session_state.chat_history.append(
-                {"role": "assistant", "content": f"No Missing Keys Found!"}
-            )
-            # Chat normally
-            llm_reply = asyncio.run(ask_llm(st.session_state.chat_history))
-            st.session_state.chat_history.append({"role": "ai", "content": llm_reply})
-        else:
-            filled_dict = asyncio.run(
-                reconstructor.reconstruct(
-                    user_response=user_input,
-                    missing_keys=st.session_state["missing_keys"],
-                    all_keys=st.session_state["all_keys"],
-                )
-            )
-            logger.info("RECONSTRUCTOR OUTPUT:")
-            logger.info("=====")
-            logger.info(filled_dict)
-            logger.info("=====")
-            if isinstance(filled_dict, dict):
-                results = inject_flattened_values(
-                    filled_dict, st.session_state.summary_json
-                )
-                st.session_state.summary_json = results
-                st.session_state.summary = json_to_markdown(results)
-
-                missing_keys = find_missing_keys(schema=JSON_SCHEMA, data=results)
-                if not is_claim_value_updated(results):
-                    print("Claim Value still not updated")
-                    missing_keys.insert(0, "claim_details.claim_value")
-                st.session_state["missing_keys"] = missing_keys
-                st.session_state["all_keys"] = flatten_json2dots(results)
-                # Still exist Missing Keys after the user input, add to history and generate reply
-                if missing_keys:
-                    st.session_state.chat_history.append(
-                        {
-                            "role": "assistant",
-                            "content": f"Updated Missing Keys: {missing_keys}",
-                        }
-                    )
-                    llm_reply = asyncio.run(ask_llm(st.session_state.chat_history))
-                    st.session_state.chat_history.append(
-                        {"role": "ai", "content": llm_reply}
-                    )
-                # Or else update the model that no other missing keys needed
-                else:
-                    st.session_state.chat_history.append(
-                        {
-                            "role": "assistant",
-                            "content": f"No Other Missing Keys Found!",
-                        }
-                    )
-                    llm_reply = asyncio.run(ask_llm(st.session_state.chat_history))
-                    st.session_state.chat_history.append(
-                        {"role": "ai", "content": llm_reply}
-                    )
-            # Handling JSON exception for Reconstructor
-            elif isinstance(filled_dict, str):
-                st.session_state.chat_history.append(
-                    {"role": "assistant", "content": filled_dict}
-                )
+        case = {key: st.session_state[key] for key in CASE_KEYS}
+        changed_keys = run_async(chat_turn(AGENTS, FORM, case, user_input))
+        st.session_state.update(case)
+        if changed_keys:
+            # Only the sections of the injected keys are re-rendered
+            results = case["summary_json"]
+            form_view = st.session_state.form_view or FormView(FORM_RENDERER, results)
+            st.session_state.summary = form_view.update(changed_keys, results)
+            st.session_state.form_view = form_view
 
     if st.session_state.chat_history:
         st.write(st.session_state.chat_history[-1]["content"])
@@ -367,3 +433,20 @@ with col1:
 with col2:
     st.subheader("📑 Extracted Document Information")
     st.write(st.session_state.summary)
+
+    if st.session_state.duplicates:
+        st.subheader("🗂️ Duplicate Documents")
+        st.markdown(
+            "\n".join(
+                f"- `{os.path.basename(d['file'])}` is a copy of "
+                f"`{os.path.basename(d['duplicate_of_file'])}` (analysed once)"
+                for d in st.session_state.duplicates
+            )
+        )
+
+save_session()
+
+# Poll the running job: rerun on its next event (or every second)
+if job is not None and not job.finished:
+    job.wait(since=len(job.events_since()), timeout=1.0)
+    st.rerun()
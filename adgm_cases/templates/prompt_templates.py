@@ -2,6 +2,11 @@ TRANSCRIPER_TEMPLATE = """"Extract all available text from the provided document
 If the image is completely black or contains no visible text, return <blank>
 """
 
+TRANSCRIPER_BATCH_TEMPLATE = """Extract all available text from each of the {n_pages} provided document pages in both Arabic and English. Ignore any other languages. Preserve the original text exactly as it appears, without any modifications, additions, or extra formatting.
+Transcribe the pages in the order they are given. Before the text of each page write its delimiter on its own line: <<<PAGE 1>>> for the first image, <<<PAGE 2>>> for the second, and so on up to <<<PAGE {n_pages}>>>.
+If a page is completely black or contains no visible text, return <blank> as its text.
+"""
+
 LLM_PROMPT_DESCRIPER = """**Summarize the document in a clear and concise manner tailored for legal professionals.**  
 Structure the summary with the following segments:
 
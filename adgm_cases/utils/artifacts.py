@@ -0,0 +1,190 @@
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List
+
+import zstandard
+from loguru import logger
+
+# Marks the last request of a session; its mtime is the session's last use
+LAST_USED_FILE = ".last_used"
+# Artifacts kept compressed once a session is idle
+COMPRESSED_EXTENSIONS = (".md", ".jsonl", ".txt")
+
+
+def _scan(path: str) -> Dict:
+    """Size, last use and compressible files of a session directory."""
+    size, last_used, compressible = 0, 0.0, []
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            size += stat.st_size
+            last_used = max(last_used, stat.st_mtime)
+            if file_name.endswith(COMPRESSED_EXTENSIONS):
+                compressible.append(file_path)
+    return {
+        "path": path,
+        "size": size,
+        "last_used": last_used or os.path.getmtime(path),
+        "compressible": compressible,
+    }
+
+
+def compress_file(path: str, level: int = 10) -> int:
+    """
+    Replaces a file by its zstd-compressed copy `<path>.zst`, keeping its mtime
+    so that compressing does not count as using the session.
+
+    Returns:
+        int: Bytes saved.
+    """
+    compressed = f"{path}.zst"
+    stat = os.stat(path)
+    with open(path, "rb") as src, open(compressed + ".tmp", "wb") as dst:
+        zstandard.ZstdCompressor(level=level).copy_stream(src, dst)
+    os.utime(compressed + ".tmp", (stat.st_atime, stat.st_mtime))
+    os.replace(compressed + ".tmp", compressed)
+    os.remove(path)
+    return stat.st_size - os.path.getsize(compressed)
+
+
+def decompress_file(path: str) -> bool:
+    """
+    Restores a file compressed by `compress_file`, if there is one.
+
+    Returns:
+        bool: Whether `<path>.zst` existed and was restored to `path`.
+    """
+    compressed = f"{path}.zst"
+    if os.path.exists(path) or not os.path.exists(compressed):
+        return False
+    with open(compressed, "rb") as src, open(path + ".tmp", "wb") as dst:
+        zstandard.ZstdDecompressor().copy_stream(src, dst)
+    os.replace(path + ".tmp", path)
+    os.remove(compressed)
+    return True
+
+
+class ArtifactManager:
+    """
+    Garbage collector for the per-session directories under `root`.
+
+    Each session directory (uploaded PDFs, page images, transcription
+    journals and markdown) is scanned every `interval` seconds on a daemon
+    thread. Sessions idle for longer than `ttl` are deleted; sessions idle
+    for longer than `compress_after` have their markdown and journals zstd
+    compressed; and while the directories take more than `quota_bytes` the
+    least recently used sessions are deleted until back under 90% of it.
+    Sessions used within `min_idle` seconds are never touched.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        ttl: float = 72 * 3600,
+        quota_bytes: int = 10 * 1024**3,
+        compress_after: float = 3600,
+        min_idle: float = 1800,
+        interval: float = 600,
+    ):
+        self.root = root
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self.compress_after = compress_after
+        self.min_idle = min_idle
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> "ArtifactManager":
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="artifact-gc", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.collect()
+            except OSError as e:
+                logger.info(f"[ERROR: Session cleanup failed] {e}")
+            self._stop.wait(self.interval)
+
+    def touch(self, session_dir: str) -> None:
+        """Marks a session as just used."""
+        if os.path.isdir(session_dir):
+            marker = os.path.join(session_dir, LAST_USED_FILE)
+            with open(marker, "a"):
+                os.utime(marker)
+
+    def sessions(self) -> List[Dict]:
+        """Scans the session directories, least recently used first."""
+        if not os.path.isdir(self.root):
+            return []
+        sessions = [
+            _scan(entry.path)
+            for entry in os.scandir(self.root)
+            if entry.is_dir(follow_symlinks=False)
+        ]
+        return sorted(sessions, key=lambda session: session["last_used"])
+
+    def _delete(self, session: Dict) -> None:
+        shutil.rmtree(session["path"], ignore_errors=True)
+
+    def collect(self) -> Dict[str, int]:
+        """
+        Runs one garbage collection pass.
+
+        Returns:
+            dict: Sessions `deleted` and `compressed`, and `freed_bytes`.
+        """
+        now = time.time()
+        stats = {"deleted": 0, "compressed": 0, "freed_bytes": 0}
+        kept = []
+        for session in self.sessions():
+            idle = now - session["last_used"]
+            if idle < self.min_idle:
+                kept.append(session)
+            elif idle > self.ttl:
+                self._delete(session)
+                stats["deleted"] += 1
+                stats["freed_bytes"] += session["size"]
+            else:
+                if idle > self.compress_after and session["compressible"]:
+                    saved = sum(compress_file(path) for path in session["compressible"])
+                    session["size"] -= saved
+                    stats["compressed"] += 1
+                    stats["freed_bytes"] += saved
+                kept.append(session)
+
+        total = sum(session["size"] for session in kept)
+        if self.quota_bytes and total > self.quota_bytes:
+            target = int(self.quota_bytes * 0.9)
+            for session in kept:
+                if total <= target:
+                    break
+                if now - session["last_used"] < self.min_idle:
+                    continue
+                self._delete(session)
+                total -= session["size"]
+                stats["deleted"] += 1
+                stats["freed_bytes"] += session["size"]
+            if total > self.quota_bytes:
+                logger.info(
+                    f"Sessions in {self.root} still take {total} bytes, "
+                    f"over the {self.quota_bytes} bytes quota, all recently used"
+                )
+
+        if stats["deleted"] or stats["compressed"]:
+            logger.info(f"Session cleanup in {self.root}: {stats}")
+        return stats
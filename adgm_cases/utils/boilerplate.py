@@ -0,0 +1,169 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Set, Tuple
+from loguru import logger
+
+# A line on at least this share of a document's pages (and on 2+ pages) is a
+# running header, footer or disclaimer
+MIN_PAGE_SHARE = 0.5
+# Documents with fewer pages are too short to tell boilerplate from content
+MIN_PAGES = 3
+# Shorter lines ("Yes", "Total") repeat naturally and are always kept
+MIN_LINE_CHARS = 8
+# "Page 3 of 10" style footers, and bare numbers ("3", "- 3 -", "3/10"); both
+# only count as page numbers on the first or last line of a page, and bare
+# numbers only when they run with the pages (so a lone "2023" is kept)
+PAGE_FOOTER = re.compile(
+    r"^.{0,40}\b(?:page|pg\.?)\s*\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?\W*$",
+    re.IGNORECASE,
+)
+BARE_PAGE_NUMBER = re.compile(r"^\W*(\d{1,4})(?:\s*(?:of|/)\s*\d{1,4})?\W*$")
+TABLE_SEPARATOR_CELL = re.compile(r"^:?-{3,}:?$")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception as e:  # Not installed, or the encoding cannot be fetched
+        logger.info(f"tiktoken unavailable, estimating token counts: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Number of gpt-4o tokens in `text` (estimated as chars / 4 without tiktoken)."""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def compact_line(line: str) -> str:
+    """Strips trailing space, collapses inner whitespace and markdown table padding."""
+    stripped = line.strip()
+    if stripped.startswith("|") and stripped.endswith("|") and len(stripped) > 1:
+        cells = [" ".join(cell.split()) for cell in stripped[1:-1].split("|")]
+        cells = ["---" if TABLE_SEPARATOR_CELL.match(c) else c for c in cells]
+        return "|" + "|".join(cells) + "|"
+    indent = line[: len(line) - len(line.lstrip())]
+    return indent + " ".join(stripped.split())
+
+
+def line_key(line: str) -> str:
+    """Comparison key of a line: lowercase words without markdown emphasis."""
+    return " ".join(re.sub(r"[#*_`>]", " ", line).split()).lower()
+
+
+class BoilerplateReducer:
+    """
+    Corpus-aware reducer removing repeated boilerplate from the documents of a case.
+
+    Within a document, lines found on most pages (letterheads, footers,
+    disclaimers) are kept once and their repeats removed. Such lines are
+    remembered, and later documents of the case drop them entirely. Page
+    numbers, blank-line runs, extra whitespace and table padding are removed
+    everywhere. `reduce` must be called one document at a time, in the order
+    of the case's files, so the result does not depend on parsing speed.
+    """
+
+    def __init__(
+        self,
+        min_page_share: float = MIN_PAGE_SHARE,
+        min_pages: int = MIN_PAGES,
+        min_line_chars: int = MIN_LINE_CHARS,
+    ):
+        self.min_page_share = min_page_share
+        self.min_pages = min_pages
+        self.min_line_chars = min_line_chars
+        self.known: Set[str] = set()
+
+    def _is_candidate(self, line: str) -> bool:
+        return len(line) >= self.min_line_chars and not line.startswith("|")
+
+    @staticmethod
+    def _drop_page_numbers(pages: List[List[str]]) -> List[List[str]]:
+        """Drops page footers and numbers from the first and last line of each page."""
+        edges = []
+        for lines in pages:
+            content = [i for i, line in enumerate(lines) if line.strip()]
+            edges.append({content[0], content[-1]} if content else set())
+
+        # A bare number is a page number when it is the page's index plus an
+        # offset shared with another page (e.g. 3, 4, 5 on pages 1, 2, 3)
+        offsets: Dict[int, int] = {}
+        bare: Dict[Tuple[int, int], int] = {}
+        for page_idx, lines in enumerate(pages):
+            for i in edges[page_idx]:
+                match = BARE_PAGE_NUMBER.match(lines[i])
+                if match and not lines[i].startswith("|"):
+                    offset = int(match.group(1)) - page_idx
+                    bare[(page_idx, i)] = offset
+                    offsets[offset] = offsets.get(offset, 0) + 1
+        numbered = {pos for pos, offset in bare.items() if offsets[offset] >= 2}
+
+        return [
+            [
+                line
+                for i, line in enumerate(lines)
+                if line.startswith("|")
+                or i not in edges[page_idx]
+                or not (PAGE_FOOTER.match(line) or (page_idx, i) in numbered)
+            ]
+            for page_idx, lines in enumerate(pages)
+        ]
+
+    def _repeated_lines(self, pages: List[List[str]]) -> Set[str]:
+        """Keys of lines present on enough pages of one document."""
+        if len(pages) < self.min_pages:
+            return set()
+        page_counts: Dict[str, int] = {}
+        for lines in pages:
+            for key in {line_key(line) for line in lines if self._is_candidate(line)}:
+                page_counts[key] = page_counts.get(key, 0) + 1
+        min_count = max(2, self.min_page_share * len(pages))
+        return {key for key, count in page_counts.items() if count >= min_count}
+
+    def reduce(self, pages: List[str]) -> Tuple[str, Dict]:
+        """
+        Reduces one document given as the markdown of its pages.
+
+        Returns:
+            tuple: The reduced text and its stats: `tokens_before`,
+            `tokens_after`, `tokens_saved` and `lines_removed`.
+        """
+        original = "\n".join(pages)
+        page_lines = self._drop_page_numbers(
+            [[compact_line(line) for line in page.splitlines()] for page in pages]
+        )
+        removed = sum(len(page.splitlines()) for page in pages) - sum(
+            len(lines) for lines in page_lines
+        )
+        repeated = self._repeated_lines(page_lines)
+        learnt = set(self.known)
+
+        kept, seen = [], set()
+        for line in (line for lines in page_lines for line in lines):
+            key = line_key(line)
+            if not line.strip():
+                # Keep a single blank line between blocks
+                if kept and kept[-1]:
+                    kept.append("")
+                continue
+            if key in learnt or key in seen:
+                removed += 1
+                continue
+            if key in repeated:
+                seen.add(key)
+            kept.append(line)
+
+        self.known |= repeated
+        reduced = "\n".join(kept).strip()
+        tokens_before, tokens_after = count_tokens(original), count_tokens(reduced)
+        return reduced, {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_before - tokens_after,
+            "lines_removed": removed,
+        }
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from loguru import logger
+
+# Hex digits of a document id: 48 bits, no collision in practice below
+# millions of documents
+DOCUMENT_ID_LENGTH = 12
+
+
+def content_hash(*parts) -> str:
+    """
+    SHA-256 over the given parts, usable as a stable cache key.
+
+    Args:
+        *parts: `bytes` or `str` values (strings are UTF-8 encoded).
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\0")  # Keep ("ab", "c") and ("a", "bc") apart
+    return digest.hexdigest()
+
+
+def file_hash(path: str, chunk_size: int = 1024**2) -> str:
+    """SHA-256 hex digest of the bytes of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def document_id(digest: str, length: int = DOCUMENT_ID_LENGTH) -> str:
+    """
+    Short id of a document, derived from the SHA-256 of its bytes.
+
+    The same bytes get the same id in every run and under any file name, so
+    the id is usable as a cache key; different contents get different ids.
+    """
+    return digest[:length]
+
+
+class DiskCache:
+    """
+    Persistent key/value store backed by SQLite with LRU eviction.
+
+    Entries are evicted least-recently-used first once the cache grows past
+    `max_bytes` or `max_entries`. Reads do not write: the access times of hit
+    keys are kept in memory and written in batches of `touch_batch` (and
+    before any eviction), so the LRU order is coarse. Totals are kept in the
+    database by triggers, so several processes may share the file and each
+    evicts by the size of the whole cache. Safe to share between threads.
+    Calls block on disk I/O; from async code, run them in a thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 512 * 1024**2,
+        max_entries: int = None,
+        touch_batch: int = 256,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.lock = threading.Lock()
+        # key -> last access time, not written yet
+        self._touched: Dict[str, float] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS totals ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), "
+                "bytes INTEGER NOT NULL, entries INTEGER NOT NULL)"
+            )
+            # Caches created before the totals table are counted once
+            self.conn.execute(
+                "INSERT OR IGNORE INTO totals (id, bytes, entries) "
+                "SELECT 0, COALESCE(SUM(size), 0), COUNT(*) FROM entries"
+            )
+            for trigger, event, change in (
+                ("entries_insert", "INSERT", "bytes + new.size, entries + 1"),
+                ("entries_delete", "DELETE", "bytes - old.size, entries - 1"),
+                (
+                    "entries_update",
+                    "UPDATE OF size",
+                    "bytes + new.size - old.size, entries",
+                ),
+            ):
+                self.conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON entries "
+                    f"BEGIN UPDATE totals SET (bytes, entries) = ({change}) WHERE id = 0; END"
+                )
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                with self.conn:
+                    self._write_touches()
+            return row[0]
+
+    def set(self, key: str, value: bytes) -> None:
+        with self.lock, self.conn:
+            # An upsert, so the triggers see a size update rather than a delete
+            self.conn.execute(
+                "INSERT INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                "size = excluded.size, accessed = excluded.accessed",
+                (key, value, len(value), time.time()),
+            )
+            self._touched.pop(key, None)
+            self._evict()
+
+    def get_text(self, key: str) -> Optional[str]:
+        value = self.get(key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set_text(self, key: str, value: str) -> None:
+        self.set(key, value.encode("utf-8"))
+
+    def _write_touches(self) -> None:
+        touched, self._touched = self._touched, {}
+        self.conn.executemany(
+            "UPDATE entries SET accessed = MAX(accessed, ?) WHERE key = ?",
+            [(accessed, key) for key, accessed in touched.items()],
+        )
+
+    def _evict(self) -> None:
+        """Drops least-recently-used entries until back under 90% of the limits."""
+        total_bytes, total_entries = self.conn.execute(
+            "SELECT bytes, entries FROM totals WHERE id = 0"
+        ).fetchone()
+        over_bytes = self.max_bytes and total_bytes > self.max_bytes
+        over_entries = self.max_entries and total_entries > self.max_entries
+        if not (over_bytes or over_entries):
+            return
+
+        # Recent hits of this process count before picking what to drop
+        self._write_touches()
+        target_bytes = int(self.max_bytes * 0.9) if self.max_bytes else None
+        target_entries = int(self.max_entries * 0.9) if self.max_entries else None
+        evicted = 0
+        rows = self.conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ).fetchall()
+        for key, size in rows:
+            if (target_bytes is None or total_bytes <= target_bytes) and (
+                target_entries is None or total_entries <= target_entries
+            ):
+                break
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total_bytes -= size
+            total_entries -= 1
+            evicted += 1
+        logger.info(f"Evicted {evicted} entries from cache {self.path}")
+
+    def close(self) -> None:
+        with self.lock:
+            if self._touched:
+                with self.conn:
+                    self._write_touches()
+            self.conn.close()
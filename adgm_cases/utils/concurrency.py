@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict
+import openai
+from loguru import logger
+
+
+def is_overload_error(ex: Exception) -> bool:
+    """True for errors meaning the endpoint is saturated (429, 5xx, timeouts)."""
+    if isinstance(ex, (openai.RateLimitError, openai.APITimeoutError)):
+        return True
+    return isinstance(ex, openai.APIStatusError) and ex.status_code >= 500
+
+
+def is_retryable_error(ex: Exception) -> bool:
+    """True for overload errors and dropped or refused connections."""
+    return is_overload_error(ex) or isinstance(ex, openai.APIConnectionError)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for calls to a model endpoint.
+
+    Every call finishing under `target_latency` per page grows the limit by
+    `1 / limit` (about +1 per round of calls). An overload error or a call
+    slower than `target_latency` per page multiplies it by `decrease_factor`,
+    at most once per `target_latency` window, so the limit tracks server
+    capacity. Latency is taken per page so that batched calls, which take
+    longer for covering several pages, do not read as congestion.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 7,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        target_latency: float = 20.0,
+        decrease_factor: float = 0.5,
+        rate_window: float = 60.0,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.rate_window = rate_window
+
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._completions = deque()  # Monotonic timestamps of successful calls
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    async def acquire(self) -> float:
+        """Waits for a free slot; returns the start time to pass to `release`."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(
+        self, started: float, overloaded: bool = False, completed: int = 1
+    ) -> None:
+        """Frees a slot and adapts the limit to the outcome of the call.
+
+        `completed` is the number of pages the call covered, for pages/sec;
+        0 for a call that failed or was cancelled, which leaves the limit as is.
+        """
+        # Freed before any await, so a cancelled caller cannot leak the slot
+        self.in_flight -= 1
+        now = time.monotonic()
+        if overloaded:
+            self._decrease(now, "overload")
+        elif completed:
+            self._completions.extend([now] * completed)
+            latency = (now - started) / completed
+            if latency > self.target_latency:
+                self._decrease(now, f"{latency:.1f}s latency per page")
+            else:
+                self._limit = min(self._limit + 1 / self._limit, float(self.max_limit))
+
+        async with self._condition:
+            self._condition.notify_all()
+
+    def _decrease(self, now: float, reason: str) -> None:
+        # Calls started before the last cut report the same congestion, cut once
+        if now - self._last_decrease < self.target_latency:
+            return
+        self._last_decrease = now
+        self._limit = max(self._limit * self.decrease_factor, float(self.min_limit))
+        logger.info(f"Concurrency limit cut to {self.limit} ({reason})")
+
+    def pages_per_sec(self) -> float:
+        now = time.monotonic()
+        while self._completions and now - self._completions[0] > self.rate_window:
+            self._completions.popleft()
+        if not self._completions:
+            return 0.0
+        elapsed = max(now - self._completions[0], 1.0)
+        return len(self._completions) / elapsed
+
+    def metrics(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "pages_per_sec": round(self.pages_per_sec(), 2),
+        }
@@ -0,0 +1,110 @@
+import random
+import re
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+# Estimated Jaccard similarity of word shingles above which two documents
+# count as the same document (e.g. a contract uploaded twice, or a PDF and
+# its scan, whose OCR differs in a few words)
+DUPLICATE_THRESHOLD = 0.8
+# Words per shingle
+SHINGLE_SIZE = 5
+# MinHash permutations, split into LSH bands of NUM_PERM // BANDS rows
+NUM_PERM = 64
+BANDS = 16
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Hashed word `size`-grams of a text, ignoring case, punctuation and markdown."""
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    if len(tokens) < size:
+        return {zlib.crc32(" ".join(tokens).encode("utf-8"))} if tokens else set()
+    return {
+        zlib.crc32(" ".join(tokens[i : i + size]).encode("utf-8"))
+        for i in range(len(tokens) - size + 1)
+    }
+
+
+class NearDuplicateIndex:
+    """
+    Incremental MinHash/LSH index clustering near-duplicate documents.
+
+    The first document of a cluster is its representative; every document added
+    later that is similar enough to it is linked to it instead. `signature` is
+    CPU-bound and safe to run on a thread, `add` is cheap and must not run
+    concurrently with itself.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DUPLICATE_THRESHOLD,
+        num_perm: int = NUM_PERM,
+        bands: int = BANDS,
+        shingle_size: int = SHINGLE_SIZE,
+        seed: int = 1,
+    ):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME))
+            for _ in range(self.rows * bands)
+        ]
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self.clusters: Dict[str, List[str]] = {}
+        self._buckets: Dict[Tuple, Set[str]] = {}
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """MinHash signature of a text, or None if it has no words."""
+        hashes = shingles(text, self.shingle_size)
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        )
+
+    @staticmethod
+    def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of the documents behind two signatures."""
+        return sum(x == y for x, y in zip(a, b)) / len(a)
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield (band, signature[band * self.rows : (band + 1) * self.rows])
+
+    def add(self, doc_id: str, signature: Optional[Tuple[int, ...]]) -> Optional[str]:
+        """
+        Adds a document to the index.
+
+        Returns:
+            str: The representative it duplicates, or None if it starts a new cluster.
+        """
+        if signature is None:
+            self.clusters[doc_id] = [doc_id]
+            return None
+
+        candidates = set()
+        for key in self._band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        scored = [
+            (self.similarity(signature, self.signatures[candidate]), candidate)
+            for candidate in candidates
+        ]
+        if scored:
+            score, representative = max(scored)
+            if score >= self.threshold:
+                self.clusters[representative].append(doc_id)
+                return representative
+
+        self.signatures[doc_id] = signature
+        self.clusters[doc_id] = [doc_id]
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(doc_id)
+        return None
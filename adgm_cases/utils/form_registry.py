@@ -0,0 +1,148 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import orjson
+from loguru import logger
+
+from utils.cache import DiskCache, content_hash
+from utils.form_renderer import FormRenderer, get_form_renderer
+from utils.schema_index import SchemaIndex, get_schema_index
+
+FORMS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "forms")
+# Form definitions are named `<name>.v<version>.json`
+FORM_FILE = re.compile(r"^(?P<name>\w+)\.v(?P<version>\d+)\.json$")
+# Bump when the cached artifacts change shape
+ARTIFACTS_VERSION = "2"
+
+
+def schema_hash(schema: Dict) -> str:
+    return content_hash(orjson.dumps(schema, option=orjson.OPT_SORT_KEYS))
+
+
+def _class_name(*keys: str) -> str:
+    return "".join(part.capitalize() for key in keys for part in key.split("_"))
+
+
+class FormSpec:
+    """
+    A form definition with everything derived from its schema, built once.
+
+    `leaf_paths` and `example_prompt` are cached on disk by the hash of the
+    definition; the `SchemaIndex` and `FormRenderer` are Python objects
+    compiled once per process.
+    """
+
+    def __init__(self, name: str, version: int, definition: Dict, cache=None):
+        self.name = name
+        self.version = version
+        self.title = definition.get("title", _class_name(name))
+        self.schema: Dict = definition["schema"]
+        # The example shown to the LLM defaults to the placeholder schema
+        self.example: Dict = definition.get("example", self.schema)
+        self.hash = content_hash(
+            orjson.dumps(self.schema, option=orjson.OPT_SORT_KEYS),
+            orjson.dumps(self.example, option=orjson.OPT_SORT_KEYS),
+        )
+
+        artifacts = self._load_artifacts(cache)
+        self.leaf_paths: List[str] = artifacts["leaf_paths"]
+        self.example_prompt: str = artifacts["example_prompt"]
+
+    def _load_artifacts(self, cache: Optional[DiskCache]) -> Dict:
+        key = content_hash("form", ARTIFACTS_VERSION, self.hash)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            return orjson.loads(cached)
+        artifacts = {
+            "leaf_paths": self.index.leaf_paths(),
+            "example_prompt": orjson.dumps(
+                self.example, option=orjson.OPT_INDENT_2
+            ).decode("utf-8"),
+        }
+        if cache is not None:
+            cache.set(key, orjson.dumps(artifacts))
+        return artifacts
+
+    @property
+    def index(self) -> SchemaIndex:
+        return get_schema_index(self.schema)
+
+    @property
+    def renderer(self) -> FormRenderer:
+        return get_form_renderer(self.schema)
+
+
+class FormRegistry:
+    """
+    Form definitions loaded from the versioned files of a directory.
+
+    Each `<name>.v<version>.json` file holds `schema` (the form with
+    placeholder values), and optionally `title` and `example` (the example
+    output given to the LLM). Adding a form type is adding a file.
+    """
+
+    def __init__(self, forms_dir: str = FORMS_DIR, cache: DiskCache = None):
+        self.forms_dir = forms_dir
+        self.cache = cache
+        self.forms: Dict[str, Dict[int, FormSpec]] = {}
+        # Forms by schema hash, and by id of schema dicts already looked up
+        self._by_schema: Dict[str, FormSpec] = {}
+        self._by_id: Dict[int, Tuple[Dict, FormSpec]] = {}
+        self.load()
+
+    def load(self) -> None:
+        for file_name in sorted(os.listdir(self.forms_dir)):
+            match = FORM_FILE.match(file_name)
+            if not match:
+                continue
+            with open(os.path.join(self.forms_dir, file_name), "rb") as f:
+                definition = orjson.loads(f.read())
+            self.add(match["name"], int(match["version"]), definition)
+        logger.info(f"Loaded forms: {self.names()}")
+
+    def add(self, name: str, version: int, definition: Dict) -> FormSpec:
+        spec = FormSpec(name, version, definition, cache=self.cache)
+        self.forms.setdefault(name, {})[version] = spec
+        self._by_schema.setdefault(schema_hash(spec.schema), spec)
+        return spec
+
+    def names(self) -> List[str]:
+        return sorted(self.forms)
+
+    def get(self, name: str, version: int = None) -> FormSpec:
+        """The form `name` at `version`, or its latest version."""
+        versions = self.forms.get(name)
+        if not versions or (version is not None and version not in versions):
+            raise KeyError(f"Unknown form {name!r} (version {version})")
+        return versions[max(versions) if version is None else version]
+
+    def for_schema(self, schema: Dict) -> FormSpec:
+        """The registered form with this schema, compiled ad hoc if unknown."""
+        seen, spec = self._by_id.get(id(schema), (None, None))
+        if seen is schema:
+            return spec
+        key = schema_hash(schema)
+        if key not in self._by_schema:
+            self._by_schema[key] = FormSpec(
+                "custom", 0, {"schema": schema}, cache=self.cache
+            )
+        spec = self._by_schema[key]
+        self._by_id[id(schema)] = (schema, spec)
+        return spec
+
+
+@lru_cache(maxsize=1)
+def get_form_registry() -> FormRegistry:
+    """Shared registry of the forms in `FORMS_DIR`, with artifacts cached on disk.
+
+    Built on the first `get_form`, not when this module is imported.
+    """
+    from constants import CACHE_DIR
+
+    return FormRegistry(cache=DiskCache(os.path.join(CACHE_DIR, "forms.db")))
+
+
+def get_form(name: str, version: int = None) -> FormSpec:
+    return get_form_registry().get(name, version)
@@ -0,0 +1,196 @@
+import re
+from typing import Any, Dict, Iterable, List
+
+# "items[1]" addresses an item of the list "items"
+_LIST_INDEX = re.compile(r"\[\d+\]$")
+# Labels that the key name does not spell out well
+LABELS = {
+    "self_represented_or_authorised_officer": "Self-Represented / Authorised Officer",
+    "legal_represented_filled_by_laywer": "Legal Representative (Lawyer)",
+    "claimant_details": "Claimant",
+    "defendant_details": "Defendant",
+    "home_or_work_address": "Home/Work Address",
+    "claim_value_usd": "Claim Value (USD)",
+    "reason_if_no": "Reason if No",
+}
+ACRONYMS = {"uae": "UAE", "usd": "USD", "cfi": "CFI"}
+EMPTY = "N/A"
+
+
+def label(key: str) -> str:
+    """Display label of a schema key, e.g. `claim_value` -> `Claim Value`."""
+    if key in LABELS:
+        return LABELS[key]
+    return " ".join(ACRONYMS.get(word, word.capitalize()) for word in key.split("_"))
+
+
+def _text(value: Any) -> str:
+    return EMPTY if value in ("", None) or value == [] or value == {} else str(value)
+
+
+def _get(data: Any, key: str) -> Any:
+    return data.get(key) if isinstance(data, dict) else None
+
+
+class _Node:
+    """One line template of a compiled section."""
+
+    __slots__ = ("kind", "key", "prefix", "children")
+
+    def __init__(self, kind: str, key: str, prefix: str, children=None):
+        self.kind = kind  # "heading", "object", "items", "list" or "value"
+        self.key = key
+        self.prefix = prefix
+        self.children = children or []
+
+
+class FormRenderer:
+    """
+    Markdown view of a form, compiled from its schema.
+
+    Each top-level key of the schema is a section, compiled once into line
+    templates: values and lists of values are bullets, objects nested in a
+    section are `####` headings (bullet groups further down), and lists of
+    objects are bullets per item. Any form schema renders without layout code.
+    """
+
+    def __init__(self, schema: Dict):
+        self.schema = schema
+        self.sections: Dict[str, List[_Node]] = {
+            key: self._compile_section(key, value) for key, value in schema.items()
+        }
+
+    def _compile_section(self, key: str, node: Any) -> List[_Node]:
+        heading = _Node("heading", key, f"### {label(key)}\n")
+        if isinstance(node, dict):
+            return [heading] + self._compile(node, depth=1)
+        # A section holding a plain value or list renders as a single bullet
+        return [heading] + self._compile({key: node}, depth=2)
+
+    def _compile(self, schema: Dict, depth: int) -> List[_Node]:
+        indent = "  " * max(depth - 2, 0)
+        nodes = []
+        for key, value in schema.items():
+            if isinstance(value, dict):
+                prefix = (
+                    f"#### {label(key)}\n"
+                    if depth == 1
+                    else f"{indent}- **{label(key)}:**\n"
+                )
+                nodes.append(
+                    _Node("object", key, prefix, self._compile(value, depth + 1))
+                )
+            elif isinstance(value, list) and value and isinstance(value[0], dict):
+                # Item fields nest under the item bullet
+                item_nodes = self._compile(value[0], max(depth, 2) + 2)
+                nodes.append(
+                    _Node("items", key, f"{indent}- **{label(key)}:**\n", item_nodes)
+                )
+            elif isinstance(value, list):
+                nodes.append(_Node("list", key, f"{indent}- **{label(key)}:**"))
+            else:
+                nodes.append(_Node("value", key, f"{indent}- **{label(key)}:** "))
+        return nodes
+
+    def _render_nodes(self, nodes: List[_Node], data: Any, out: List[str]) -> None:
+        for node in nodes:
+            value = _get(data, node.key)
+            if node.kind == "value":
+                out.append(f"{node.prefix}{_text(value)}\n")
+            elif node.kind == "list":
+                out.append(node.prefix)
+                self._render_list(node, value, out)
+            elif node.kind == "object":
+                out.append(node.prefix)
+                self._render_nodes(node.children, value, out)
+            elif node.kind == "items":
+                out.append(node.prefix)
+                self._render_items(node, value, out)
+
+    @staticmethod
+    def _render_list(node: _Node, value: Any, out: List[str]) -> None:
+        if not isinstance(value, list):
+            out.append(f" {_text(value)}\n")
+            return
+        if not value:
+            out.append(f" {EMPTY}\n")
+            return
+        indent = node.prefix[: len(node.prefix) - len(node.prefix.lstrip())]
+        out.append("\n")
+        out.extend(f"{indent}  - {_text(item)}\n" for item in value)
+
+    def _render_items(self, node: _Node, value: Any, out: List[str]) -> None:
+        indent = node.prefix[: len(node.prefix) - len(node.prefix.lstrip())]
+        if not isinstance(value, list) or not value:
+            out[-1] = f"{node.prefix[:-1]} {_text(value)}\n"
+            return
+        single = len(node.children) == 1 and node.children[0].kind == "value"
+        for i, item in enumerate(value, 1):
+            if single:
+                # Items with one field (e.g. a name) render as a plain list
+                out.append(f"{indent}  - {_text(_get(item, node.children[0].key))}\n")
+                continue
+            out.append(f"{indent}  - Item {i}\n")
+            self._render_nodes(node.children, item, out)
+
+    def render_section(self, key: str, data: Dict) -> str:
+        """Markdown of the section `key` of the form."""
+        heading, *nodes = self.sections[key]
+        out = [heading.prefix]
+        if isinstance(self.schema[key], dict):
+            data = _get(data, key)
+        self._render_nodes(nodes, data, out)
+        return "".join(out)
+
+    def render(self, data: Dict) -> str:
+        """Markdown of the whole form, sections separated by blank lines."""
+        return "\n".join(self.render_section(key, data) for key in self.sections)
+
+
+class FormView:
+    """
+    Incrementally maintained markdown of one form.
+
+    Sections are rendered once; after values are written into the form in
+    place, `update` re-renders only the sections of the changed keys.
+    """
+
+    def __init__(self, renderer: FormRenderer, data: Dict):
+        self.renderer = renderer
+        self.data = data
+        self._sections = {
+            key: renderer.render_section(key, data) for key in renderer.sections
+        }
+
+    @property
+    def markdown(self) -> str:
+        return "\n".join(self._sections.values())
+
+    def update(self, changed_keys: Iterable[str], data: Dict = None) -> str:
+        """
+        Re-renders the sections of `changed_keys` after they were set in the form.
+
+        Args:
+            changed_keys (Iterable[str]): Dotted keys that were written.
+            data (dict): The form, if it was replaced rather than edited in place.
+
+        Returns:
+            str: The markdown of the form.
+        """
+        if data is not None:
+            self.data = data
+        for key in {_LIST_INDEX.sub("", key.split(".")[0]) for key in changed_keys}:
+            if key in self._sections:
+                self._sections[key] = self.renderer.render_section(key, self.data)
+        return self.markdown
+
+
+_RENDERERS: Dict[int, FormRenderer] = {}
+
+
+def get_form_renderer(schema: Dict) -> FormRenderer:
+    """Returns the compiled renderer of a schema, compiling it on first use."""
+    renderer = _RENDERERS.get(id(schema))
+    if renderer is None or renderer.schema is not schema:
+        renderer = _RENDERERS[id(schema)] = FormRenderer(schema)
+    return renderer
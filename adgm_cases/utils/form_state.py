@@ -0,0 +1,280 @@
+import copy
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# "name[2]" addresses item 2 of the list "name"
+_INDEXED_KEY = re.compile(r"^(.*)\[(\d+)\]$")
+# Marks a dict key that did not exist before an operation
+_ABSENT = object()
+# Path step appending to a list, as in JSON Patch
+APPEND = "-"
+
+
+def _split(part: str) -> Tuple[str, Optional[int]]:
+    match = _INDEXED_KEY.match(part)
+    return (match.group(1), int(match.group(2))) if match else (part, None)
+
+
+def _build(parts: List[str], value: Any) -> Any:
+    """A fresh subtree holding `value` at the dotted `parts`."""
+    if not parts:
+        return value
+    key, index = _split(parts[0])
+    if parts[0].isdigit():
+        return [{} for _ in range(int(parts[0]))] + [_build(parts[1:], value)]
+    if index is not None:
+        return {key: [{} for _ in range(index)] + [_build(parts[1:], value)]}
+    return {key: _build(parts[1:], value)}
+
+
+def to_pointer(path: Tuple) -> str:
+    """JSON Pointer of an operation path, e.g. `/claimant/additional_claimants/0`."""
+    return "/" + "/".join(str(step) for step in path)
+
+
+def _dump(op: Dict) -> Dict:
+    data = {key: op[key] for key in ("op", "value", "source", "index") if key in op}
+    data["path"] = list(op["path"])
+    if op.get("old", _ABSENT) is not _ABSENT:
+        data["old"] = op["old"]
+    return data
+
+
+def _load(data: Dict) -> Dict:
+    op = {**data, "path": tuple(data["path"])}
+    if op["path"][-1] != APPEND:
+        op.setdefault("old", _ABSENT)
+    return op
+
+
+class FormState:
+    """
+    A form kept as its base document plus a log of patch operations.
+
+    Each `apply` call writes dotted values in place and records them as one
+    transaction of JSON-Patch-style operations (`add`/`replace` on a path of
+    keys and indices) tagged with their source, e.g. `revisor` or `user:3`.
+    An operation keeps a reference to the value it replaced rather than a copy,
+    so the cost of an edit depends on the length of its path, not on the size
+    of the form; the form gets its own copy of the value written. The log
+    gives undo/redo and per-value provenance, and `to_dict` / `from_dict`
+    save and restore it along with the form.
+    """
+
+    def __init__(self, base: Dict, source: str = "base"):
+        self.doc = base
+        self.source = source
+        self.transactions: List[List[Dict]] = []
+        self._undone: List[List[Dict]] = []
+
+    def to_dict(self) -> Dict:
+        """The log as plain data (the form itself is not included)."""
+        return {
+            "source": self.source,
+            "transactions": [[_dump(op) for op in t] for t in self.transactions],
+            "undone": [[_dump(op) for op in t] for t in self._undone],
+        }
+
+    @classmethod
+    def from_dict(cls, doc: Dict, data: Dict) -> "FormState":
+        """Restores a form state from its current form and a `to_dict` log."""
+        state = cls(doc, source=data.get("source", "base"))
+        state.transactions = [[_load(op) for op in t] for t in data["transactions"]]
+        state._undone = [[_load(op) for op in t] for t in data.get("undone", [])]
+        return state
+
+    def apply(self, dotted_values: Dict[str, Any], source: str) -> List[str]:
+        """
+        Writes dotted values into the form as one transaction.
+
+        Missing objects are created, a list is entered at item 0 unless the
+        key gives an index (`items[1]` or `items.1`), and a value set on a
+        list key replaces the list.
+
+        Returns:
+            list: The dotted keys written, for `MissingKeyTracker.update`.
+        """
+        if not isinstance(dotted_values, dict) or not dotted_values:
+            return []
+        transaction = []
+        for dotted_key, value in dotted_values.items():
+            for op in self._plan(dotted_key.split("."), value, source):
+                self._do(op)
+                transaction.append(op)
+        if transaction:
+            self.transactions.append(transaction)
+            self._undone.clear()
+        return list(dotted_values)
+
+    def _plan(self, parts: List[str], value: Any, source: str) -> List[Dict]:
+        """Operations setting `value` at the dotted `parts` of the current form."""
+        current, path = self.doc, ()
+
+        def set_op(container, step, new):
+            if isinstance(container, list) and step >= len(container):
+                # Pad with empty objects up to the index, then append
+                padding = [
+                    {"op": "add", "path": path + (APPEND,), "value": {}}
+                    for _ in range(len(container), step)
+                ]
+                return padding + [{"op": "add", "path": path + (APPEND,), "value": new}]
+            exists = isinstance(container, list) or step in container
+            return [
+                {
+                    "op": "replace" if exists else "add",
+                    "path": path + (step,),
+                    "value": new,
+                }
+            ]
+
+        plans = []
+        for i, part in enumerate(parts):
+            rest = parts[i + 1 :]
+            if isinstance(current, list):
+                step = int(part) if part.isdigit() else 0
+                if step >= len(current) or not rest:
+                    plans = set_op(current, step, _build(rest, value))
+                    break
+            else:
+                key, index = _split(part)
+                if index is not None:
+                    if not isinstance(current.get(key), list):
+                        plans = set_op(current, key, _build([f"{index}"] + rest, value))
+                        break
+                    current, path = current[key], path + (key,)
+                    if index >= len(current) or not rest:
+                        plans = set_op(current, index, _build(rest, value))
+                        break
+                    step = index
+                elif not rest or not isinstance(current.get(key), (dict, list)):
+                    plans = set_op(current, key, _build(rest, value))
+                    break
+                else:
+                    step = key
+            child = current[step]
+            if not isinstance(child, (dict, list)):
+                plans = set_op(current, step, _build(rest, value))
+                break
+            if isinstance(child, list) and not rest[0].isdigit():
+                # A list entered without an index defaults to its first item
+                if not child or not isinstance(child[0], dict):
+                    path = path + (step,)
+                    plans = set_op(child, 0, _build(rest, value))
+                    break
+                current, path = child[0], path + (step, 0)
+                continue
+            current, path = child, path + (step,)
+        for op in plans:
+            op["source"] = source
+        return plans
+
+    def _container(self, path: Tuple) -> Any:
+        container = self.doc
+        for step in path[:-1]:
+            container = container[step]
+        return container
+
+    def _do(self, op: Dict) -> None:
+        container, step = self._container(op["path"]), op["path"][-1]
+        # Later edits of the form must not change the logged value
+        value = op["value"]
+        if isinstance(value, (dict, list)):
+            value = copy.deepcopy(value)
+        if step == APPEND:
+            op["index"] = len(container)
+            container.append(value)
+        else:
+            op["old"] = (
+                container.get(step, _ABSENT)
+                if isinstance(container, dict)
+                else container[step]
+            )
+            container[step] = value
+
+    def _revert(self, op: Dict) -> None:
+        container, step = self._container(op["path"]), op["path"][-1]
+        if step == APPEND:
+            container.pop()
+        elif op["old"] is _ABSENT:
+            del container[step]
+        else:
+            container[step] = op["old"]
+
+    @staticmethod
+    def _concrete(op: Dict) -> Tuple:
+        """The operation path with an appended item's actual index."""
+        if op["path"][-1] == APPEND:
+            return op["path"][:-1] + (op["index"],)
+        return op["path"]
+
+    def _dotted(self, op: Dict) -> str:
+        return ".".join(str(step) for step in self._concrete(op))
+
+    def _resolve(self, dotted_key: str) -> Tuple:
+        """Path of a dotted key in the current form, as `apply` would write it."""
+        current, path = self.doc, ()
+        for part in dotted_key.split("."):
+            key, index = _split(part)
+            if isinstance(current, list):
+                steps = (int(part),) if part.isdigit() else (0, key)
+            else:
+                steps = (key,) if index is None else (key, index)
+            if index is not None and isinstance(current, list):
+                steps += (index,)
+            for step in steps:
+                path += (step,)
+                try:
+                    current = current[step]
+                except (KeyError, IndexError, TypeError):
+                    current = None
+        return path
+
+    def undo(self) -> List[str]:
+        """Reverts the last transaction; returns the dotted keys it touched."""
+        if not self.transactions:
+            return []
+        transaction = self.transactions.pop()
+        for op in reversed(transaction):
+            self._revert(op)
+        self._undone.append(transaction)
+        return [self._dotted(op) for op in transaction]
+
+    def redo(self) -> List[str]:
+        """Re-applies the last undone transaction; returns the dotted keys it touched."""
+        if not self._undone:
+            return []
+        transaction = self._undone.pop()
+        for op in transaction:
+            self._do(op)
+        self.transactions.append(transaction)
+        return [self._dotted(op) for op in transaction]
+
+    def history(self, dotted_key: str) -> List[Dict]:
+        """Operations that wrote `dotted_key`, one of its parents or children, oldest first."""
+        key = self._resolve(dotted_key)
+        ops = []
+        for transaction in self.transactions:
+            for op in transaction:
+                path = self._concrete(op)
+                shared = min(len(path), len(key))
+                if path[:shared] == key[:shared]:
+                    ops.append(
+                        {
+                            "op": op["op"],
+                            "path": to_pointer(path),
+                            "value": op["value"],
+                            "source": op["source"],
+                        }
+                    )
+        return ops
+
+    def why(self, dotted_key: str) -> str:
+        """Source of the current value at `dotted_key`: the last operation writing it
+        or one of its parents, else the base document."""
+        key = self._resolve(dotted_key)
+        for transaction in reversed(self.transactions):
+            for op in reversed(transaction):
+                path = self._concrete(op)
+                if path == key[: len(path)]:
+                    return op["source"]
+        return self.source
@@ -0,0 +1,333 @@
+import asyncio
+import atexit
+import os
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import orjson
+from loguru import logger
+
+from utils.runtime import EventLoopThread
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = (
+    "queued",
+    "running",
+    "done",
+    "failed",
+    "cancelled",
+)
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+def _jsonable(value: Any) -> Any:
+    # Objects with a `to_dict` (e.g. a FormState) are persisted as its result,
+    # others without a JSON form as null
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if callable(to_dict) else None
+
+
+class Job:
+    """
+    One background run and its progress events.
+
+    Events are dicts with `time`, `type` and `message` (plus any data) kept in
+    order; `status`, `result` and `error` are set by the `JobManager`.
+    `report` only queues events for the events file, and `flush` writes them
+    (with the result, once the job finished), so reporting from the event
+    loop never blocks on disk.
+    """
+
+    def __init__(self, job_id: str, events_path: str = None, result_path: str = None):
+        self.id = job_id
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.events: List[Dict] = []
+        self.events_path = events_path
+        self.result_path = result_path
+        self.finished_at: Optional[float] = None
+        # Restored unfinished: the process running it is gone
+        self.interrupted = False
+        self._pending: List[bytes] = []
+        self._result_saved = False
+        self._condition = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._future = None
+
+    def report(self, message: str, type: str = "progress", **data) -> None:
+        """Records a progress event; safe to call from any thread."""
+        with self._condition:
+            self._add_event(message, type, data)
+
+    def _add_event(self, message: str, type: str, data: Dict) -> None:
+        event = {"time": time.time(), "type": type, "message": message, **data}
+        self.events.append(event)
+        if self.events_path:
+            self._pending.append(orjson.dumps(event, default=str) + b"\n")
+        self._condition.notify_all()
+
+    def _finish(self, status: str, result: Any = None, error: str = None) -> None:
+        # The status and its event change together, so `flush` never writes
+        # the final event without the result
+        with self._condition:
+            self.result, self.error = result, error
+            self.finished_at = time.time()
+            self.status = status
+            self._add_event(error or status, "status", {"status": status})
+
+    def flush(self) -> None:
+        """Writes the queued events, and the result of a finished job before them."""
+        with self._write_lock:
+            with self._condition:
+                lines, self._pending = self._pending, []
+                save_result = (
+                    self.finished and self.result_path and not self._result_saved
+                )
+            if save_result:
+                # Written before the final status event, so a reader seeing
+                # the job finished also finds its result
+                with open(self.result_path + ".tmp", "wb") as f:
+                    f.write(
+                        orjson.dumps(
+                            {"result": self.result, "error": self.error},
+                            default=_jsonable,
+                        )
+                    )
+                os.replace(self.result_path + ".tmp", self.result_path)
+                self._result_saved = True
+            if lines:
+                with open(self.events_path, "ab") as f:
+                    f.write(b"".join(lines))
+
+    @property
+    def flushed(self) -> bool:
+        with self._condition:
+            return not self._pending and (self._result_saved or not self.result_path)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def events_since(self, index: int = 0) -> List[Dict]:
+        """Events after the first `index` ones, for polling."""
+        with self._condition:
+            return self.events[index:]
+
+    def wait(self, since: int = 0, timeout: float = None) -> List[Dict]:
+        """
+        Blocks until there are events after the first `since` ones, the job
+        finishes, or `timeout` seconds pass.
+
+        Returns:
+            list: The new events.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: len(self.events) > since or self.finished, timeout
+            )
+            return self.events[since:]
+
+    @classmethod
+    def load(cls, job_id: str, events_path: str, result_path: str = None) -> "Job":
+        """A job of an earlier process, restored from its persisted events and
+        result. An unfinished job is marked failed."""
+        job = cls(job_id)
+        with open(events_path, "rb") as f:
+            job.events = [orjson.loads(line) for line in f if line.strip()]
+        status = next(
+            (e["status"] for e in reversed(job.events) if e["type"] == "status"),
+            None,
+        )
+        if status in FINISHED:
+            job.status = status
+            if result_path and os.path.exists(result_path):
+                with open(result_path, "rb") as f:
+                    saved = orjson.loads(f.read())
+                job.result, job.error = saved["result"], saved["error"]
+        else:
+            job.status, job.error = FAILED, "Interrupted by a server restart"
+            job.interrupted = True
+        return job
+
+
+class JobManager:
+    """
+    Runs coroutines in the background under a job id.
+
+    Jobs run on an event loop in a daemon thread (`loop_thread`, a new one if
+    not given), at most `max_workers` at a time, so several cases run
+    concurrently in one process and a job outlives the request (or Streamlit
+    rerun) that submitted it. A writer thread appends the progress events of
+    each job to `<events_dir>/<job_id>.jsonl` every `flush_interval` seconds,
+    and saves its result to `<job_id>.result.json` once it finished.
+    Finished jobs are dropped from memory after `ttl` seconds (`get` then
+    restores them from disk), and their files are deleted once unchanged
+    for `retention` seconds.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        events_dir: str = None,
+        loop_thread: EventLoopThread = None,
+        ttl: float = 3600,
+        retention: float = None,
+        flush_interval: float = 0.25,
+        cleanup_interval: float = 600,
+    ):
+        self.max_workers = max_workers
+        self.events_dir = events_dir
+        if events_dir:
+            os.makedirs(events_dir, exist_ok=True)
+        self.ttl = ttl
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.cleanup_interval = cleanup_interval
+        self.jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.loop_thread = loop_thread or EventLoopThread(name="job-manager")
+        self._slots = None
+        self._last_cleanup = 0.0
+        self._writer = threading.Thread(
+            target=self._write_loop, name="job-events", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _path(self, job_id: str, suffix: str) -> Optional[str]:
+        return (
+            os.path.join(self.events_dir, f"{job_id}{suffix}")
+            if self.events_dir
+            else None
+        )
+
+    def _events_path(self, job_id: str) -> Optional[str]:
+        return self._path(job_id, ".jsonl")
+
+    def _result_path(self, job_id: str) -> Optional[str]:
+        return self._path(job_id, ".result.json")
+
+    def _write_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+                self._evict()
+                if (
+                    self.retention
+                    and time.time() - self._last_cleanup > self.cleanup_interval
+                ):
+                    self._last_cleanup = time.time()
+                    self.cleanup()
+            except OSError as e:
+                logger.info(f"[ERROR: Job events not written] {e}")
+
+    def flush(self) -> None:
+        """Writes the queued events and results of every job in memory."""
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            job.flush()
+
+    def _evict(self) -> None:
+        """Drops finished jobs older than `ttl` whose events are on disk."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self.jobs.items()
+                if job.finished
+                and now - job.finished_at > self.ttl
+                and (job.flushed or not self.events_dir)
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+    def cleanup(self) -> int:
+        """
+        Deletes the files of jobs not in memory and unchanged for `retention`
+        seconds, the TTL of the sessions they belong to.
+
+        Returns:
+            int: Files deleted.
+        """
+        if not (self.events_dir and self.retention):
+            return 0
+        now, deleted = time.time(), 0
+        with self._lock:
+            live = set(self.jobs)
+        for entry in os.scandir(self.events_dir):
+            job_id = entry.name.split(".", 1)[0]
+            try:
+                idle = now - entry.stat().st_mtime
+                if job_id not in live and idle > self.retention:
+                    os.remove(entry.path)
+                    deleted += 1
+            except FileNotFoundError:
+                continue
+        if deleted:
+            logger.info(f"Deleted {deleted} job file(s) from {self.events_dir}")
+        return deleted
+
+    def submit(self, fn: Callable[[Job], Awaitable[Any]], job_id: str = None) -> Job:
+        """
+        Schedules `fn(job)` and returns the job at once.
+
+        Args:
+            fn (Callable): Async function taking the `Job`, to report progress
+                with `job.report`; its return value becomes `job.result`.
+            job_id (str): Id of the job, a new UUID if not given.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        job = Job(job_id, self._events_path(job_id), self._result_path(job_id))
+        with self._lock:
+            self.jobs[job_id] = job
+        job.report("Queued", type="status", status=QUEUED)
+        # The events file exists once the job is submitted
+        job.flush()
+        job._future = self.loop_thread.submit(self._run(job, fn))
+        # A job cancelled while queued never reaches `_run`
+        job._future.add_done_callback(
+            lambda future: future.cancelled()
+            and not job.finished
+            and job._finish(CANCELLED)
+        )
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[Job], Awaitable[Any]]) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        try:
+            async with self._slots:
+                job.status = RUNNING
+                job.report("Started", type="status", status=RUNNING)
+                result = await fn(job)
+        except asyncio.CancelledError:
+            job._finish(CANCELLED)
+        except Exception as e:
+            logger.info(f"[ERROR: Job {job.id} failed] {e}")
+            job._finish(FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            job._finish(DONE, result=result)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job `job_id`, restored from its files if it is no longer in memory."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None and self.events_dir and job_id:
+            path = self._events_path(job_id)
+            if os.path.exists(path):
+                job = Job.load(job_id, path, self._result_path(job_id))
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None or job.finished or job._future is None:
+            return False
+        return job._future.cancel()
+
+    def active(self) -> List[Job]:
+        with self._lock:
+            return [job for job in self.jobs.values() if not job.finished]
@@ -0,0 +1,119 @@
+import os
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+import orjson
+from loguru import logger
+
+
+class PageJournal:
+    """
+    Append-only, crash-safe log of finished page transcriptions for one file.
+
+    Each page is written as one JSON line and fsynced as soon as it completes,
+    pages finished together sharing one fsync, so a crash loses at most the
+    pages in flight. Writes block on disk: from async code, run `extend` in a
+    thread. Safe to share between threads. Re-opening the journal makes
+    the finished pages available again and only their byte offsets are kept in
+    memory. Without a path the journal lives in memory only.
+
+    The first line records a `fingerprint` of the source document; a journal
+    written for different content is discarded instead of resumed.
+    """
+
+    def __init__(self, path: Optional[str] = None, fingerprint: str = ""):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.offsets: Dict[int, int] = {}
+        self._memory: Dict[int, str] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+        if path is None:
+            return
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            self._recover()
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(orjson.dumps({"fingerprint": fingerprint}) + b"\n")
+            self._file.flush()
+
+    def _recover(self) -> None:
+        """Indexes the journaled pages, dropping a line torn by a crash mid-write."""
+        good_until = 0
+        with open(self.path, "rb") as f:
+            for line in iter(f.readline, b""):
+                if not line.endswith(b"\n"):
+                    # Cut before its newline: the next write would join it
+                    break
+                try:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    break
+                if good_until == 0 and entry.get("fingerprint") != self.fingerprint:
+                    logger.info(
+                        f"Journal {self.path} belongs to other content, restarting it"
+                    )
+                    break
+                if "page" in entry:
+                    self.offsets[entry["page"]] = good_until
+                good_until += len(line)
+
+        if good_until < os.path.getsize(self.path):
+            logger.info(f"Truncating torn tail of journal {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_until)
+        if self.offsets:
+            logger.info(
+                f"Resuming {len(self.offsets)} journaled page(s) from {self.path}"
+            )
+
+    def done_pages(self) -> Set[int]:
+        return set(self.offsets) | set(self._memory)
+
+    def __contains__(self, page: int) -> bool:
+        return page in self.offsets or page in self._memory
+
+    def __len__(self) -> int:
+        return len(self.done_pages())
+
+    def append(self, page: int, text: str) -> None:
+        self.extend([(page, text)])
+
+    def extend(self, pages: Iterable[Tuple[int, str]]) -> None:
+        """Journals `(page, text)` pairs with a single fsync."""
+        if self.path is None:
+            self._memory.update(pages)
+            return
+        with self._lock:
+            offsets = {}
+            for page, text in pages:
+                offsets[page] = self._file.tell()
+                self._file.write(orjson.dumps({"page": page, "text": text}) + b"\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.offsets.update(offsets)
+
+    def get(self, page: int) -> str:
+        if self.path is None:
+            return self._memory[page]
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[page])
+            return orjson.loads(f.readline())["text"]
+
+    def iter_ordered(self) -> Iterator[Tuple[int, str]]:
+        """Yields `(page, text)` in page order, reading one page at a time."""
+        if self.path is None:
+            yield from sorted(self._memory.items())
+            return
+        with open(self.path, "rb") as f:
+            for page in sorted(self.offsets):
+                f.seek(self.offsets[page])
+                yield page, orjson.loads(f.readline())["text"]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,181 @@
+import re
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+from loguru import logger
+
+MONEY_PATTERN = re.compile(r"(?:AED|USD|SAR)\s?\d+(?:,\d{3})*(?:\.\d{0,2})?")
+NUMBERED_PATTERN = re.compile(
+    r"^(\d+)\s+(.*?)(\s*(?:AED|USD|SAR)?\s?[\d{1,3},]*\d+\.\d{2})?$"
+)
+TOTAL_PATTERN = re.compile(
+    r"^\s*(-\s*)?(Total|Grand Total)\b.*?[\d{1,3},]*\d+\.\d{2}", re.IGNORECASE
+)
+HEADER_EXCLUDED_PREFIXES = ("-", "○", "•", "*", "1 ", "2 ", "3 ")
+BULLET_PREFIXES = ("○", "-", "•", "*")
+
+
+class Rule:
+    """
+    One line rule of a `RuleEngine`.
+
+    `match(line)` returns a truthy value when the rule applies; it is passed to
+    `apply(line, match)`, which returns the converted line, or None to drop it.
+    A rule that can only match lines starting with one of `first_chars` is
+    never tried on other lines.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        match: Callable[[str], Any],
+        apply: Callable[[str, Any], Optional[str]],
+        first_chars: str = None,
+    ):
+        self.name = name
+        self.match = match
+        self.apply = apply
+        self.first_chars = first_chars
+
+    @classmethod
+    def regex(
+        cls,
+        name: str,
+        pattern: re.Pattern,
+        apply: Callable[[str, re.Match], Optional[str]],
+        guard: Callable[[str], bool] = None,
+        first_chars: str = None,
+    ) -> "Rule":
+        """A rule matching a precompiled pattern, tried only on lines passing `guard`."""
+        if guard is None:
+            return cls(name, pattern.match, apply, first_chars)
+        return cls(
+            name, lambda line: guard(line) and pattern.match(line), apply, first_chars
+        )
+
+
+class RuleEngine:
+    """
+    Converts text line by line with the first matching rule of an ordered list.
+
+    Each line is classified once and converted independently, so `iter_convert`
+    streams inputs of any size. Rules are indexed by the first characters they
+    can match, so a line is only tried against rules that may apply. A rule
+    that fails on a line is logged and the line kept as it is.
+    """
+
+    def __init__(
+        self, rules: List[Rule], strip: bool = False, skip_empty: bool = False
+    ):
+        """
+        Args:
+            rules (List[Rule]): Rules in priority order.
+            strip (bool): Strip each line before matching.
+            skip_empty (bool): Drop empty lines.
+        """
+        self.rules = list(rules)
+        self.strip = strip
+        self.skip_empty = skip_empty
+        self._index()
+
+    def _index(self) -> None:
+        """Maps each first character to the (ordered) rules that may match it."""
+        self._any_line = [rule for rule in self.rules if rule.first_chars is None]
+        self._by_first_char = {
+            char: [
+                rule
+                for rule in self.rules
+                if rule.first_chars is None or char in rule.first_chars
+            ]
+            for rule in self.rules
+            for char in rule.first_chars or ""
+        }
+
+    def add_rule(self, rule: Rule, before: str = None) -> None:
+        """Adds a rule before the rule named `before`, or last."""
+        names = [r.name for r in self.rules]
+        index = names.index(before) if before in names else len(self.rules)
+        self.rules.insert(index, rule)
+        self._index()
+
+    def convert_line(self, line: str) -> Optional[str]:
+        if self.strip:
+            line = line.strip()
+        if self.skip_empty and not line:
+            return None
+        return self._apply(self._by_first_char.get(line[:1], self._any_line), line)
+
+    @staticmethod
+    def _apply(rules: List[Rule], line: str) -> Optional[str]:
+        for rule in rules:
+            try:
+                match = rule.match(line)
+                if match:
+                    return rule.apply(line, match)
+            except Exception as e:
+                logger.info(f"[ERROR: Rule {rule.name} failed on line: {line}]: {e}")
+                return line
+        return line
+
+    def _convert_lines(self, lines: Iterable[str]) -> Iterator[str]:
+        # `convert_line` inlined: this loop runs once per line of the input
+        strip, skip_empty, apply = self.strip, self.skip_empty, self._apply
+        by_first_char, any_line = self._by_first_char, self._any_line
+        for line in lines:
+            if strip:
+                line = line.strip()
+            if not line and skip_empty:
+                continue
+            rules = by_first_char.get(line[:1], any_line)
+            if rules:
+                line = apply(rules, line)
+                if line is None:
+                    continue
+            yield line
+
+    def iter_convert(self, lines: Iterable[str]) -> Iterator[str]:
+        """Converts an iterable of lines (e.g. an open file) lazily."""
+        return self._convert_lines(line.rstrip("\r\n") for line in lines)
+
+    def convert(self, text: str) -> str:
+        return "\n".join(self._convert_lines(text.splitlines()))
+
+
+def _is_header(line: str) -> bool:
+    # 2-5 words, no ending punctuation, standalone line
+    return (
+        2 <= len(line.split()) <= 5
+        and not line.endswith((".", ":", "..."))
+        and not line.startswith(HEADER_EXCLUDED_PREFIXES)
+    )
+
+
+def _numbered_item(line: str, match: re.Match) -> str:
+    idx, item, amount = match.group(1), match.group(2).strip(), match.group(3)
+    if amount:
+        return f"{idx}. {item} **{amount.strip()}**"
+    return f"{idx}. {item}"
+
+
+# Plain claim text to markdown, see `utils.helpers.txt2md_converter`
+TXT2MD_RULES = [
+    Rule("header", _is_header, lambda line, _: f"### {line}"),
+    Rule(
+        "bullet",
+        lambda line: True,
+        lambda line, _: f"- {line.lstrip('○-•* ').strip()}",
+        first_chars="".join(BULLET_PREFIXES),
+    ),
+    Rule.regex("numbered", NUMBERED_PATTERN, _numbered_item, first_chars="0123456789"),
+    Rule.regex(
+        "total",
+        TOTAL_PATTERN,
+        lambda line, _: f"- **{line}**",
+        first_chars=" -tTgG",
+    ),
+    Rule(
+        "money",
+        MONEY_PATTERN.search,
+        lambda line, _: MONEY_PATTERN.sub(lambda m: f"**{m.group(0)}**", line),
+    ),
+]
+
+TXT2MD = RuleEngine(TXT2MD_RULES, strip=True, skip_empty=True)
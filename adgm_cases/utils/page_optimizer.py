@@ -0,0 +1,132 @@
+import hashlib
+import io
+from typing import Dict, Optional, Tuple
+import pymupdf
+from PIL import Image, ImageFilter, ImageOps
+
+# Rendering resolution used for analysis; the final image is downscaled from it
+ANALYSIS_DPI = 150
+# A pixel darker than this (0-255 gray) counts as ink
+INK_THRESHOLD = 200
+# Pages with fewer solid-ink pixels than this (after despeckling) are blank;
+# a lone page number stays under it, a single short word does not
+BLANK_MAX_INK_PIXELS = 200
+SOLID_INK_THRESHOLD = 128
+# White margin (in analysis pixels) kept around the content bounding box
+CROP_MARGIN = 12
+# (min ink density of the cropped content, dpi, jpeg quality), densest first.
+# Dense small print needs resolution to stay legible, sparse pages do not.
+DENSITY_TIERS = [
+    (0.12, 150, 80),
+    (0.05, 120, 70),
+    (0.0, 100, 60),
+]
+
+
+def ink_ratio(gray: Image.Image) -> float:
+    """Fraction of pixels darker than `INK_THRESHOLD` in a grayscale image."""
+    histogram = gray.histogram()
+    total = gray.width * gray.height
+    return sum(histogram[:INK_THRESHOLD]) / total if total else 0.0
+
+
+def is_blank(gray: Image.Image) -> bool:
+    """True when a page has (almost) no solid ink once scanner speckle is removed."""
+    despeckled = gray.filter(ImageFilter.MedianFilter(3))
+    return sum(despeckled.histogram()[:SOLID_INK_THRESHOLD]) < BLANK_MAX_INK_PIXELS
+
+
+def content_bbox(gray: Image.Image) -> Optional[tuple]:
+    """Bounding box of the inked area (with a small margin), or None if there is none."""
+    mask = ImageOps.invert(gray).point(lambda p: 255 if p > 255 - INK_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    return (
+        max(left - CROP_MARGIN, 0),
+        max(top - CROP_MARGIN, 0),
+        min(right + CROP_MARGIN, gray.width),
+        min(bottom + CROP_MARGIN, gray.height),
+    )
+
+
+def text_digest(page: pymupdf.Page) -> str:
+    """Digest of the page's whitespace-normalised text layer ("" for pure scans)."""
+    text = " ".join(page.get_text("text").split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest() if text else ""
+
+
+def duplicate_key(record: Dict) -> Optional[Tuple[str, str]]:
+    """
+    Key of an optimized page record under which identical pages meet, or None
+    for a blank page.
+
+    Detection is exact-match only: pages are duplicates when their text layer
+    and their cropped content pixels are identical, e.g. the same page uploaded
+    twice. A re-scanned page differs in its pixels and is transcribed again; a
+    perceptual hash cannot tell it from a page with one changed figure.
+    """
+    if record.get("pixel_digest") is None:
+        return None
+    return record["text_digest"], record["pixel_digest"]
+
+
+def optimize_page(page: pymupdf.Page, max_dpi: int = 150) -> Dict:
+    """
+    Renders a page to the smallest image the VLM can still read reliably.
+
+    The page is rendered in grayscale, cropped to its content bounding box and
+    re-encoded at a resolution and JPEG quality picked by its ink density.
+
+    Args:
+        page (pymupdf.Page): The page to render.
+        max_dpi (int): Upper bound on the output resolution.
+
+    Returns:
+        dict: `page` (1-based number), `image` (JPEG bytes, None if blank),
+        `blank`, `text_digest`, `pixel_digest` (digest of the content pixels,
+        None if blank),
+        `density` (ink share of the cropped content) and `coverage` (ink share
+        of the whole page, small for short pages).
+    """
+    pix = page.get_pixmap(dpi=ANALYSIS_DPI, colorspace=pymupdf.csGRAY)
+    gray = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    record = {
+        "page": page.number + 1,
+        "image": None,
+        "pixel_digest": None,
+        "text_digest": text_digest(page),
+    }
+
+    bbox = content_bbox(gray)
+    if bbox is None or is_blank(gray):
+        return {**record, "blank": True, "density": 0.0, "coverage": 0.0}
+
+    content = gray.crop(bbox)
+    density = ink_ratio(content)
+    dpi, quality = next(
+        (min(dpi, max_dpi), quality)
+        for min_density, dpi, quality in DENSITY_TIERS
+        if density >= min_density
+    )
+    if dpi < ANALYSIS_DPI:
+        scale = dpi / ANALYSIS_DPI
+        content_size = (
+            max(int(content.width * scale), 1),
+            max(int(content.height * scale), 1),
+        )
+        output = content.resize(content_size, Image.LANCZOS)
+    else:
+        output = content
+
+    buffer = io.BytesIO()
+    output.save(buffer, "JPEG", quality=quality, optimize=True)
+    return {
+        **record,
+        "image": buffer.getvalue(),
+        "blank": False,
+        "pixel_digest": hashlib.sha1(content.tobytes()).hexdigest(),
+        "density": round(density, 4),
+        "coverage": round(ink_ratio(gray), 4),
+    }
@@ -0,0 +1,75 @@
+import asyncio
+import importlib.util
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Coroutine
+
+import httpx
+
+# HTTP/2 needs the optional `h2` package (`pip install httpx[http2]`)
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+class EventLoopThread:
+    """
+    An asyncio event loop running forever in a daemon thread.
+
+    Async clients keep their pooled connections bound to the loop that
+    opened them, so running every coroutine of the process on this one loop
+    (rather than a new loop per `asyncio.run`) lets them reuse connections.
+    """
+
+    def __init__(self, name: str = "event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedules a coroutine on the loop; returns a `concurrent.futures.Future`."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        """Runs a coroutine on the loop and blocks the calling thread for its result."""
+        return self.submit(coro).result(timeout)
+
+
+@lru_cache(maxsize=1)
+def get_event_loop_thread() -> EventLoopThread:
+    """The event loop shared by the whole process."""
+    return EventLoopThread()
+
+
+def run_async(coro: Coroutine, timeout: float = None) -> Any:
+    """Drop-in for `asyncio.run` from sync code, on the shared event loop."""
+    return get_event_loop_thread().run(coro, timeout)
+
+
+@lru_cache(maxsize=None)
+def get_http_client(
+    name: str, max_connections: int = 100, keepalive: int = 20
+) -> httpx.AsyncClient:
+    """
+    Pooled async HTTP client shared by every model of one endpoint.
+
+    Connections are kept alive between requests (and multiplexed over
+    HTTP/2 when `h2` is installed). Use it only on the shared event loop.
+
+    Args:
+        name (str): The endpoint, e.g. `openai` or `vlm`; one client each.
+        max_connections (int): Open connections at most.
+        keepalive (int): Idle connections kept open.
+    """
+    return httpx.AsyncClient(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=60,
+        ),
+        timeout=httpx.Timeout(600, connect=10),
+    )
@@ -0,0 +1,236 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.helpers import flatten_json2dots
+
+# "items[1]" and "items.1" both address items of the list "items"
+_LIST_INDEX = re.compile(r"\[\d+\]$")
+
+
+class _Unit:
+    """A schema leaf, or a list of objects whose items are checked as a whole."""
+
+    __slots__ = ("path", "parts", "kind", "leaf_paths", "item_index")
+
+    def __init__(self, path, parts, kind, leaf_paths, item_index=None):
+        self.path = path
+        self.parts = parts
+        self.kind = kind  # "value", "list" (of primitives) or "items" (of objects)
+        self.leaf_paths = leaf_paths
+        self.item_index = item_index
+
+
+class SchemaIndex:
+    """
+    A form schema compiled once into its leaf paths.
+
+    The schema is split into units in schema order: one per primitive or
+    list-of-primitives leaf, and one per list of objects (whose items are
+    checked against a nested index). Each unit keeps its path split into keys,
+    so checking it is a short walk from the root and no path strings are built
+    at check time.
+
+    A leaf is missing when its value is empty ("" or None, or an empty list).
+    A missing object (or a value where the schema has an object) counts as
+    all of its leaves missing, while a value or list key absent from an
+    object that exists is not reported at all.
+    """
+
+    def __init__(self, schema: Dict, prefix: str = ""):
+        self.schema = schema
+        self.units: List[_Unit] = []
+        # Units at or below each schema path (objects included)
+        self.units_under: Dict[str, List[int]] = {}
+        self._compile(schema, prefix, (), prefix)
+
+    def _compile(self, node: Dict, prefix: str, parts: tuple, path: str) -> None:
+        first = len(self.units)
+        for key, value in node.items():
+            full_key = f"{prefix}.{key}" if prefix else key
+            key_parts = parts + (key,)
+            if isinstance(value, dict):
+                self._compile(value, full_key, key_parts, full_key)
+                continue
+            if isinstance(value, list) and value and isinstance(value[0], dict):
+                item_index = SchemaIndex(value[0], full_key)
+                unit = _Unit(
+                    full_key, key_parts, "items", item_index.leaf_paths(), item_index
+                )
+            elif isinstance(value, list):
+                unit = _Unit(full_key, key_parts, "list", [full_key])
+            else:
+                unit = _Unit(full_key, key_parts, "value", [full_key])
+            self.units_under[full_key] = [len(self.units)]
+            self.units.append(unit)
+        if path:
+            self.units_under[path] = list(range(first, len(self.units)))
+
+    def leaf_paths(self) -> List[str]:
+        """All leaf paths, lists of objects entered at their item schema."""
+        return [path for unit in self.units for path in unit.leaf_paths]
+
+    def unit_missing(self, i: int, data: Dict) -> List[str]:
+        """Missing leaf paths of unit `i` in `data`."""
+        unit = self.units[i]
+        last = len(unit.parts) - 1
+        value = data
+        for depth, key in enumerate(unit.parts):
+            if depth and not isinstance(value, dict):
+                # A value where the schema has an object: all of it is missing
+                return unit.leaf_paths
+            if not isinstance(value, dict) or key not in value:
+                # A missing object has all its leaves missing, a missing leaf
+                # of an existing object none
+                return unit.leaf_paths if depth < last else []
+            value = value[key]
+        if unit.kind == "value":
+            return [unit.path] if value in ("", None) else []
+        if not value:
+            return unit.leaf_paths
+        if unit.kind == "list":
+            return []
+        if not isinstance(value, (list, dict, str)):
+            return unit.leaf_paths
+        missing = []
+        for item in value:
+            missing.extend(unit.item_index.missing(item))
+        return missing
+
+    def missing(self, data: Dict) -> List[str]:
+        """Missing leaf paths of `data`, in schema order."""
+        missing = []
+        for i in range(len(self.units)):
+            missing.extend(self.unit_missing(i, data))
+        return missing
+
+    def schema_node(self, dotted_key: str) -> Optional[str]:
+        """The deepest schema path (unit or object) on a data key's path, if any."""
+        parts = [
+            _LIST_INDEX.sub("", part)
+            for part in dotted_key.split(".")
+            if not part.isdigit()
+        ]
+        for end in range(len(parts), 0, -1):
+            path = ".".join(parts[:end])
+            if path in self.units_under:
+                return path
+        return None
+
+    def section_units(self, dotted_key: str) -> List[int]:
+        """
+        Units of the form section (top-level key) that `dotted_key` belongs to.
+
+        Setting a key may replace any plain value or list on its path with an
+        object, but never changes another section.
+        """
+        return self.units_under.get(_LIST_INDEX.sub("", dotted_key.split(".")[0]), [])
+
+    def is_unit_key(self, dotted_key: str) -> bool:
+        """True if a data key lies at or below a unit, rather than on an object."""
+        path = self.schema_node(dotted_key)
+        return path is not None and self.units[self.units_under[path][0]].path == path
+
+
+class MissingKeyTracker:
+    """
+    Incrementally maintained missing keys and dotted keys of a form.
+
+    Built once per form with a full pass; after values are injected, `update`
+    re-checks and re-flattens only the form sections of the changed keys, so a
+    chat turn costs O(changed keys) rather than a walk of the whole form.
+    `missing` and `all_keys` are views cached until a re-checked unit
+    actually changes; treat them as read-only.
+    """
+
+    def __init__(self, index: SchemaIndex, data: Dict):
+        self.index = index
+        self.data = data
+        n_units = len(index.units)
+        self._missing = [index.unit_missing(i, data) for i in range(n_units)]
+        self._flat = [self._flatten_unit(i) for i in range(n_units)]
+        self._extra = self._flatten_extra()
+        self._missing_view: Optional[List[str]] = None
+        self._all_keys_view: Optional[Dict[str, Any]] = None
+
+    def _flatten_unit(self, i: int) -> Dict[str, Any]:
+        unit = self.index.units[i]
+        data = self.data
+        for depth, key in enumerate(unit.parts):
+            if not isinstance(data, dict):
+                # A value where the schema has an object, flattened at its own path
+                return flatten_json2dots(data, ".".join(unit.parts[:depth]))
+            if key not in data:
+                return {}
+            data = data[key]
+        return flatten_json2dots(data, unit.path)
+
+    def _flatten_extra(self) -> Dict[str, Any]:
+        """Keys of objects of the data that the schema does not have."""
+        return {
+            key: value
+            for key, value in flatten_json2dots(self.data).items()
+            if not self.index.is_unit_key(key) and self.index.schema_node(key) != key
+        }
+
+    @property
+    def missing(self) -> List[str]:
+        """Missing leaf paths, as `SchemaIndex.missing` lists them."""
+        if self._missing_view is None:
+            self._missing_view = [path for paths in self._missing for path in paths]
+        return self._missing_view
+
+    @property
+    def all_keys(self) -> Dict[str, Any]:
+        """Dotted keys and values of the form, as `flatten_json2dots` returns them."""
+        if self._all_keys_view is None:
+            flat = {}
+            for unit_flat in self._flat:
+                flat.update(unit_flat)
+            flat.update(self._extra)
+            self._all_keys_view = flat
+        return self._all_keys_view
+
+    def update(self, changed_keys: Iterable[str], data: Dict = None) -> List[str]:
+        """
+        Re-checks the sections of `changed_keys` after they were set in the form.
+
+        Args:
+            changed_keys (Iterable[str]): Dotted keys that were written.
+            data (dict): The form, if it was replaced rather than edited in place.
+
+        Returns:
+            list: The missing leaf paths (the cached view, copy it to edit it).
+        """
+        if data is not None:
+            self.data = data
+        dirty, extra_changed = set(), False
+        for key in changed_keys:
+            dirty.update(self.index.section_units(key))
+            # Only writes outside the units can add or drop keys unknown to the schema
+            extra_changed = extra_changed or not self.index.is_unit_key(key)
+        for i in dirty:
+            missing = self.index.unit_missing(i, self.data)
+            if missing != self._missing[i]:
+                self._missing[i] = missing
+                self._missing_view = None
+            flat = self._flatten_unit(i)
+            if flat != self._flat[i]:
+                self._flat[i] = flat
+                self._all_keys_view = None
+        if extra_changed:
+            extra = self._flatten_extra()
+            if extra != self._extra:
+                self._extra = extra
+                self._all_keys_view = None
+        return self.missing
+
+
+_INDEXES: Dict[int, SchemaIndex] = {}
+
+
+def get_schema_index(schema: Dict) -> SchemaIndex:
+    """Returns the compiled index of a schema, compiling it on first use."""
+    index = _INDEXES.get(id(schema))
+    if index is None or index.schema is not schema:
+        index = _INDEXES[id(schema)] = SchemaIndex(schema)
+    return index
@@ -0,0 +1,193 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import ormsgpack
+from loguru import logger
+
+
+def pack(value: Any) -> bytes:
+    return ormsgpack.packb(value, default=str)
+
+
+def unpack(data: bytes) -> Any:
+    return ormsgpack.unpackb(data)
+
+
+class SessionStore:
+    """
+    Durable per-session state (form, extraction artifacts, chat history) in SQLite.
+
+    Writes are write-behind: `put` and `put_messages` serialize the values at
+    once (later in-place edits do not leak into the snapshot) and queue them;
+    a daemon thread commits everything queued in one transaction every
+    `flush_interval` seconds. Values whose bytes did not change since the
+    last `put` are not written again, and chat messages are appended, so
+    saving a whole session after every rerun costs only what changed.
+    A crash loses at most the last `flush_interval` seconds of writes.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        # Queued writes: (session_id, key) -> bytes, and (session_id, seq) -> bytes
+        self._values: Dict[Tuple[str, str], bytes] = {}
+        self._messages: Dict[Tuple[str, int], bytes] = {}
+        self._truncate: Dict[str, int] = {}
+        # What was last put per session, to skip unchanged values
+        self._hashes: Dict[Tuple[str, str], int] = {}
+        self._message_counts: Dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_values ("
+            "session_id TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+            "PRIMARY KEY (session_id, key))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "session_id TEXT NOT NULL, seq INTEGER NOT NULL, message BLOB NOT NULL, "
+            "PRIMARY KEY (session_id, seq))"
+        )
+        self.conn.commit()
+
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._flush_loop, name="session-store", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, session_id: str, **values) -> None:
+        """Queues the values of a session; unchanged ones are skipped."""
+        packed = {key: pack(value) for key, value in values.items()}
+        with self.lock:
+            for key, data in packed.items():
+                digest = hash(data)
+                if self._hashes.get((session_id, key)) == digest:
+                    continue
+                self._hashes[(session_id, key)] = digest
+                self._values[(session_id, key)] = data
+
+    def put_messages(self, session_id: str, messages: List[Dict]) -> None:
+        """Queues the messages of a chat history that were not saved yet."""
+        with self.lock:
+            saved = self._message_counts.get(session_id, 0)
+            if len(messages) < saved:
+                # The history was cut: rewrite it from the first dropped message
+                self._truncate[session_id] = saved = len(messages)
+            for seq in range(saved, len(messages)):
+                self._messages[(session_id, seq)] = pack(messages[seq])
+            self._message_counts[session_id] = len(messages)
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.info(f"[ERROR: Session store flush failed] {e}")
+
+    def flush(self) -> None:
+        """Commits all queued writes in one transaction."""
+        with self.lock:
+            values, self._values = self._values, {}
+            messages, self._messages = self._messages, {}
+            truncate, self._truncate = self._truncate, {}
+            if not (values or messages or truncate):
+                return
+            now = time.time()
+            sessions = {sid for sid, _ in values} | {sid for sid, _ in messages}
+            sessions |= set(truncate)
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO sessions (id, created, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET updated = excluded.updated",
+                    [(sid, now, now) for sid in sessions],
+                )
+                self.conn.executemany(
+                    "DELETE FROM messages WHERE session_id = ? AND seq >= ?",
+                    list(truncate.items()),
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO session_values (session_id, key, value) "
+                    "VALUES (?, ?, ?)",
+                    [(sid, key, data) for (sid, key), data in values.items()],
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO messages (session_id, seq, message) "
+                    "VALUES (?, ?, ?)",
+                    [(sid, seq, data) for (sid, seq), data in messages.items()],
+                )
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The saved state of a session, or None if it was never saved.
+
+        Returns:
+            dict: The values put for the session, with its chat messages
+                under `chat_history`.
+        """
+        self.flush()
+        with self.lock:
+            if not self.conn.execute(
+                "SELECT 1 FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone():
+                return None
+            rows = self.conn.execute(
+                "SELECT key, value FROM session_values WHERE session_id = ?",
+                (session_id,),
+            ).fetchall()
+            messages = self.conn.execute(
+                "SELECT message FROM messages WHERE session_id = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+            for key, data in rows:
+                self._hashes[(session_id, key)] = hash(data)
+            self._message_counts[session_id] = len(messages)
+        state = {key: unpack(data) for key, data in rows}
+        state["chat_history"] = [unpack(message) for (message,) in messages]
+        return state
+
+    def delete(self, session_id: str) -> None:
+        """Drops a session and anything still queued for it."""
+        with self.lock:
+            self._values = {k: v for k, v in self._values.items() if k[0] != session_id}
+            self._messages = {
+                k: v for k, v in self._messages.items() if k[0] != session_id
+            }
+            self._truncate.pop(session_id, None)
+            self._hashes = {k: v for k, v in self._hashes.items() if k[0] != session_id}
+            self._message_counts.pop(session_id, None)
+            with self.conn:
+                for table, column in (
+                    ("session_values", "session_id"),
+                    ("messages", "session_id"),
+                    ("sessions", "id"),
+                ):
+                    self.conn.execute(
+                        f"DELETE FROM {table} WHERE {column} = ?", (session_id,)
+                    )
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,215 @@
+import json
+import re
+from typing import Any, List, Tuple
+
+import orjson
+
+# Literals LLMs emit that JSON has no value for, read as null
+LITERALS = {
+    "true": True,
+    "false": False,
+    "null": None,
+    "undefined": None,
+    "NaN": None,
+    "Infinity": None,
+    "-Infinity": None,
+}
+# A number or literal ends at whitespace, a separator or a comment
+_SCALAR_END = re.compile(r"[\s,:\]\}/]")
+_WHITESPACE = " \t\r\n"
+# Marks that no root value has started yet
+_MISSING = object()
+
+
+def _join(prefix: str, key: Any) -> str:
+    return f"{prefix}.{key}" if prefix else str(key)
+
+
+def _loads_string(token: str) -> str:
+    try:
+        return orjson.loads(token)
+    except orjson.JSONDecodeError:
+        # Raw control characters (e.g. newlines) inside a string
+        return json.loads(token, strict=False)
+
+
+class _Frame:
+    __slots__ = ("container", "prefix", "key", "expect")
+
+    def __init__(self, container, prefix: str):
+        self.container = container
+        self.prefix = prefix
+        self.key = None
+        self.expect = "key" if isinstance(container, dict) else "value"
+
+
+class StreamingJSONParser:
+    """
+    Incremental JSON parser for streamed LLM replies.
+
+    `feed` consumes chunks of the reply as they arrive and returns the values
+    completed by each chunk as `(dotted_path, value)` events, with the paths
+    `flatten_json2dots` gives (`claimant.full_name`, `details.0`). The
+    `clean_json_string` repairs are applied while parsing: text around the
+    JSON value (such as markdown fences) is skipped, `//` and `/* */`
+    comments and trailing commas are ignored, and `undefined`, `NaN` and
+    `Infinity` are read as null. Unlike the regex repairs, string contents
+    are left untouched.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._root = _MISSING
+        self._stack: List[_Frame] = []
+        self._buf = ""
+        self._pos = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Parses a chunk of the reply; returns the values it completed."""
+        events = []
+        if not self.done and chunk:
+            self._buf = self._buf[self._pos :] + chunk
+            self._pos = 0
+            self._parse(events, final=False)
+        return events
+
+    def close(self) -> Any:
+        """Parses what is left of the reply and returns the parsed value.
+
+        Raises:
+            ValueError: If the reply holds no complete JSON value.
+        """
+        if not self.done:
+            self._parse([], final=True)
+        if not self.done:
+            raise ValueError("Incomplete JSON in the reply")
+        return self._root
+
+    def _parse(self, events: List, final: bool) -> None:
+        buf, pos, n = self._buf, self._pos, len(self._buf)
+        stack = self._stack
+        while pos < n and not self.done:
+            c = buf[pos]
+            if c in _WHITESPACE:
+                pos += 1
+                continue
+            if c == "/" and buf.startswith(("//", "/*"), pos):
+                end_mark = "\n" if buf[pos + 1] == "/" else "*/"
+                end = buf.find(end_mark, pos + 2)
+                if end < 0:
+                    if not final:
+                        break
+                    end = n
+                pos = end + len(end_mark)
+                continue
+            if c == "/" and pos + 1 == n and not final:
+                break  # May be the start of a comment
+            if not stack:
+                if c in "{[":
+                    self._open({} if c == "{" else [])
+                pos += 1  # Text before the JSON value is skipped
+                continue
+            frame = stack[-1]
+            if c in "{[":
+                self._open({} if c == "{" else [])
+                pos += 1
+            elif c in "}]":
+                stack.pop()
+                if stack:
+                    stack[-1].expect = "comma"
+                else:
+                    self.done = True
+                pos += 1
+            elif c == ",":
+                frame.expect = "key" if isinstance(frame.container, dict) else "value"
+                pos += 1
+            elif c == ":":
+                frame.expect = "value"
+                pos += 1
+            elif c == '"':
+                end = self._string_end(buf, pos)
+                if end < 0:
+                    if final:
+                        raise ValueError("Unterminated string in the reply")
+                    break
+                value = _loads_string(buf[pos : end + 1])
+                pos = end + 1
+                if frame.expect == "key":
+                    frame.key, frame.expect = value, "colon"
+                else:
+                    self._value(value, events)
+            else:
+                match = _SCALAR_END.search(buf, pos)
+                if match is None and not final:
+                    break  # The token may continue in the next chunk
+                end = match.start() if match else n
+                if end == pos:
+                    raise ValueError(f"Unexpected {c!r} in the reply")
+                self._value(self._scalar(buf[pos:end]), events)
+                pos = end
+        self._pos = pos
+
+    @staticmethod
+    def _string_end(buf: str, start: int) -> int:
+        """Index of the quote closing the string opened at `start`, or -1."""
+        i = start + 1
+        while True:
+            end = buf.find('"', i)
+            if end < 0:
+                return -1
+            backslashes = 0
+            while buf[end - 1 - backslashes] == "\\":
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return end
+            i = end + 1
+
+    @staticmethod
+    def _scalar(token: str) -> Any:
+        if token in LITERALS:
+            return LITERALS[token]
+        try:
+            return orjson.loads(token)
+        except orjson.JSONDecodeError:
+            raise ValueError(f"Invalid JSON value {token!r} in the reply")
+
+    def _place(self, value: Any) -> str:
+        """Stores a value in the open container; returns its dotted path."""
+        frame = self._stack[-1]
+        frame.expect = "comma"
+        if isinstance(frame.container, dict):
+            if frame.key is None:
+                raise ValueError("Object value without a key in the reply")
+            frame.container[frame.key] = value
+            return _join(frame.prefix, frame.key)
+        frame.container.append(value)
+        return _join(frame.prefix, len(frame.container) - 1)
+
+    def _open(self, container) -> None:
+        if self._stack:
+            prefix = self._place(container)
+        else:
+            self._root, prefix = container, ""
+        self._stack.append(_Frame(container, prefix))
+
+    def _value(self, value: Any, events: List) -> None:
+        events.append((self._place(value), value))
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parses a complete LLM reply holding JSON.
+
+    Valid JSON is parsed by orjson directly; replies needing the
+    `clean_json_string` repairs (or wrapped in text) go through
+    `StreamingJSONParser`.
+
+    Raises:
+        ValueError: If no JSON value can be read from the reply.
+    """
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        parser = StreamingJSONParser()
+        parser.feed(text)
+        return parser.close()
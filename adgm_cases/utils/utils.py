@@ -1,27 +1,183 @@
+import asyncio
+import hashlib
+import multiprocessing
 import os
-from typing import Optional, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Dict, Iterator, Optional, List, Set, Tuple
 from loguru import logger
+import pymupdf
 import pymupdf4llm
-from pdf2image import convert_from_path
 from tqdm import tqdm
 
+from utils.cache import DiskCache, content_hash, document_id
+from utils.page_optimizer import optimize_page
+
+_RENDER_POOL: Optional[ProcessPoolExecutor] = None
+_MARKDOWN_CACHE: Optional[DiskCache] = None
+
+
+def render_workers() -> int:
+    """Number of worker processes of the shared pool (`RENDER_WORKERS`, or one per core)."""
+    return int(os.getenv("RENDER_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """
+    Returns the process-wide rasterisation pool, creating it on first use.
+
+    It also runs PDF-to-markdown parsing, so CPU-bound PDF work shares one set
+    of workers instead of oversubscribing the cores. The pool is sized to the
+    available cores and uses the `spawn` start method, so worker processes
+    never inherit the server's threads or open documents.
+    """
+    global _RENDER_POOL
+    if _RENDER_POOL is None:
+        workers = render_workers()
+        _RENDER_POOL = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Started rasterisation pool with {workers} worker(s)")
+    return _RENDER_POOL
+
+
+def _render_page(page: pymupdf.Page, dpi: int, jpg_quality: int) -> bytes:
+    pix = page.get_pixmap(dpi=dpi)
+    return pix.tobytes(output="jpeg", jpg_quality=jpg_quality)
+
+
+def _render_page_range(
+    pdf_path: str,
+    page_indices: List[int],
+    dpi: int,
+    jpg_quality: int,
+    optimize: bool = False,
+) -> List[Dict]:
+    """Renders the given (0-based) pages of a PDF. Runs inside a rasterisation worker."""
+    with pymupdf.open(pdf_path) as doc:
+        if optimize:
+            return [optimize_page(doc[i]) for i in page_indices]
+        return [
+            {"page": i + 1, "image": _render_page(doc[i], dpi, jpg_quality)}
+            for i in page_indices
+        ]
+
+
+def get_markdown_cache() -> DiskCache:
+    """Returns the process-wide cache of per-page markdown, opening it on first use."""
+    global _MARKDOWN_CACHE
+    if _MARKDOWN_CACHE is None:
+        from constants import CACHE_DIR
+
+        _MARKDOWN_CACHE = DiskCache(os.path.join(CACHE_DIR, "markdown.db"))
+    return _MARKDOWN_CACHE
+
+
+def page_fingerprint(page: pymupdf.Page) -> str:
+    """Hash of what a page draws: its content stream, geometry, images and fonts."""
+    parts = [page.read_contents(), str(page.rect), str(page.rotation)]
+    for image in page.get_images(full=True):
+        parts.append(page.parent.xref_stream_raw(image[0]) or b"")
+    # Font xrefs change when a file is rewritten, their names do not
+    parts.extend(f"{font[3]}/{font[5]}" for font in page.get_fonts(full=True))
+    return content_hash(*parts)
+
+
+def _fingerprint_pages(pdf_path: str) -> List[str]:
+    """Fingerprints every page of a PDF. Runs inside a worker."""
+    with pymupdf.open(pdf_path) as doc:
+        return [page_fingerprint(page) for page in doc]
+
+
+def _convert_page_range(pdf_path: str, page_indices: List[int], hdr_info) -> List[str]:
+    """Converts the given (0-based) pages to cleaned markdown, one string per page.
+    Runs inside a worker."""
+    with pymupdf.open(pdf_path) as doc:
+        chunks = pymupdf4llm.to_markdown(
+            doc,
+            pages=page_indices,
+            hdr_info=hdr_info,
+            page_chunks=True,
+            show_progress=False,
+        )
+    return [PDF2MD.cleaning_md_4llm(chunk["text"]) for chunk in chunks]
+
+
+def _identify_headers(pdf_path: str):
+    """Header levels from the font sizes of the whole file, as a single
+    `to_markdown` call computes them. Runs inside a worker."""
+    with pymupdf.open(pdf_path) as doc:
+        return pymupdf4llm.IdentifyHeaders(doc)
+
 
 class PDF2MD:
     @staticmethod
-    def parse_pdf_2_md(pdf_path) -> Optional[str]:
+    def parse_pdf_2_md(pdf_path, **kwargs) -> str:
         """
-        Converts the provided PDF to Markdown format using the PdfConverter engine.
+        Converts the provided PDF to Markdown format using pymupdf4llm.
+
+        Takes the options of `parse_pdf_pages`.
 
         Returns:
-            str: The Markdown content extracted from the PDF, or None if parsing fails.
+            str: The Markdown content extracted from the PDF.
+
+        Raises:
+            ValueError: If the PDF could not be parsed.
+        """
+        return "\n".join(PDF2MD.parse_pdf_pages(pdf_path, **kwargs))
+
+    @staticmethod
+    def parse_pdf_pages(
+        pdf_path,
+        shard_size: int = 16,
+        executor: ProcessPoolExecutor = None,
+        cache: DiskCache = None,
+    ) -> List[str]:
+        """
+        Converts the provided PDF to cleaned Markdown, one string per page.
+
+        Pages are fingerprinted and converted on the worker pool, in shards of
+        `shard_size` pages, so the calling thread only waits. Header levels
+        are computed for the whole file when a page is missing. Pages are cached
+        by fingerprint alone: a cached page keeps the header levels of the
+        document it was converted in, so adding a page to a file converts
+        only that page even when it shifts the file's font statistics.
+        Blocks the calling thread.
+
+        :param shard_size: Pages per conversion task.
+        :param executor: Process pool to use, defaults to `get_render_pool()`.
+        :param cache: Per-page markdown cache, defaults to `get_markdown_cache()`.
         """
         try:
-            # Assuming the pdf_engine call returns an object with 'markdown' attribute
-            logger.info("Running Conversion...")
-            md_text = pymupdf4llm.to_markdown(pdf_path)
-            logger.info("Running Cleaning...")
-            md_text = PDF2MD.cleaning_md_4llm(md_text)
-            return md_text
+            cache = cache or get_markdown_cache()
+            executor = executor or get_render_pool()
+            fingerprints = executor.submit(_fingerprint_pages, pdf_path).result()
+            keys = [
+                content_hash("md4llm", pymupdf4llm.__version__, fingerprint)
+                for fingerprint in fingerprints
+            ]
+            pages = [cache.get_text(key) for key in keys]
+            missing = [i for i, page in enumerate(pages) if page is None]
+            shards = [
+                missing[i : i + shard_size] for i in range(0, len(missing), shard_size)
+            ]
+
+            logger.info(
+                f"Running Conversion of {len(missing)}/{len(pages)} page(s) "
+                f"in {len(shards)} shard(s)..."
+            )
+            if shards:
+                hdr_info = executor.submit(_identify_headers, pdf_path).result()
+                converted = executor.map(
+                    _convert_page_range,
+                    [pdf_path] * len(shards),
+                    shards,
+                    [hdr_info] * len(shards),
+                )
+                for shard, texts in zip(shards, converted):
+                    for i, text in zip(shard, texts):
+                        pages[i] = text
+                        cache.set_text(keys[i], text)
+            return pages
         except Exception as e:
             logger.info(f"Error while converting PDF to markdown: {e}")
             raise ValueError(e)
@@ -41,10 +197,18 @@ class PDF2MD:
 
         return "\n".join(clean_lines)
 
+    @staticmethod
+    def upload_hash(uploaded_file) -> str:
+        """SHA-256 hex digest of the bytes of an uploaded file."""
+        return hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+
     @staticmethod
     # Function to save uploaded file
     def save_uploaded_file(session_id, uploaded_file):
-        temp_dir = os.path.join(session_id, "temp_pdfs")
+        # Stored under the document id, so two files with the same name never
+        # overwrite each other
+        doc_id = document_id(PDF2MD.upload_hash(uploaded_file))
+        temp_dir = os.path.join(session_id, "temp_pdfs", doc_id)
         os.makedirs(temp_dir, exist_ok=True)
         file_path = os.path.join(temp_dir, uploaded_file.name)
 
@@ -54,30 +218,163 @@ class PDF2MD:
         return file_path  # Return local file path
 
     @staticmethod
-    def pdf_to_images(
-        pdf_path: str, output_folder: str = None, dpi: int = 100
-    ) -> List[str]:
+    def page_count(pdf_path: str) -> int:
+        """Returns the number of pages in a PDF without rendering any of them."""
+        with pymupdf.open(pdf_path) as doc:
+            return doc.page_count
+
+    @staticmethod
+    def iter_pages(
+        pdf_path: str,
+        dpi: int = 100,
+        jpg_quality: int = 85,
+        debug_folder: str = None,
+    ) -> Iterator[Tuple[int, bytes]]:
         """
-        Converts a PDF file into a list of image file paths.
+        Lazily rasterises the pages of a PDF to JPEG bytes, one page at a time.
+
+        Only the page currently being rendered is held in memory, so callers
+        can bound memory by how many yielded pages they keep around.
 
         :param pdf_path: Path to the PDF file.
-        :param output_folder: Folder to save images (optional, uses temp directory if not provided).
-        :param dpi: Resolution for image conversion (default: 300 DPI).
-        :return: List of file paths for the extracted images.
+        :param dpi: Resolution for rasterisation (default: 100 DPI).
+        :param jpg_quality: JPEG quality of the encoded pages.
+        :param debug_folder: When set, each page is also written there as `page_N.jpg`.
+        :return: Iterator of `(page_number, jpeg_bytes)`, page numbers starting at 1.
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"The file {pdf_path} does not exist.")
 
-        if output_folder and not os.path.exists(output_folder):
-            os.makedirs(output_folder)
+        if debug_folder:
+            os.makedirs(debug_folder, exist_ok=True)
+
+        with pymupdf.open(pdf_path) as doc:
+            for i, page in enumerate(doc):
+                image = _render_page(page, dpi, jpg_quality)
+
+                if debug_folder:
+                    PDF2MD.save_page_image(debug_folder, i + 1, image)
+
+                yield i + 1, image
+
+    @staticmethod
+    async def aiter_pages(
+        pdf_path: str,
+        dpi: int = 100,
+        jpg_quality: int = 85,
+        shard_size: int = 4,
+        executor: ProcessPoolExecutor = None,
+        workers: int = None,
+        debug_folder: str = None,
+        optimize: bool = False,
+        skip_pages: Set[int] = frozenset(),
+    ) -> AsyncIterator[Dict]:
+        """
+        Rasterises a PDF across a process pool, sharded by page range.
+
+        Shards are submitted ahead of consumption, at most two per pool worker,
+        and pages are yielded in page order as their shard completes. Memory stays
+        bounded by the shards in flight and the event loop is never blocked.
+
+        :param pdf_path: Path to the PDF file.
+        :param dpi: Resolution for rasterisation (default: 100 DPI).
+        :param jpg_quality: JPEG quality of the encoded pages.
+        :param shard_size: Number of consecutive pages rendered per task.
+        :param executor: Process pool to render in (defaults to the shared pool).
+        :param workers: Worker processes of `executor`, defaults to `render_workers()`.
+        :param debug_folder: When set, each page is also written there as `page_N.jpg`.
+        :param optimize: Crop, grayscale and adaptively re-encode pages and flag
+            blank ones (see `utils.page_optimizer.optimize_page`); `dpi` and
+            `jpg_quality` are then chosen per page.
+        :param skip_pages: Page numbers (1-based) not to render, e.g. already transcribed.
+        :return: Async iterator of page records with at least `page` (1-based) and
+            `image` (JPEG bytes, None for blank optimized pages).
+        """
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"The file {pdf_path} does not exist.")
+
+        if debug_folder:
+            os.makedirs(debug_folder, exist_ok=True)
+
+        loop = asyncio.get_running_loop()
+        executor = executor or get_render_pool()
+        max_inflight = 2 * (workers or render_workers())
+        to_render = [
+            i for i in range(PDF2MD.page_count(pdf_path)) if i + 1 not in skip_pages
+        ]
+        shards = iter(range(0, len(to_render), shard_size))
+
+        def submit(start):
+            return loop.run_in_executor(
+                executor,
+                _render_page_range,
+                pdf_path,
+                to_render[start : start + shard_size],
+                dpi,
+                jpg_quality,
+                optimize,
+            )
 
-        images = convert_from_path(pdf_path, dpi=dpi)
-        image_paths = []
+        inflight = [submit(start) for _, start in zip(range(max_inflight), shards)]
+        try:
+            while inflight:
+                rendered = await inflight.pop(0)
+                next_start = next(shards, None)
+                if next_start is not None:
+                    inflight.append(submit(next_start))
+                for record in rendered:
+                    if debug_folder and record["image"]:
+                        PDF2MD.save_page_image(
+                            debug_folder, record["page"], record["image"]
+                        )
+                    yield record
+        finally:
+            for future in inflight:
+                future.cancel()
+
+    @staticmethod
+    def render_pages(
+        pdf_path: str,
+        dpi: int = 100,
+        jpg_quality: int = 85,
+        debug_folder: str = None,
+    ) -> List[bytes]:
+        """
+        Rasterises every page of a PDF straight to JPEG bytes in memory.
+
+        Prefer `iter_pages` for large PDFs, this materialises all pages at once.
 
-        for i, image in tqdm(enumerate(images), total=len(images)):
-            image_filename = f"page_{i + 1}.jpg"
-            image_path = os.path.join(output_folder or os.getcwd(), image_filename)
-            image.save(image_path, "JPEG")
-            image_paths.append(image_path)
+        :param pdf_path: Path to the PDF file.
+        :param dpi: Resolution for rasterisation (default: 100 DPI).
+        :param jpg_quality: JPEG quality of the encoded pages.
+        :param debug_folder: When set, each page is also written there as `page_N.jpg`.
+        :return: List of JPEG-encoded pages, in page order.
+        """
+        pages = PDF2MD.iter_pages(pdf_path, dpi, jpg_quality, debug_folder)
+        return [image for _, image in tqdm(pages)]
 
-        return image_paths
+    @staticmethod
+    def save_page_image(folder: str, page_number: int, image: bytes) -> str:
+        """Writes an encoded page to `folder/page_N.jpg` (debug output)."""
+        image_path = os.path.join(folder, f"page_{page_number}.jpg")
+        with open(image_path, "wb") as f:
+            f.write(image)
+        return image_path
+
+    @staticmethod
+    def pdf_to_images(
+        pdf_path: str, output_folder: str = None, dpi: int = 100
+    ) -> List[str]:
+        """
+        Converts a PDF file into a list of image file paths.
+
+        :param pdf_path: Path to the PDF file.
+        :param output_folder: Folder to save images (optional, uses the current directory if not provided).
+        :param dpi: Resolution for image conversion (default: 100 DPI).
+        :return: List of file paths for the extracted images.
+        """
+        output_folder = output_folder or os.getcwd()
+        pages = PDF2MD.render_pages(pdf_path, dpi=dpi, debug_folder=output_folder)
+        return [
+            os.path.join(output_folder, f"page_{i + 1}.jpg") for i in range(len(pages))
+        ]
@@ -0,0 +1,147 @@
+"""
+Markdown rule engine throughput benchmark.
+
+Runs `txt2md_converter` over synthetic multi-megabyte claim texts and reports
+MB/sec, next to the previous per-line implementation (kept below as a
+reference) to check the outputs still match. The two run alternately, so
+neither is favoured by the order of the runs.
+
+Usage:
+    python benchmarks/bench_md_rules.py [--mb 8] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "adgm_cases"))
+)
+
+from utils.helpers import txt2md_converter
+
+CLAIM_LINES = [
+    "Unpaid Salary Claim",
+    "The Claimant was employed by the Defendant as a Senior Accountant from 1 March 2021.",
+    "- Outstanding salary for January and February",
+    "• End of service gratuity calculated under the Employment Regulations",
+    "○ Annual leave not taken in 2023",
+    "{n} Basic salary AED 12,500.00",
+    "{n} Housing allowance USD 3,000.00",
+    "{n} Notice period pay",
+    "Total amount claimed AED 71,450.00",
+    "Grand Total: SAR 9,000.50",
+    "The Defendant agreed to pay AED 33,000 on 15 April 2024 but never did.",
+    "Particulars of claim:",
+    "",
+]
+
+
+def make_text(lines, n_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out, size = [], 0
+    while size < n_bytes:
+        line = rng.choice(lines).format(n=rng.randint(1, 40))
+        out.append(line)
+        size += len(line) + 1
+    return "\n".join(out)
+
+
+def legacy_txt2md_converter(text: str) -> str:
+    markdown_lines = []
+    money_pattern = re.compile(r"(?:AED|USD|SAR)\s?\d+(?:,\d{3})*(?:\.\d{0,2})?")
+    for line in text.strip().splitlines():
+        original_line = line.strip()
+        if not original_line:
+            continue
+        is_money = bool(money_pattern.search(original_line))
+        if (
+            2 <= len(original_line.split()) <= 5
+            and not original_line.endswith((".", ":", "..."))
+            and not any(
+                original_line.startswith(prefix)
+                for prefix in ["-", "○", "•", "*", "1 ", "2 ", "3 "]
+            )
+        ):
+            markdown_lines.append(f"### {original_line}")
+            continue
+        if original_line.lstrip().startswith(("○", "-", "•", "*")):
+            content = original_line.lstrip("○-•* ").strip()
+            markdown_lines.append(f"- {content}")
+            continue
+        numbered_match = re.match(
+            r"^(\d+)\s+(.*?)(\s*(?:AED|USD|SAR)?\s?[\d{1,3},]*\d+\.\d{2})?$",
+            original_line,
+        )
+        if numbered_match:
+            idx = numbered_match.group(1)
+            item = numbered_match.group(2).strip()
+            amount = numbered_match.group(3)
+            if amount:
+                markdown_lines.append(f"{idx}. {item} **{amount.strip()}**")
+            else:
+                markdown_lines.append(f"{idx}. {item}")
+            continue
+        if re.match(
+            r"^\s*(-\s*)?(Total|Grand Total)\b.*?[\d{1,3},]*\d+\.\d{2}",
+            original_line,
+            re.IGNORECASE,
+        ):
+            markdown_lines.append(f"- **{original_line}**")
+            continue
+        if is_money:
+            markdown_lines.append(
+                money_pattern.sub(lambda m: f"**{m.group(0)}**", original_line)
+            )
+            continue
+        markdown_lines.append(original_line)
+    return "\n".join(markdown_lines)
+
+
+def best_of(fns, text: str, repeat: int):
+    """Best time and last result of each function, running them in turn."""
+    timings = [[] for _ in fns]
+    results = [None for _ in fns]
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter()
+            results[i] = fn(text)
+            timings[i].append(time.perf_counter() - start)
+    return [min(t) for t in timings], results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    n_bytes = int(args.mb * 1024**2)
+    cases = [
+        (
+            "txt2md",
+            make_text(CLAIM_LINES, n_bytes),
+            txt2md_converter,
+            legacy_txt2md_converter,
+        ),
+    ]
+
+    print(
+        f"{'rules':>8} {'engine MB/s':>12} {'legacy MB/s':>12} {'speedup':>8} {'same':>5}"
+    )
+    for name, text, engine, legacy in cases:
+        mb = len(text.encode("utf-8")) / 1024**2
+        (engine_time, legacy_time), (engine_out, legacy_out) = best_of(
+            (engine, legacy), text, args.repeat
+        )
+        print(
+            f"{name:>8} {mb / engine_time:>12.1f} {mb / legacy_time:>12.1f} "
+            f"{legacy_time / engine_time:>7.2f}x {str(engine_out == legacy_out):>5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
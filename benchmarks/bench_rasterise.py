@@ -0,0 +1,95 @@
+"""
+Rasterisation throughput benchmark.
+
+Renders the same PDF through `PDF2MD.aiter_pages` with process pools of
+increasing size and reports pages/sec for each, so scaling with core count
+can be checked on the target machine.
+
+Usage:
+    python benchmarks/bench_rasterise.py [path/to/file.pdf] [--pages 120] [--dpi 100]
+
+Without a PDF path a synthetic text-heavy document is generated.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "adgm_cases"))
+)
+
+import pymupdf
+
+from utils.utils import PDF2MD, _render_page_range
+
+LINE = "Outstanding salary for the month, end of service benefits AED 33,000.00 "
+
+
+def make_synthetic_pdf(path: str, n_pages: int) -> str:
+    doc = pymupdf.open()
+    for i in range(n_pages):
+        page = doc.new_page()
+        text = "\n".join(f"{j:02d}. {LINE}" for j in range(55))
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=8)
+        page.insert_text((36, page.rect.height - 20), f"Page {i + 1}", fontsize=8)
+    doc.save(path)
+    return path
+
+
+async def consume(pdf_path: str, dpi: int, executor: ProcessPoolExecutor) -> int:
+    n_pages = 0
+    async for _ in PDF2MD.aiter_pages(pdf_path, dpi=dpi, executor=executor):
+        n_pages += 1
+    return n_pages
+
+
+def bench(pdf_path: str, dpi: int, workers: int) -> float:
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        # Warm up every worker so process start-up is not measured
+        list(
+            executor.map(
+                _render_page_range,
+                [pdf_path] * workers,
+                [[0]] * workers,
+                [dpi] * workers,
+                [85] * workers,
+            )
+        )
+        start = time.perf_counter()
+        n_pages = asyncio.run(consume(pdf_path, dpi, executor))
+        elapsed = time.perf_counter() - start
+    return n_pages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pdf", nargs="?", help="PDF to render (default: synthetic)")
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--dpi", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf or make_synthetic_pdf(
+            os.path.join(tmp, "synthetic.pdf"), args.pages
+        )
+        cores = os.cpu_count() or 1
+        counts = sorted({1, *[2**k for k in range(1, cores.bit_length())], cores})
+
+        print(f"{'workers':>8} {'pages/sec':>10} {'speedup':>8}")
+        baseline = None
+        for workers in counts:
+            rate = bench(pdf_path, args.dpi, workers)
+            baseline = baseline or rate
+            print(f"{workers:>8} {rate:>10.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
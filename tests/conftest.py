@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The app imports its modules flat (`utils.x`, `constants`), as when run from
+# `adgm_cases/` with `app/` on the path
+ROOT = os.path.join(os.path.dirname(__file__), "..", "adgm_cases")
+sys.path[:0] = [os.path.abspath(ROOT), os.path.abspath(os.path.join(ROOT, "app"))]
+
+# Caches the code opens on its own (form registry, markdown) stay out of the tree
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="adgm-cases-tests-"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from utils.cache import DiskCache
+
+
+def totals(cache):
+    return cache.conn.execute(
+        "SELECT bytes, entries FROM totals WHERE id = 0"
+    ).fetchone()
+
+
+def actual(cache):
+    return cache.conn.execute(
+        "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries"
+    ).fetchone()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def test_totals_follow_inserts_updates_and_evictions(path):
+    cache = DiskCache(path, max_bytes=1000)
+    for i in range(50):
+        cache.set(f"k{i % 30}", b"x" * (10 + i))
+        assert totals(cache) == actual(cache)
+    assert totals(cache)[0] <= 1000
+    cache.close()
+
+
+def test_eviction_drops_least_recently_used_first(path):
+    cache = DiskCache(path, max_bytes=None, max_entries=10, touch_batch=1)
+    for i in range(10):
+        cache.set(f"k{i}", b"v")
+        # Distinct access times, as time.time() may not advance between calls
+        time.sleep(0.002)
+    cache.get("k0")
+    cache.set("k10", b"v")
+    # Back under 90% of the limit: the two oldest entries other than k0 go
+    assert cache.get("k0") == b"v"
+    assert cache.get("k1") is None and cache.get("k2") is None
+    assert cache.get("k3") == b"v" and cache.get("k10") == b"v"
+    assert totals(cache) == (9, 9)
+    cache.close()
+
+
+def test_connections_share_the_totals(path):
+    first = DiskCache(path, max_bytes=None, max_entries=20)
+    second = DiskCache(path, max_bytes=None, max_entries=20)
+    for i in range(15):
+        first.set(f"a{i}", b"12345")
+        second.set(f"b{i}", b"12345")
+    # Each evicts by the size of the whole cache, not by its own writes
+    assert totals(first) == totals(second) == actual(first)
+    assert totals(first)[1] <= 20
+    first.close()
+    second.close()
+
+
+def test_totals_are_counted_for_an_existing_cache(path):
+    cache = DiskCache(path)
+    cache.set("a", b"123")
+    cache.set("b", b"45")
+    cache.conn.execute("DROP TABLE totals")
+    cache.conn.commit()
+    cache.close()
+    reopened = DiskCache(path)
+    assert totals(reopened) == (5, 2)
+    reopened.close()
@@ -0,0 +1,35 @@
+import pytest
+
+from case_service import persisted_state, provenance, restore_case, undo_edit
+from utils.form_registry import get_form
+from utils.form_state import FormState
+from utils.session_store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"), flush_interval=3600)
+    yield store
+    store.close()
+
+
+def test_form_provenance_survives_the_session_store(store):
+    form = get_form("employment")
+    results = {"claimant": {"full_name": ""}, "claim_details": {"claim_value": ""}}
+    form_state = FormState(results, source="combiner")
+    form_state.apply({"claimant.full_name": "Ann"}, source="revisor")
+    form_state.apply({"claimant.full_name": "Anna"}, source="user:1")
+    store.put(
+        "c", **persisted_state({"summary_json": results, "form_state": form_state})
+    )
+
+    case = restore_case(store.load("c"), form)
+    assert provenance(case, "claimant.full_name")["source"] == "user:1"
+    assert undo_edit(form, case) == ["claimant.full_name"]
+    assert case["summary_json"]["claimant"]["full_name"] == "Ann"
+    assert "claimant.full_name" not in case["missing_keys"]
+
+    store.put("c", **persisted_state(case))
+    case = restore_case(store.load("c"), form)
+    assert undo_edit(form, case, redo=True) == ["claimant.full_name"]
+    assert case["summary_json"]["claimant"]["full_name"] == "Anna"
@@ -0,0 +1,115 @@
+import copy
+import random
+
+import orjson
+
+from utils.form_state import FormState
+
+
+def base_form():
+    return {
+        "claimant": {"full_name": "", "additional_claimants": [{"full_name": "A"}]},
+        "claim_details": {"claim_value": "", "items": ["salary"]},
+    }
+
+
+KEYS = [
+    "claimant.full_name",
+    "claimant.email",
+    "claimant.additional_claimants.full_name",
+    "claimant.additional_claimants[2].full_name",
+    "claim_details.claim_value",
+    "claim_details.items",
+    "claim_details.breakdown.salary",
+    "respondent.address.city",
+]
+
+
+def random_edits(rng, n):
+    return [
+        {
+            rng.choice(KEYS): rng.choice(["x", 1, None, {"nested": "v"}, ["a", "b"]])
+            for _ in range(rng.randint(1, 3))
+        }
+        for _ in range(n)
+    ]
+
+
+def test_undo_restores_every_earlier_state():
+    rng = random.Random(0)
+    for _ in range(50):
+        state = FormState(base_form())
+        snapshots = [copy.deepcopy(state.doc)]
+        for i, edit in enumerate(random_edits(rng, 6)):
+            state.apply(edit, source=f"user:{i}")
+            snapshots.append(copy.deepcopy(state.doc))
+        for snapshot in reversed(snapshots[:-1]):
+            state.undo()
+            assert state.doc == snapshot
+        assert state.undo() == []
+
+
+def test_redo_replays_undone_edits():
+    rng = random.Random(1)
+    for _ in range(50):
+        state = FormState(base_form())
+        for i, edit in enumerate(random_edits(rng, 6)):
+            state.apply(edit, source=f"user:{i}")
+        final = copy.deepcopy(state.doc)
+        while state.undo():
+            pass
+        while state.redo():
+            pass
+        assert state.doc == final
+
+
+def test_new_edit_clears_redo():
+    state = FormState(base_form())
+    state.apply({"claimant.full_name": "Ann"}, source="user:1")
+    state.undo()
+    state.apply({"claimant.email": "a@b.c"}, source="user:2")
+    assert state.redo() == []
+
+
+def test_why_and_history():
+    state = FormState(base_form(), source="combiner")
+    state.apply({"claimant.full_name": "Ann"}, source="revisor")
+    state.apply({"claimant.full_name": "Anna"}, source="user:1")
+    assert state.why("claimant.full_name") == "user:1"
+    assert state.why("claim_details.claim_value") == "combiner"
+    assert [op["source"] for op in state.history("claimant.full_name")] == [
+        "revisor",
+        "user:1",
+    ]
+
+
+def test_logged_value_is_not_changed_by_later_edits():
+    state = FormState({})
+    state.apply({"respondent.address": {"city": "Abu Dhabi"}}, source="user:1")
+    state.apply({"respondent.address.street": "Main"}, source="user:2")
+    first = state.history("respondent.address")[0]
+    assert first["path"] == "/respondent"
+    assert first["value"] == {"address": {"city": "Abu Dhabi"}}
+
+
+def test_round_trip_through_json_keeps_undo_redo_and_provenance():
+    rng = random.Random(2)
+    for _ in range(50):
+        state = FormState(base_form(), source="combiner")
+        for i, edit in enumerate(random_edits(rng, 6)):
+            state.apply(edit, source=f"user:{i}")
+        for _ in range(rng.randint(0, 3)):
+            state.undo()
+
+        doc = orjson.loads(orjson.dumps(state.doc))
+        restored = FormState.from_dict(doc, orjson.loads(orjson.dumps(state.to_dict())))
+        for key in KEYS:
+            assert restored.why(key) == state.why(key)
+        while True:
+            assert restored.doc == state.doc
+            if not state.undo():
+                break
+            restored.undo()
+        while state.redo():
+            restored.redo()
+            assert restored.doc == state.doc
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from utils.form_state import FormState
+from utils.jobs import CANCELLED, DONE, FAILED, JobManager
+
+
+@pytest.fixture
+def events_dir(tmp_path):
+    return str(tmp_path / "jobs")
+
+
+def manager(events_dir, **kwargs):
+    # Flushed and evicted explicitly by the tests
+    return JobManager(events_dir=events_dir, flush_interval=3600, **kwargs)
+
+
+def run(jobs, fn):
+    job = jobs.submit(fn)
+    job._future.result(timeout=5)
+    jobs.flush()
+    return job
+
+
+async def succeed(job):
+    job.report("Halfway", step=1)
+    return {"summary": "ok", "pages": [1, 2]}
+
+
+async def fail(job):
+    raise RuntimeError("boom")
+
+
+def test_finished_job_is_restored_from_disk(events_dir):
+    jobs = manager(events_dir, ttl=0)
+    job = run(jobs, succeed)
+    assert job.status == DONE
+    jobs._evict()
+    assert job.id not in jobs.jobs
+
+    restored = jobs.get(job.id)
+    assert restored is not job
+    assert restored.status == DONE and not restored.interrupted
+    assert restored.result == {"summary": "ok", "pages": [1, 2]}
+    assert [e["message"] for e in restored.events] == [e["message"] for e in job.events]
+    assert restored.events[2]["step"] == 1
+
+
+def test_failed_job_keeps_its_error(events_dir):
+    job = run(manager(events_dir), fail)
+    restored = manager(events_dir).get(job.id)
+    assert restored.status == FAILED
+    assert restored.error == "RuntimeError: boom"
+
+
+def test_unfinished_job_of_an_earlier_process_is_interrupted(events_dir):
+    jobs = manager(events_dir)
+
+    async def hang(job):
+        await asyncio.sleep(3600)
+
+    job = jobs.submit(hang)
+    while not job.events_since(1):
+        time.sleep(0.01)
+    jobs.flush()
+
+    restored = manager(events_dir).get(job.id)
+    assert restored.status == FAILED and restored.interrupted
+    assert restored.error == "Interrupted by a server restart"
+    jobs.cancel(job.id)
+
+
+def test_cancelled_job(events_dir):
+    jobs = manager(events_dir)
+
+    async def hang(job):
+        await asyncio.sleep(3600)
+
+    job = jobs.submit(hang)
+    while not job.events_since(1):
+        time.sleep(0.01)
+    assert jobs.cancel(job.id)
+    job.wait(since=len(job.events), timeout=5)
+    assert job.status == CANCELLED
+    assert not jobs.cancel(job.id)
+
+
+def test_form_state_result_is_saved_as_its_log(events_dir):
+    async def edit(job):
+        state = FormState({"name": ""})
+        state.apply({"name": "Ann"}, source="user:1")
+        return {"form": state.doc, "form_state": state}
+
+    job = run(manager(events_dir), edit)
+    result = manager(events_dir).get(job.id).result
+    state = FormState.from_dict(result["form"], result["form_state"])
+    assert state.why("name") == "user:1"
+    state.undo()
+    assert state.doc == {"name": ""}
+
+
+def test_unfinished_job_stays_in_memory(events_dir):
+    jobs = manager(events_dir, ttl=0)
+
+    async def hang(job):
+        await asyncio.sleep(3600)
+
+    job = jobs.submit(hang)
+    jobs._evict()
+    assert jobs.get(job.id) is job
+    jobs.cancel(job.id)
+
+
+def test_cleanup_deletes_old_files_of_evicted_jobs(events_dir):
+    jobs = manager(events_dir, ttl=0, retention=60)
+    job = run(jobs, succeed)
+    assert jobs.cleanup() == 0  # Still in memory
+    jobs._evict()
+    assert jobs.cleanup() == 0  # Changed recently
+    old = time.time() - 120
+    for name in os.listdir(events_dir):
+        os.utime(os.path.join(events_dir, name), (old, old))
+    assert jobs.cleanup() == 2
+    assert jobs.get(job.id) is None
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from utils.journal import PageJournal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "doc.journal")
+
+
+def written(path, fingerprint="abc", pages=((1, "one"), (2, "two"))):
+    journal = PageJournal(path, fingerprint)
+    journal.extend(pages)
+    journal.close()
+
+
+def test_pages_survive_reopening(path):
+    written(path, pages=[(2, "two"), (1, "one"), (3, "three")])
+    journal = PageJournal(path, "abc")
+    assert journal.done_pages() == {1, 2, 3}
+    assert journal.get(2) == "two"
+    assert list(journal.iter_ordered()) == [(1, "one"), (2, "two"), (3, "three")]
+    journal.close()
+
+
+@pytest.mark.parametrize("cut", [1, 10, 25])
+def test_torn_tail_is_dropped(path, cut):
+    written(path)
+    size = os.path.getsize(path)
+    written_line = b'{"page":3,"text":"three"}\n'
+    with open(path, "ab") as f:
+        f.write(written_line[:cut])
+    journal = PageJournal(path, "abc")
+    assert journal.done_pages() == {1, 2}
+    assert os.path.getsize(path) == size
+    # Pages journaled after recovery are readable on the next open
+    journal.append(3, "three")
+    journal.close()
+    reopened = PageJournal(path, "abc")
+    assert list(reopened.iter_ordered()) == [(1, "one"), (2, "two"), (3, "three")]
+    reopened.close()
+
+
+def test_line_missing_its_newline_is_dropped(path):
+    written(path)
+    with open(path, "ab") as f:
+        f.write(b'{"page":3,"text":"three"}')
+    journal = PageJournal(path, "abc")
+    assert 3 not in journal
+    journal.append(4, "four")
+    journal.close()
+    reopened = PageJournal(path, "abc")
+    assert reopened.done_pages() == {1, 2, 4}
+    reopened.close()
+
+
+def test_journal_of_other_content_restarts(path):
+    written(path, fingerprint="old")
+    journal = PageJournal(path, "new")
+    assert len(journal) == 0
+    journal.append(1, "fresh")
+    journal.close()
+    reopened = PageJournal(path, "new")
+    assert list(reopened.iter_ordered()) == [(1, "fresh")]
+    reopened.close()
+
+
+def test_in_memory_journal():
+    journal = PageJournal()
+    journal.extend([(2, "two"), (1, "one")])
+    assert 1 in journal and 3 not in journal
+    assert list(journal.iter_ordered()) == [(1, "one"), (2, "two")]
@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pymupdf
+import pytest
+
+import utils.utils as pdf_utils
+from utils.cache import DiskCache
+from utils.utils import PDF2MD
+
+
+def write_pdf(path, texts):
+    doc = pymupdf.open()
+    for text in texts:
+        doc.new_page().insert_text((72, 72), text, fontsize=11)
+    doc.save(path)
+    doc.close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = DiskCache(str(tmp_path / "markdown.db"))
+    yield cache
+    cache.close()
+
+
+def test_pages_in_order_across_shards(tmp_path, cache):
+    path = str(tmp_path / "doc.pdf")
+    write_pdf(path, [f"Clause number {i}" for i in range(5)])
+    with ThreadPoolExecutor(2) as pool:
+        pages = PDF2MD.parse_pdf_pages(path, shard_size=2, executor=pool, cache=cache)
+    assert [f"Clause number {i}" in page for i, page in enumerate(pages)] == [True] * 5
+
+
+def test_added_page_is_the_only_one_converted(tmp_path, cache, monkeypatch):
+    path = str(tmp_path / "doc.pdf")
+    write_pdf(path, ["First page", "Second page"])
+    with ThreadPoolExecutor(2) as pool:
+        first = PDF2MD.parse_pdf_pages(path, executor=pool, cache=cache)
+
+        # A larger font shifts the file's header levels; cached pages still hit
+        write_pdf(path, ["First page", "Second page"])
+        doc = pymupdf.open(path)
+        doc.new_page().insert_text((72, 72), "New heading", fontsize=30)
+        doc.saveIncr()
+        doc.close()
+
+        converted = []
+        convert = pdf_utils._convert_page_range
+
+        def spy(pdf_path, page_indices, hdr_info):
+            converted.extend(page_indices)
+            return convert(pdf_path, page_indices, hdr_info)
+
+        monkeypatch.setattr(pdf_utils, "_convert_page_range", spy)
+        second = PDF2MD.parse_pdf_pages(path, executor=pool, cache=cache)
+
+    assert converted == [2]
+    assert second[:2] == first
+    assert "New heading" in second[2]
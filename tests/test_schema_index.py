@@ -0,0 +1,130 @@
+import copy
+import random
+
+from utils.form_registry import get_form
+from utils.form_state import FormState
+from utils.helpers import flatten_json2dots
+from utils.schema_index import MissingKeyTracker, SchemaIndex
+
+
+def legacy_find_missing_keys(schema: dict, data: dict, prefix=""):
+    """The recursive walk `SchemaIndex.missing` replaced, kept as a reference."""
+    missing = []
+    for key, schema_val in schema.items():
+        full_key = f"{prefix}.{key}" if prefix else key
+        if key not in data:
+            missing.extend(legacy_leaf_paths(schema_val, full_key))
+        elif isinstance(schema_val, dict):
+            if not isinstance(data[key], dict):
+                missing.extend(legacy_leaf_paths(schema_val, full_key))
+            else:
+                missing.extend(
+                    legacy_find_missing_keys(schema_val, data[key], full_key)
+                )
+        elif isinstance(schema_val, list):
+            if isinstance(schema_val[0], dict):
+                if not data[key]:
+                    missing.extend(legacy_leaf_paths(schema_val[0], full_key))
+                else:
+                    for item in data[key]:
+                        missing.extend(
+                            legacy_find_missing_keys(schema_val[0], item, full_key)
+                        )
+            elif not data[key]:
+                missing.append(full_key)
+        elif data[key] in ("", None):
+            missing.append(full_key)
+    return missing
+
+
+def legacy_leaf_paths(schema_part, prefix=""):
+    paths = []
+    if isinstance(schema_part, dict):
+        for key, val in schema_part.items():
+            full_key = f"{prefix}.{key}" if prefix else key
+            if isinstance(val, dict):
+                paths.extend(legacy_leaf_paths(val, full_key))
+            elif isinstance(val, list) and val and isinstance(val[0], dict):
+                paths.extend(legacy_leaf_paths(val[0], full_key))
+            else:
+                paths.append(full_key)
+    return paths
+
+
+def random_data(rng, schema):
+    """Data for `schema` with keys dropped, emptied or of the wrong type."""
+    data = {}
+    for key, value in schema.items():
+        roll = rng.random()
+        if roll < 0.2:
+            continue
+        if roll < 0.3:
+            data[key] = rng.choice(["", None, [], {}, "text"])
+        elif isinstance(value, dict):
+            data[key] = random_data(rng, value)
+        elif isinstance(value, list) and value and isinstance(value[0], dict):
+            data[key] = [random_data(rng, value[0]) for _ in range(rng.randint(0, 3))]
+        elif isinstance(value, list):
+            data[key] = rng.choice([[], ["a"], ["a", "b"]])
+        else:
+            data[key] = rng.choice(["", None, "value", 0, 12.5])
+    return data
+
+
+def schemas():
+    return [get_form(name).schema for name in ("claim", "employment")]
+
+
+def test_missing_matches_the_legacy_walk():
+    rng = random.Random(0)
+    for schema in schemas():
+        index = SchemaIndex(schema)
+        assert index.leaf_paths() == legacy_leaf_paths(schema)
+        for _ in range(300):
+            data = random_data(rng, schema)
+            try:
+                expected = legacy_find_missing_keys(schema, data)
+            except TypeError:
+                # The legacy walk fails on some wrongly typed list items
+                continue
+            assert index.missing(data) == expected
+
+
+def test_absent_leaves_of_an_existing_object_are_not_missing():
+    schema = {"claimant": {"name": "", "emails": [""], "address": {"city": ""}}}
+    index = SchemaIndex(schema)
+    assert index.missing({"claimant": {}}) == ["claimant.address.city"]
+    assert index.missing({}) == [
+        "claimant.name",
+        "claimant.emails",
+        "claimant.address.city",
+    ]
+
+
+def test_tracker_matches_a_full_pass_after_edits():
+    rng = random.Random(1)
+    for schema in schemas():
+        index = SchemaIndex(schema)
+        keys = index.leaf_paths()
+        for _ in range(20):
+            state = FormState(random_data(rng, schema))
+            tracker = MissingKeyTracker(index, state.doc)
+            for i in range(10):
+                edit = {
+                    rng.choice(keys): rng.choice(["", None, "value", ["a"], {}])
+                    for _ in range(rng.randint(1, 3))
+                }
+                changed = state.apply(edit, source=f"user:{i}")
+                if rng.random() < 0.2:
+                    changed = state.undo()
+                assert tracker.update(changed) == index.missing(state.doc)
+                assert tracker.all_keys == flatten_json2dots(state.doc)
+
+
+def test_tracker_update_with_replaced_data():
+    schema = schemas()[0]
+    index = SchemaIndex(schema)
+    data = random_data(random.Random(2), schema)
+    tracker = MissingKeyTracker(index, {})
+    replaced = copy.deepcopy(data)
+    assert tracker.update(list(replaced), replaced) == index.missing(replaced)
@@ -0,0 +1,90 @@
+import pytest
+
+from utils.session_store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Flushed explicitly by the tests
+    store = SessionStore(str(tmp_path / "sessions.db"), flush_interval=3600)
+    yield store
+    store.close()
+
+
+def messages(*contents):
+    return [{"role": "user", "content": content} for content in contents]
+
+
+def test_unknown_session(store):
+    assert store.load("nope") is None
+
+
+def test_values_and_messages_round_trip(store):
+    store.put("s", summary_json={"a": [1, 2]}, job_id=None)
+    store.put_messages("s", messages("hi", "there"))
+    assert store.load("s") == {
+        "summary_json": {"a": [1, 2]},
+        "job_id": None,
+        "chat_history": messages("hi", "there"),
+    }
+
+
+def test_put_snapshots_values(store):
+    form = {"name": "Ann"}
+    store.put("s", summary_json=form)
+    form["name"] = "Bob"
+    assert store.load("s")["summary_json"] == {"name": "Ann"}
+
+
+def test_unchanged_values_are_not_queued(store):
+    store.put("s", summary_json={"a": 1})
+    store.flush()
+    store.put("s", summary_json={"a": 1})
+    assert not store._values
+    store.put("s", summary_json={"a": 2})
+    assert store.load("s")["summary_json"] == {"a": 2}
+
+
+def test_messages_are_appended(store):
+    history = messages("one")
+    store.put_messages("s", history)
+    store.flush()
+    history += messages("two", "three")
+    store.put_messages("s", history)
+    assert set(store._messages) == {("s", 1), ("s", 2)}
+    assert store.load("s")["chat_history"] == history
+
+
+@pytest.mark.parametrize("flush_between", [True, False])
+def test_cut_history_is_truncated(store, flush_between):
+    store.put_messages("s", messages("a", "b", "c", "d"))
+    store.flush()
+    store.put_messages("s", messages("a"))
+    if flush_between:
+        store.flush()
+    store.put_messages("s", messages("a", "x"))
+    assert store.load("s")["chat_history"] == messages("a", "x")
+
+
+def test_load_resumes_write_behind_state(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first = SessionStore(path, flush_interval=3600)
+    first.put("s", summary_json={"a": 1})
+    first.put_messages("s", messages("a", "b"))
+    first.close()
+
+    second = SessionStore(path, flush_interval=3600)
+    try:
+        state = second.load("s")
+        second.put_messages("s", state["chat_history"] + messages("c"))
+        assert second.load("s")["chat_history"] == messages("a", "b", "c")
+    finally:
+        second.close()
+
+
+def test_delete_drops_queued_writes(store):
+    store.put("s", summary_json={"a": 1})
+    store.flush()
+    store.put_messages("s", messages("a"))
+    store.delete("s")
+    assert store.load("s") is None
@@ -0,0 +1,97 @@
+import json
+import random
+
+import pytest
+
+from utils.helpers import flatten_json2dots
+from utils.stream_json import StreamingJSONParser, parse_json
+
+STRINGS = ["", "Ann", 'say "hi"', "back\\slash", "line\nbreak", "AED 1,000", "é ✓"]
+# "https://" is no comment inside a string
+STRINGS.append("see https://example.com // not a comment")
+
+
+def random_value(rng, depth=0):
+    roll = rng.random()
+    if depth < 3 and roll < 0.25:
+        return {f"k{i}": random_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+    if depth < 3 and roll < 0.4:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return rng.choice(STRINGS + [0, -12, 3.5, 1e-3, True, False, None])
+
+
+def chunks(rng, text):
+    parts, pos = [], 0
+    while pos < len(text):
+        size = rng.randint(1, 12)
+        parts.append(text[pos : pos + size])
+        pos += size
+    return parts
+
+
+def feed_all(parts):
+    parser = StreamingJSONParser()
+    events = []
+    for part in parts:
+        events.extend(parser.feed(part))
+    return parser.close(), events
+
+
+def test_chunked_parse_equals_a_full_parse():
+    rng = random.Random(0)
+    for _ in range(300):
+        value = {"root": random_value(rng)}
+        text = json.dumps(value, indent=rng.choice([None, 2]), ensure_ascii=False)
+        result, events = feed_all(chunks(rng, text))
+        assert result == value
+        # Every leaf is reported once, at the path flatten_json2dots gives it
+        assert dict(events) == flatten_json2dots(value)
+        assert len(events) == len(flatten_json2dots(value))
+
+
+MESSY_REPLY = """Here is the form:
+```json
+{
+  // The claimant
+  "claimant": {"name": "Ann", "email": undefined,},
+  /* amounts
+     in AED */
+  "amounts": [1000, NaN, Infinity, -Infinity,],
+  "url": "https://example.com/a//b",
+  "ok": true
+}
+```
+Let me know if anything is missing."""
+
+MESSY_VALUE = {
+    "claimant": {"name": "Ann", "email": None},
+    "amounts": [1000, None, None, None],
+    "url": "https://example.com/a//b",
+    "ok": True,
+}
+
+
+def test_repairs_a_reply_in_any_chunking():
+    rng = random.Random(1)
+    assert parse_json(MESSY_REPLY) == MESSY_VALUE
+    for _ in range(200):
+        result, events = feed_all(chunks(rng, MESSY_REPLY))
+        assert result == MESSY_VALUE
+        assert dict(events) == flatten_json2dots(MESSY_VALUE)
+
+
+def test_events_arrive_as_values_complete():
+    parser = StreamingJSONParser()
+    assert parser.feed('{"a": "x", "b": [1') == [("a", "x")]
+    assert parser.feed(", 2") == [("b.0", 1)]
+    assert parser.feed("]}") == [("b.1", 2)]
+    assert parser.done
+    # Text after the value is ignored
+    assert parser.feed(' {"c": 1}') == []
+    assert parser.close() == {"a": "x", "b": [1, 2]}
+
+
+@pytest.mark.parametrize("reply", ["", "no json here", '{"a": [1, 2', '{"a": "open'])
+def test_incomplete_replies_raise(reply):
+    with pytest.raises(ValueError):
+        parse_json(reply)